@@ -0,0 +1,74 @@
+"""Initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+Databases created by ``Base.metadata.create_all`` before migrations existed
+already match this revision and only need ``alembic stamp 0001``.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'genres',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('description', sa.String()),
+    )
+    op.create_index('ix_genres_id', 'genres', ['id'])
+    op.create_index('ix_genres_name', 'genres', ['name'], unique=True)
+
+    for table in ('actors', 'directors'):
+        op.create_table(
+            table,
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('name', sa.String(), nullable=False),
+            sa.Column('birth_year', sa.Integer()),
+            sa.Column('bio', sa.String()),
+        )
+        op.create_index(f'ix_{table}_id', table, ['id'])
+        op.create_index(f'ix_{table}_name', table, ['name'])
+
+    op.create_table(
+        'movies',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('release_year', sa.Integer(), nullable=False),
+        sa.Column('synopsis', sa.String()),
+        sa.Column('duration', sa.Integer()),
+        sa.Column('director_id', sa.Integer(), sa.ForeignKey('directors.id')),
+    )
+    op.create_index('ix_movies_id', 'movies', ['id'])
+    op.create_index('ix_movies_title', 'movies', ['title'])
+
+    op.create_table(
+        'movie_actors',
+        sa.Column('movie_id', sa.Integer(), sa.ForeignKey('movies.id')),
+        sa.Column('actor_id', sa.Integer(), sa.ForeignKey('actors.id')),
+    )
+    op.create_table(
+        'movie_genres',
+        sa.Column('movie_id', sa.Integer(), sa.ForeignKey('movies.id')),
+        sa.Column('genre_id', sa.Integer(), sa.ForeignKey('genres.id')),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('movie_genres')
+    op.drop_table('movie_actors')
+    op.drop_table('movies')
+    op.drop_table('directors')
+    op.drop_table('actors')
+    op.drop_table('genres')
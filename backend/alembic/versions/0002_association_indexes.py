@@ -0,0 +1,61 @@
+"""Composite keys on association tables and movie filter indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+Gives movie_actors and movie_genres a composite primary key (movie -> people
+and movie -> genres lookups) plus a reverse index in the other direction, and
+indexes movies.release_year and movies.director_id. Duplicate association
+rows, which the old schema allowed, are collapsed while the tables are rebuilt.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ASSOCIATIONS = {
+    'movie_actors': ('actor_id', 'actors'),
+    'movie_genres': ('genre_id', 'genres'),
+}
+
+
+def _rebuild(table: str, other: str, other_table: str, keyed: bool) -> None:
+    tmp = f'_{table}_new'
+    op.create_table(
+        tmp,
+        sa.Column('movie_id', sa.Integer(), sa.ForeignKey('movies.id'), primary_key=keyed),
+        sa.Column(other, sa.Integer(), sa.ForeignKey(f'{other_table}.id'), primary_key=keyed),
+    )
+    op.execute(
+        f'INSERT INTO {tmp} (movie_id, {other}) '
+        f'SELECT DISTINCT movie_id, {other} FROM {table} '
+        f'WHERE movie_id IS NOT NULL AND {other} IS NOT NULL'
+    )
+    op.drop_table(table)
+    op.rename_table(tmp, table)
+
+
+def upgrade() -> None:
+    for table, (other, other_table) in ASSOCIATIONS.items():
+        _rebuild(table, other, other_table, keyed=True)
+        op.create_index(f'ix_{table}_{other}_movie_id', table, [other, 'movie_id'])
+
+    op.create_index('ix_movies_release_year', 'movies', ['release_year'])
+    op.create_index('ix_movies_director_id', 'movies', ['director_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_movies_director_id', table_name='movies')
+    op.drop_index('ix_movies_release_year', table_name='movies')
+
+    for table, (other, other_table) in ASSOCIATIONS.items():
+        op.drop_index(f'ix_{table}_{other}_movie_id', table_name=table)
+        _rebuild(table, other, other_table, keyed=False)
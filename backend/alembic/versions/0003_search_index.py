@@ -0,0 +1,31 @@
+"""Full-text search index
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+
+Creates the FTS5 search_index table with its sync triggers and backfills it
+from movies, actors and directors.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app import fts
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    fts.create_search_index(connection)
+    fts.rebuild_search_index(connection)
+
+
+def downgrade() -> None:
+    fts.drop_search_index(op.get_bind())
@@ -0,0 +1,36 @@
+"""Per-table version counters for ETags
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+
+Adds catalog_versions with one row per catalog table and the triggers that
+bump it on every write.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app import etag
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'catalog_versions',
+        sa.Column('table_name', sa.String(), primary_key=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+    )
+    etag.create_version_triggers(op.get_bind())
+
+
+def downgrade() -> None:
+    etag.drop_version_triggers(op.get_bind())
+    op.drop_table('catalog_versions')
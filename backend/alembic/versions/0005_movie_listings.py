@@ -0,0 +1,50 @@
+"""Denormalized movie listings
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+
+Adds the movie_listings read model with its sync triggers and backfills it
+from movies, directors and the association tables.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app import listings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'movie_listings',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('release_year', sa.Integer(), nullable=False),
+        sa.Column('synopsis', sa.String()),
+        sa.Column('duration', sa.Integer()),
+        sa.Column('director_id', sa.Integer()),
+        sa.Column('director_name', sa.String()),
+        sa.Column('director_birth_year', sa.Integer()),
+        sa.Column('director_bio', sa.String()),
+        sa.Column('genre_ids', sa.String(), nullable=False),
+        sa.Column('actor_ids', sa.String(), nullable=False),
+    )
+    op.create_index('ix_movie_listings_title_id', 'movie_listings', ['title', 'id'])
+    op.create_index('ix_movie_listings_release_year_id', 'movie_listings', ['release_year', 'id'])
+    op.create_index('ix_movie_listings_director_id_id', 'movie_listings', ['director_id', 'id'])
+    connection = op.get_bind()
+    listings.create_listing_triggers(connection)
+    listings.rebuild_listings(connection)
+
+
+def downgrade() -> None:
+    listings.drop_listing_triggers(op.get_bind())
+    op.drop_table('movie_listings')
@@ -0,0 +1,52 @@
+"""Row versions and the catalog change log
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00
+
+Adds updated_at and version to movies, actors, directors and genres, the
+catalog_changes log and the triggers that append to it. Existing rows start
+at version 1; the log starts empty, so replicas bootstrap from an export.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app import changes
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in changes.TRACKED_ENTITIES:
+        # SQLite cannot add a column with a non-constant default, so backfill instead
+        op.add_column(table, sa.Column('updated_at', sa.DateTime()))
+        op.add_column(table, sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+        op.execute(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP")
+    op.create_table(
+        'catalog_changes',
+        sa.Column('seq', sa.Integer(), primary_key=True),
+        sa.Column('entity', sa.String(), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('op', sa.String(), nullable=False),
+        sa.Column('version', sa.Integer()),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sqlite_autoincrement=True,
+    )
+    changes.create_change_triggers(op.get_bind())
+
+
+def downgrade() -> None:
+    changes.drop_change_triggers(op.get_bind())
+    op.drop_table('catalog_changes')
+    # Native DROP COLUMN (SQLite 3.35+): a batch table copy would break the
+    # listing and search triggers that reference these tables
+    for table in changes.TRACKED_ENTITIES:
+        op.execute(f"ALTER TABLE {table} DROP COLUMN version")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN updated_at")
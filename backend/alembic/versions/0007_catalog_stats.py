@@ -0,0 +1,43 @@
+"""Aggregate catalog statistics
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:00
+
+Adds the catalog_stats counters with the triggers that maintain them and
+backfills them from movies and the association tables.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app import stats
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'catalog_stats',
+        sa.Column('dimension', sa.String(), primary_key=True),
+        sa.Column('key', sa.Integer(), primary_key=True),
+        sa.Column('movie_count', sa.Integer(), nullable=False),
+        sa.Column('total_duration', sa.Integer(), nullable=False),
+        sa.Column('duration_count', sa.Integer(), nullable=False),
+    )
+    op.create_index('ix_catalog_stats_dimension_movie_count_key', 'catalog_stats',
+                    ['dimension', sa.text('movie_count DESC'), 'key'])
+    connection = op.get_bind()
+    stats.create_stats_triggers(connection)
+    stats.rebuild_stats(connection)
+
+
+def downgrade() -> None:
+    stats.drop_stats_triggers(op.get_bind())
+    op.drop_table('catalog_stats')
@@ -0,0 +1,33 @@
+"""Log cast and genre link changes
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 00:00:00
+
+Adds catalog_changes.ref_id and the triggers that log movie_actors and
+movie_genres inserts and deletes. Links changed before this revision are
+not in the log; replicas that need them bootstrap again from an export.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app import changes
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('catalog_changes', sa.Column('ref_id', sa.Integer()))
+    changes.create_association_change_triggers(op.get_bind())
+
+
+def downgrade() -> None:
+    changes.drop_association_change_triggers(op.get_bind())
+    op.execute("ALTER TABLE catalog_changes DROP COLUMN ref_id")
@@ -0,0 +1,350 @@
+"""Typo-tolerant name autocomplete over an in-memory trigram index.
+
+Every actor name, director name and movie title is normalized (accents
+stripped, case folded, punctuation to spaces) and split into the trigrams of
+its words, each padded as ``"  word "`` so word starts weigh in. Each kind
+keeps an inverted index from trigram to the ``array("i")`` of entry
+positions containing it. Entries are numbered by popularity at build time,
+most films first (actors and directors by movie count, movies by cast
+size), so every posting list runs from the best-known name down.
+
+A query is split the same way, except that its last word is not closed off
+(``"  leonar"``), so a partial word matches as a prefix. Posting lists are
+read rarest first, each capped at `POSTING_SCAN` entries and all together
+at `SCAN_BUDGET`, so a query over millions of names touches a bounded
+number of the most popular ones. Entries sharing nearly as many trigrams as
+the best one are rescored exactly: mostly by the share of the query's
+trigrams they contain, which a single typo only dents, then by overall
+similarity and log popularity.
+
+The index is built in the app's lifespan, before the worker takes traffic.
+Rows created through `crud.create_*` are appended as their events arrive
+(a new movie also adds one to the film count of its cast and director);
+after `REBUILD_AFTER` additions a background thread rebuilds it so posting
+lists are back in popularity order, while queries keep using the current
+one. A bulk load, or a write from another process (``CATALOG_CHANGED``),
+marks it stale and the next query rebuilds it; concurrent queries wait for
+that one build instead of each starting their own.
+"""
+import heapq
+import logging
+import math
+import re
+import threading
+import unicodedata
+from array import array
+from collections import Counter
+from itertools import compress
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from . import events, stats
+from .database import engine
+
+KINDS = ("actor", "director", "movie")
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+MAX_QUERY_LENGTH = 100
+
+# Entries read from one posting list, and from all of them, per query
+POSTING_SCAN = 2000
+SCAN_BUDGET = 8000
+# Candidates may miss this many of the best candidate's trigrams (one typo spoils up to three)
+TRIGRAM_SLACK = 3
+# Entries rescored exactly per kind
+CANDIDATES = 100
+# Share of query trigrams an entry needs to be returned at all
+MIN_COVERAGE = 0.34
+POPULARITY_WEIGHT = 0.15
+# Entries appended after the build before it is redone
+REBUILD_AFTER = 50000
+FETCH_SIZE = 50000
+
+LOAD_QUERIES = {
+    "actor": (
+        "SELECT actors.id, actors.name, NULL, COALESCE(s.movie_count, 0) FROM actors "
+        f"LEFT JOIN {stats.STATS_TABLE} s ON s.dimension = '{stats.ACTOR}' AND s.key = actors.id "
+        "ORDER BY 4 DESC, 1"
+    ),
+    "director": (
+        "SELECT directors.id, directors.name, NULL, COALESCE(s.movie_count, 0) FROM directors "
+        f"LEFT JOIN {stats.STATS_TABLE} s ON s.dimension = '{stats.DIRECTOR}' AND s.key = directors.id "
+        "ORDER BY 4 DESC, 1"
+    ),
+    "movie": (
+        "SELECT movies.id, movies.title, movies.release_year, "
+        "(SELECT count(*) FROM movie_actors WHERE movie_actors.movie_id = movies.id) FROM movies "
+        "ORDER BY 4 DESC, 1"
+    ),
+}
+
+logger = logging.getLogger("app.autocomplete")
+
+_SEPARATORS = re.compile(r"[\W_]+")
+
+def normalize(text: str) -> str:
+    """Lowercase ASCII-folded words separated by single spaces."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    return _SEPARATORS.sub(" ", folded).strip()
+
+def padded(key: str) -> str:
+    """`key` with each word padded as for `trigrams`; a query trigram occurs in
+    it as a substring exactly when it is one of the key's trigrams."""
+    return "  " + "   ".join(key.split()) + " "
+
+def trigrams(key: str, open_end: bool = False) -> Set[str]:
+    """Trigrams of the words of a normalized `key`; with `open_end` the last
+    word is left unterminated so it matches as a prefix."""
+    words = key.split()
+    grams = set()
+    for n, word in enumerate(words):
+        chars = "  " + word + ("" if open_end and n == len(words) - 1 else " ")
+        grams.update(chars[i:i + 3] for i in range(len(chars) - 2))
+    return grams
+
+class NameIndex:
+    """Trigram postings over the names of one kind."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.ids = array("i")
+        self.names: List[str] = []
+        # Padded normalized names and their trigram counts, for rescoring
+        self.keys: List[str] = []
+        self.sizes = array("H")
+        self.years = array("i")
+        self.popularity = array("i")
+        # Database id -> entry position, -1 where absent
+        self.positions = array("i")
+        self.postings: Dict[str, array] = {}
+        self.max_popularity = 0
+
+    def add(self, entry_id: int, name: Optional[str], release_year: Optional[int], popularity: int) -> None:
+        if not name or self.position(entry_id) is not None:
+            return
+        position = len(self.ids)
+        key = normalize(name)
+        grams = trigrams(key)
+        self.ids.append(entry_id)
+        self.names.append(name)
+        self.keys.append(padded(key))
+        self.sizes.append(min(len(grams), 0xFFFF))
+        self.years.append(release_year or 0)
+        self.popularity.append(popularity)
+        self.max_popularity = max(self.max_popularity, popularity)
+        if entry_id >= len(self.positions):
+            self.positions.extend([-1] * (entry_id + 1 - len(self.positions)))
+        self.positions[entry_id] = position
+        postings = self.postings
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array("i")
+            posting.append(position)
+
+    def position(self, entry_id: int) -> Optional[int]:
+        if 0 <= entry_id < len(self.positions) and self.positions[entry_id] >= 0:
+            return self.positions[entry_id]
+        return None
+
+    def bump(self, entry_id: int, delta: int = 1) -> None:
+        position = self.position(entry_id)
+        if position is not None:
+            self.popularity[position] += delta
+            self.max_popularity = max(self.max_popularity, self.popularity[position])
+
+    def candidates(self, grams: Set[str]) -> List[int]:
+        """Positions sharing close to the most query trigrams, from the rarest lists."""
+        lists = sorted((posting for posting in map(self.postings.get, grams) if posting), key=len)
+        counts = Counter()
+        scanned = 0
+        for posting in lists:
+            chunk = posting[:POSTING_SCAN]
+            counts.update(chunk)
+            scanned += len(chunk)
+            if scanned >= SCAN_BUDGET:
+                break
+        if not counts:
+            return []
+        positions, tallies = list(counts), list(counts.values())
+        best = max(tallies)
+        # Most shared trigrams first, then the lower, more popular, positions;
+        # compress() keeps the per-entry work in C
+        chosen: List[int] = []
+        for count in range(best, max(0, best - TRIGRAM_SLACK - 1), -1):
+            chosen += heapq.nsmallest(CANDIDATES - len(chosen), compress(positions, map(count.__eq__, tallies)))
+            if len(chosen) >= CANDIDATES:
+                break
+        return chosen[:CANDIDATES]
+
+    def complete(self, grams: Set[str], limit: int) -> List[dict]:
+        results = []
+        scale = POPULARITY_WEIGHT / math.log1p(self.max_popularity) if self.max_popularity else 0.0
+        for position in self.candidates(grams):
+            key = self.keys[position]
+            shared = sum(gram in key for gram in grams)
+            coverage = shared / len(grams)
+            if coverage < MIN_COVERAGE:
+                continue
+            dice = 2 * shared / (len(grams) + self.sizes[position])
+            popularity = self.popularity[position]
+            score = 0.75 * coverage + 0.25 * dice + scale * math.log1p(popularity)
+            results.append({
+                "type": self.kind,
+                "id": self.ids[position],
+                "name": self.names[position],
+                "release_year": self.years[position] or None,
+                "popularity": popularity,
+                "score": round(score, 4),
+            })
+        results.sort(key=lambda r: (-r["score"], r["id"]))
+        return results[:limit]
+
+def _rows(db: Session, sql: str) -> Iterable[tuple]:
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(sql)
+        while True:
+            chunk = cursor.fetchmany(FETCH_SIZE)
+            if not chunk:
+                break
+            yield from chunk
+    finally:
+        cursor.close()
+
+class AutocompleteIndex:
+    def __init__(self, bind: Engine = engine):
+        # Where startup and background rebuilds read from
+        self.bind = bind
+        self._lock = threading.Lock()
+        # Held for a whole load, so only one runs at a time
+        self._build_lock = threading.Lock()
+        self.loaded = False
+        # (event, payload) received while a load is scanning, replayed once it finishes
+        self._pending: Optional[list] = None
+        # Bumped by `invalidate`, so a load that overlaps one stays stale
+        self._generation = 0
+        self._rebuilding = False
+        self.added = 0
+        self.builds = 0
+        self.indexes: Dict[str, NameIndex] = {kind: NameIndex(kind) for kind in KINDS}
+
+    # Building and maintenance
+
+    def load(self, db: Session) -> None:
+        with self._lock:
+            self._pending = []
+            generation = self._generation
+        indexes = {}
+        for kind in KINDS:
+            index = indexes[kind] = NameIndex(kind)
+            for row in _rows(db, LOAD_QUERIES[kind]):
+                index.add(*row)
+        with self._lock:
+            self.indexes = indexes
+            self.added = 0
+            self.builds += 1
+            self.loaded = generation == self._generation
+            pending, self._pending = self._pending, None
+        for event, payload in pending:
+            self._apply(event, payload)
+
+    def build(self) -> None:
+        """Load from `bind`, unless another load is running; it then waits for it."""
+        with self._build_lock:
+            with Session(self.bind) as db:
+                self.load(db)
+
+    def ensure_loaded(self, db: Session) -> None:
+        if self.loaded:
+            return
+        with self._build_lock:
+            if not self.loaded:
+                self.load(db)
+
+    def invalidate(self) -> None:
+        """Mark the index stale; the next query rebuilds it."""
+        with self._lock:
+            self._generation += 1
+            self.loaded = False
+
+    def schedule_rebuild(self) -> None:
+        """Rebuild on a background thread; queries use the current index meanwhile."""
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._background_rebuild, name="autocomplete-rebuild", daemon=True).start()
+
+    def _background_rebuild(self) -> None:
+        try:
+            self.build()
+        except Exception:
+            logger.exception("Autocomplete rebuild failed")
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def _apply(self, event: str, row) -> None:
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((event, row))
+                return
+            if not self.loaded:
+                return
+            if not self._add(event, row):
+                return
+            self.added += 1
+            rebuild = self.added >= REBUILD_AFTER
+        if rebuild:
+            self.schedule_rebuild()
+
+    def _add(self, event: str, row) -> bool:
+        indexes = self.indexes
+        if event == events.MOVIE_CREATED:
+            if indexes["movie"].position(row.id) is not None:
+                return False
+            indexes["movie"].add(row.id, row.title, row.release_year, len(row.actors))
+            for actor in row.actors:
+                indexes["actor"].bump(actor.id)
+            if row.director_id is not None:
+                indexes["director"].bump(row.director_id)
+        else:
+            kind = "actor" if event == events.ACTOR_CREATED else "director"
+            indexes[kind].add(row.id, row.name, None, 0)
+        return True
+
+    def add_actor(self, actor) -> None:
+        self._apply(events.ACTOR_CREATED, actor)
+
+    def add_director(self, director) -> None:
+        self._apply(events.DIRECTOR_CREATED, director)
+
+    def add_movie(self, movie) -> None:
+        self._apply(events.MOVIE_CREATED, movie)
+
+    # Queries
+
+    def complete(self, q: str, kind: Optional[str] = None, limit: int = DEFAULT_LIMIT) -> List[dict]:
+        """Best matches for the partial, possibly misspelled `q`, most relevant first."""
+        key = normalize(q[:MAX_QUERY_LENGTH])
+        if not key:
+            return []
+        grams = trigrams(key, open_end=not q[-1].isspace())
+        indexes = self.indexes
+        results = []
+        for name in ((kind,) if kind else KINDS):
+            results.extend(indexes[name].complete(grams, limit))
+        results.sort(key=lambda r: (-r["score"], r["type"], r["id"]))
+        return results[:limit]
+
+autocomplete_index = AutocompleteIndex()
+
+events.subscribe(events.ACTOR_CREATED, autocomplete_index.add_actor)
+events.subscribe(events.DIRECTOR_CREATED, autocomplete_index.add_director)
+events.subscribe(events.MOVIE_CREATED, autocomplete_index.add_movie)
+events.subscribe(events.CATALOG_BULK_LOADED, lambda count: autocomplete_index.invalidate())
+events.subscribe(events.CATALOG_CHANGED, lambda versions: autocomplete_index.invalidate())
@@ -0,0 +1,145 @@
+"""Batched entity lookups, DataLoader style.
+
+A batch names entities by path (``/movies/1``, ``/actors?ids=2,3``).
+`BatchLoader` first collects every requested id per entity type, then loads
+each type with one ``IN`` query (`crud.load_batch`) carrying the same
+eager-loading options as the detail routes, so a batch costs a fixed number
+of statements however many lookups it holds. Rows are serialized through
+pre-built `TypeAdapter`s for the detail schemas.
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from fastapi import HTTPException, Response
+from pydantic import TypeAdapter
+
+from . import models, schemas
+
+# Ids per ``ids=`` list or batch path
+MAX_BATCH_IDS = 100
+
+# Resource name -> (model, detail schema); results match GET /api/{name}/{id}
+RESOURCES = {
+    "movies": (models.Movie, schemas.Movie),
+    "actors": (models.Actor, schemas.ActorWithMovies),
+    "directors": (models.Director, schemas.DirectorWithMovies),
+    "genres": (models.Genre, schemas.Genre),
+}
+
+LIST_ADAPTERS = {name: TypeAdapter(List[schema]) for name, (_, schema) in RESOURCES.items()}
+
+class InvalidLookup(ValueError):
+    """Raised for a batch path that does not name a known resource and ids."""
+
+def parse_ids(value: str) -> List[int]:
+    """Parse an ``ids=1,2,3`` value, dropping duplicates but keeping order."""
+    try:
+        ids = list(dict.fromkeys(int(part) for part in value.split(",") if part.strip()))
+    except ValueError:
+        raise InvalidLookup("ids must be a comma-separated list of integers")
+    if not ids:
+        raise InvalidLookup("ids must name at least one id")
+    if len(ids) > MAX_BATCH_IDS:
+        raise InvalidLookup(f"At most {MAX_BATCH_IDS} ids per request")
+    return ids
+
+def query_ids(value: str) -> List[int]:
+    """`parse_ids` for a query parameter, answering 400 if it is invalid."""
+    try:
+        return parse_ids(value)
+    except InvalidLookup as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+class Lookup:
+    """One sub-request: a single entity (``/movies/1``) or a list (``/movies?ids=1,2``)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        parts = urlsplit(path)
+        segments = [segment for segment in parts.path.split("/") if segment]
+        if segments[:1] == ["api"]:
+            segments = segments[1:]
+        if not segments or segments[0] not in RESOURCES or len(segments) > 2:
+            raise InvalidLookup(f"Unsupported path; use /{{{'|'.join(RESOURCES)}}}/{{id}} or ?ids=")
+        self.resource = segments[0]
+        if len(segments) == 2:
+            try:
+                self.ids = [int(segments[1])]
+            except ValueError:
+                raise InvalidLookup("The id must be an integer")
+            self.single = True
+        else:
+            ids = parse_qs(parts.query).get("ids")
+            if not ids:
+                raise InvalidLookup("A list lookup needs ids=")
+            self.ids = parse_ids(ids[0])
+            self.single = False
+
+class BatchLoader:
+    def __init__(self):
+        self._wanted: Dict[str, set] = defaultdict(set)
+        self._loaded: Dict[str, Dict[int, Any]] = defaultdict(dict)
+
+    def want(self, resource: str, ids: List[int]) -> None:
+        self._wanted[resource].update(ids)
+
+    def wanted(self) -> Iterator[Tuple[str, List[int]]]:
+        for resource, ids in self._wanted.items():
+            yield resource, sorted(ids)
+
+    def fill(self, resource: str, rows) -> None:
+        self._loaded[resource].update((row.id, row) for row in rows)
+
+    def get(self, resource: str, ids: List[int]) -> List[Any]:
+        """Loaded rows in the order of `ids`; missing ids are skipped."""
+        loaded = self._loaded[resource]
+        return [loaded[i] for i in ids if i in loaded]
+
+    def dump(self, resource: str, ids: List[int]) -> List[Any]:
+        """`get` serialized to JSON-ready data through the resource's adapter."""
+        adapter = LIST_ADAPTERS[resource]
+        items = adapter.validate_python(self.get(resource, ids), from_attributes=True)
+        return adapter.dump_python(items, mode="json")
+
+def parse_lookups(paths: List[str]) -> Tuple[BatchLoader, List[Optional[Lookup]], List[Optional[str]]]:
+    """Register every valid path with one loader; invalid ones keep their error."""
+    loader = BatchLoader()
+    lookups, errors = [], []
+    for path in paths:
+        try:
+            lookup = Lookup(path)
+        except InvalidLookup as e:
+            lookups.append(None)
+            errors.append(str(e))
+            continue
+        loader.want(lookup.resource, lookup.ids)
+        lookups.append(lookup)
+        errors.append(None)
+    return loader, lookups, errors
+
+def batch_results(loader: BatchLoader, paths: List[str], lookups: List[Optional[Lookup]],
+                  errors: List[Optional[str]]) -> List[dict]:
+    """Per-path status and body, in request order, after the loader is filled."""
+    results = []
+    for path, lookup, error in zip(paths, lookups, errors):
+        if lookup is None:
+            results.append({"path": path, "status": 400, "body": {"detail": error}})
+            continue
+        items = loader.dump(lookup.resource, lookup.ids)
+        if not lookup.single:
+            results.append({"path": path, "status": 200, "body": items})
+        elif items:
+            results.append({"path": path, "status": 200, "body": items[0]})
+        else:
+            detail = f"{lookup.resource[:-1].capitalize()} not found"
+            results.append({"path": path, "status": 404, "body": {"detail": detail}})
+    return results
+
+def batch_response(response: Response, resource: str, rows: List[Any]) -> Response:
+    """Serialize detail rows with the pre-built adapter, keeping headers set on `response`."""
+    adapter = LIST_ADAPTERS[resource]
+    body = adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+    batched = Response(content=body, media_type="application/json")
+    batched.raw_headers.extend(response.raw_headers)
+    return batched
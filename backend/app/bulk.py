@@ -0,0 +1,264 @@
+"""Streaming bulk import of movie catalogs from NDJSON or CSV.
+
+Records name their director, actors and genres instead of referencing ids.
+Names are resolved through in-memory maps that are filled on demand from the
+database (one ``IN`` query per batch for names not seen yet); unknown names
+are created. Movies and association rows go in with Core ``executemany``
+inserts, one transaction per batch, so memory stays bounded by the batch size
+plus the name maps.
+
+New rows get their ids assigned here rather than read back with RETURNING:
+SQLite cannot guarantee the order of a multi-row RETURNING, so SQLAlchemy
+would fall back to one INSERT per row. Each batch first takes the database
+write lock, which makes ``MAX(id) + 1`` safe to allocate from.
+
+NDJSON, one object per line::
+
+    {"title": "Heat", "release_year": 1995, "director": "Michael Mann",
+     "actors": ["Al Pacino", "Robert De Niro"], "genres": ["Crime"]}
+
+CSV with a header row; ``actors`` and ``genres`` are ``|``-separated::
+
+    title,release_year,synopsis,duration,director,actors,genres
+    Heat,1995,,170,Michael Mann,Al Pacino|Robert De Niro,Crime
+"""
+import codecs
+import csv
+import json
+import time
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from . import events, models, schemas
+
+BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 20
+
+FORMATS = ("ndjson", "csv")
+LIST_SEPARATOR = "|"
+
+class RecordParser:
+    """Incremental NDJSON/CSV parser yielding ``(line, record, error)`` tuples.
+
+    `feed` can be called repeatedly with consecutive chunks of lines (as they
+    arrive from a request body); a CSV header is remembered between chunks.
+    A malformed line yields an error instead of stopping the import.
+    """
+
+    def __init__(self, fmt: str):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format {fmt!r}, expected one of {FORMATS}")
+        self.fmt = fmt
+        self.header: Optional[List[str]] = None
+        self.line = 0
+
+    def feed(self, lines: Iterable[str]) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+        if self.fmt == "ndjson":
+            yield from self._feed_ndjson(lines)
+        else:
+            yield from self._feed_csv(lines)
+
+    def _feed_ndjson(self, lines):
+        for text in lines:
+            self.line += 1
+            text = text.strip()
+            if not text:
+                continue
+            try:
+                record = json.loads(text)
+            except ValueError as e:
+                yield self.line, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield self.line, None, "Expected a JSON object"
+                continue
+            yield self.line, record, None
+
+    def _feed_csv(self, lines):
+        offset = self.line
+        reader = csv.reader(lines)
+        for row in reader:
+            self.line = offset + reader.line_num
+            if not row:
+                continue
+            if self.header is None:
+                self.header = [name.strip() for name in row]
+                continue
+            record = {name: value for name, value in zip(self.header, row) if value != ""}
+            for name in ("actors", "genres"):
+                if name in record:
+                    record[name] = [part.strip() for part in record[name].split(LIST_SEPARATOR) if part.strip()]
+            yield self.line, record, None
+
+def lock_for_write(db: Session) -> None:
+    """Take the SQLite write lock for the current transaction.
+
+    A write statement that matches no rows is enough: SQLite acquires the
+    RESERVED lock when the statement starts, and holds it until commit.
+    """
+    db.execute(delete(models.Movie.__table__).where(False))
+
+def allocate_ids(db: Session, table, count: int) -> range:
+    """Reserve `count` consecutive ids in `table`; requires `lock_for_write`."""
+    start = db.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar_one() + 1
+    return range(start, start + count)
+
+class NameResolver:
+    """Map names to ids for one table, creating rows for names not found."""
+
+    def __init__(self, model):
+        self.model = model
+        self.ids: Dict[str, int] = {}
+        self.created = 0
+
+    def resolve(self, db: Session, names: Iterable[str]) -> None:
+        missing = {name for name in names if name not in self.ids}
+        if not missing:
+            return
+        for row_id, name in db.execute(
+            select(self.model.id, self.model.name)
+            .where(self.model.name.in_(missing))
+            .order_by(self.model.id.desc())
+        ):
+            # Lowest id wins when names are duplicated
+            self.ids[name] = row_id
+        missing -= self.ids.keys()
+        if missing:
+            ordered = sorted(missing)
+            table = self.model.__table__
+            ids = allocate_ids(db, table, len(ordered))
+            db.execute(insert(table), [
+                {"id": row_id, "name": name} for row_id, name in zip(ids, ordered)
+            ])
+            self.ids.update(zip(ordered, ids))
+            self.created += len(ordered)
+
+class BulkImporter:
+    """Buffer validated records and write them in batched transactions."""
+
+    def __init__(self, db: Session, batch_size: int = BATCH_SIZE,
+                 on_batch: Optional[Callable[["BulkImporter"], None]] = None):
+        self.db = db
+        self.batch_size = batch_size
+        self.on_batch = on_batch
+        self.directors = NameResolver(models.Director)
+        self.actors = NameResolver(models.Actor)
+        self.genres = NameResolver(models.Genre)
+        self.batch: List[schemas.BulkMovie] = []
+        self.imported = 0
+        self.rejected = 0
+        self.errors: List[dict] = []
+        self.started = time.perf_counter()
+
+    def add(self, line: int, record: Optional[dict], error: Optional[str] = None) -> None:
+        """Validate and buffer one parsed record, flushing when the batch is full."""
+        if error is None:
+            try:
+                self.batch.append(schemas.BulkMovie.model_validate(record))
+            except ValidationError as e:
+                error = e.errors(include_url=False)
+        if error is not None:
+            self.rejected += 1
+            if len(self.errors) < MAX_REPORTED_ERRORS:
+                self.errors.append({"line": line, "error": error})
+            return
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.batch:
+            return
+        db, batch = self.db, self.batch
+        self.batch = []
+        try:
+            lock_for_write(db)
+            self.directors.resolve(db, {m.director for m in batch if m.director})
+            self.actors.resolve(db, {name for m in batch for name in m.actors})
+            self.genres.resolve(db, {name for m in batch for name in m.genres})
+
+            movies = models.Movie.__table__
+            movie_ids = allocate_ids(db, movies, len(batch))
+            db.execute(insert(movies), [{
+                "id": movie_id,
+                "title": m.title,
+                "release_year": m.release_year,
+                "synopsis": m.synopsis,
+                "duration": m.duration,
+                "director_id": self.directors.ids.get(m.director) if m.director else None,
+            } for movie_id, m in zip(movie_ids, batch)])
+
+            cast = {
+                (movie_id, self.actors.ids[name])
+                for movie_id, m in zip(movie_ids, batch) for name in m.actors
+            }
+            genres = {
+                (movie_id, self.genres.ids[name])
+                for movie_id, m in zip(movie_ids, batch) for name in m.genres
+            }
+            if cast:
+                db.execute(insert(models.movie_actors), [
+                    {"movie_id": movie_id, "actor_id": actor_id} for movie_id, actor_id in cast
+                ])
+            if genres:
+                db.execute(insert(models.movie_genres), [
+                    {"movie_id": movie_id, "genre_id": genre_id} for movie_id, genre_id in genres
+                ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Ids resolved inside the failed transaction no longer exist
+            for resolver in (self.directors, self.actors, self.genres):
+                resolver.ids.clear()
+            raise
+        self.imported += len(batch)
+        if self.on_batch is not None:
+            self.on_batch(self)
+
+    def rate(self) -> Optional[float]:
+        """Imported rows per second so far."""
+        seconds = time.perf_counter() - self.started
+        return round(self.imported / seconds, 1) if seconds > 0 else None
+
+    def finish(self) -> dict:
+        self.flush()
+        seconds = time.perf_counter() - self.started
+        # Reaches this process only; servers elsewhere (an import run from the
+        # CLI) notice the new rows through catalog_versions, see app/versions.py
+        if self.imported:
+            events.publish(events.CATALOG_BULK_LOADED, self.imported)
+        return {
+            "imported": self.imported,
+            "rejected": self.rejected,
+            "directors_created": self.directors.created,
+            "actors_created": self.actors.created,
+            "genres_created": self.genres.created,
+            "seconds": round(seconds, 3),
+            "rows_per_second": self.rate(),
+            "errors": self.errors,
+        }
+
+def import_lines(db: Session, lines: Iterable[str], fmt: str = "ndjson",
+                 batch_size: int = BATCH_SIZE,
+                 on_batch: Optional[Callable[[BulkImporter], None]] = None) -> dict:
+    """Import an iterable of text lines (e.g. an open file) and return the report."""
+    importer = BulkImporter(db, batch_size=batch_size, on_batch=on_batch)
+    for line, record, error in RecordParser(fmt).feed(lines):
+        importer.add(line, record, error)
+    return importer.finish()
+
+async def iter_line_chunks(chunks: AsyncIterator[bytes], encoding: str = "utf-8") -> AsyncIterator[List[str]]:
+    """Split a byte stream into lists of complete lines, one list per chunk."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        if lines:
+            yield lines
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield [pending]
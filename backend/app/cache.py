@@ -0,0 +1,267 @@
+"""Bounded LRU/TTL cache of serialized GET responses.
+
+Routers opt in with ``APIRouter(route_class=CachedRoute)``. A hit replays the
+stored JSON bytes without opening a database session or running Pydantic.
+Entries are keyed on the request path plus its normalized query string and
+remember the route name and parameters they were built from, so the write
+events published by `crud` can evict exactly the entries a new row can
+appear in. A miss for a key that is already being computed waits for that
+computation instead of running its own (see app/coalesce.py).
+
+Other workers' writes publish no events here, so the whole cache is dropped
+when `versions.catalog_watcher` sees the catalog versions move on without
+them. Hits poll the versions at most every ``VERSION_POLL_SECONDS``, which
+bounds how long another process's write can go unseen.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+from . import events
+from .coalesce import single_flight
+from .etag import if_none_match, not_modified_response
+from .metrics import InstrumentedRoute, current_stats
+from .versions import catalog_watcher
+
+CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+
+CACHE_STATUS_HEADER = "X-Cache"
+
+# Response headers that are replayed on a hit (besides the content type)
+REPLAYED_HEADERS = ("x-next-cursor", "etag", "cache-control")
+
+class CacheEntry:
+    __slots__ = ("route", "path_params", "params", "body", "headers", "expires_at")
+
+    def __init__(self, route: str, path_params: Dict[str, str], params: Dict[str, str],
+                 body: bytes, headers: Dict[str, str], expires_at: float):
+        self.route = route
+        self.path_params = path_params
+        self.params = params
+        self.body = body
+        self.headers = headers
+        self.expires_at = expires_at
+
+class ResponseCache:
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS,
+                 enabled: bool = CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries: "OrderedDict[Tuple, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a response computed across an
+        # invalidation is not stored because it may predate the write.
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Tuple) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key: Tuple, entry: CacheEntry, generation: int) -> None:
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, stale: Callable[[CacheEntry], bool]) -> int:
+        """Drop every entry for which `stale(entry)` is true."""
+        with self._lock:
+            self.generation += 1
+            keys = [key for key, entry in self._entries.items() if stale(entry)]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        self.invalidate(lambda entry: True)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+response_cache = ResponseCache()
+
+def normalized_params(request: Request) -> Dict[str, str]:
+    """Query parameters with empty values dropped, as a plain dict."""
+    return {name: value for name, value in request.query_params.multi_items() if value != ""}
+
+class CachedRoute(InstrumentedRoute):
+    """Route class that serves GET responses from `response_cache`."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        if "GET" not in self.methods:
+            return handler
+
+        async def cached_handler(request: Request) -> Response:
+            params = normalized_params(request)
+            key = (request.url.path, tuple(sorted(params.items())))
+            if response_cache.enabled:
+                entry = response_cache.get(key)
+                if entry is not None and catalog_watcher.poll_due():
+                    # May drop the cache if another process has written since
+                    await catalog_watcher.poll()
+                    entry = response_cache.get(key)
+                if entry is not None:
+                    etag = entry.headers.get("etag")
+                    if etag and if_none_match(request, etag):
+                        return not_modified_response(etag, entry.headers.get("cache-control", ""))
+                    return Response(content=entry.body, headers={**entry.headers, CACHE_STATUS_HEADER: "HIT"})
+
+            generation = response_cache.generation
+            if "if-none-match" in request.headers:
+                response, shared = await handler(request), False
+            else:
+                # Identical requests already being computed share that result
+                response, shared = await single_flight.do(key, generation, lambda: handler(request))
+            if shared:
+                stats = current_stats()
+                if stats is not None:
+                    stats.coalesced = True
+                response.headers[CACHE_STATUS_HEADER] = "COALESCED"
+                return response
+            if not response_cache.enabled:
+                return response
+
+            # Streamed bodies (exports) are never held in memory, so never cached
+            if response.status_code == 200 and not isinstance(response, StreamingResponse):
+                headers = {
+                    name: value for name, value in response.headers.items()
+                    if name == "content-type" or name in REPLAYED_HEADERS
+                }
+                response_cache.set(key, CacheEntry(
+                    self.name, dict(request.path_params), params, response.body, headers,
+                    time.monotonic() + response_cache.ttl,
+                ), generation)
+            response.headers[CACHE_STATUS_HEADER] = "MISS"
+            return response
+
+        return cached_handler
+
+# Invalidation
+
+def _matches(params: Dict[str, str], name: str, values: Iterable[int]) -> bool:
+    """True if the entry's `name` filter is unset or selects one of `values`."""
+    value = params.get(name)
+    if value is None:
+        return True
+    try:
+        return int(value) in values
+    except ValueError:
+        return True
+
+def _path_id(entry: CacheEntry, name: str) -> Optional[int]:
+    try:
+        return int(entry.path_params[name])
+    except (KeyError, ValueError):
+        return None
+
+def _batch_ids(entry: CacheEntry) -> Optional[Set[int]]:
+    """The ids of an ``ids=`` batch lookup, or None for a plain list."""
+    value = entry.params.get("ids")
+    if value is None:
+        return None
+    try:
+        return {int(part) for part in value.split(",") if part.strip()}
+    except ValueError:
+        return set()
+
+# Dashboard counters, all moved by any new movie
+STATS_ROUTES = ("read_genre_stats", "read_year_stats", "read_director_stats", "read_actor_stats")
+
+def _on_genre_created(genre) -> None:
+    # The genre breakdown lists every genre, with or without movies
+    response_cache.invalidate(lambda entry: entry.route in ("read_genres", "read_genre_stats"))
+
+def _on_director_created(director) -> None:
+    response_cache.invalidate(lambda entry: entry.route in ("read_directors", "search", "read_autocomplete"))
+
+def _on_actor_created(actor) -> None:
+    # A new actor has no movies yet, so only unfiltered actor lists change
+    response_cache.invalidate(lambda entry: entry.route in ("search", "read_autocomplete") or (
+        entry.route == "read_actors"
+        and "movie_id" not in entry.params and "genre_id" not in entry.params
+    ))
+
+def _on_movie_created(movie) -> None:
+    genre_ids = {genre.id for genre in movie.genres}
+    actor_ids = {actor.id for actor in movie.actors}
+
+    def stale(entry: CacheEntry) -> bool:
+        ids = _batch_ids(entry)
+        if ids is not None:
+            # Batch lookups hold full details: the new movie itself, or its cast's filmographies
+            if entry.route == "read_movies":
+                return movie.id in ids
+            if entry.route == "read_actors":
+                return bool(ids & actor_ids)
+        if entry.route == "read_movies":
+            return (
+                _matches(entry.params, "genre_id", genre_ids)
+                and _matches(entry.params, "director_id", {movie.director_id})
+                and _matches(entry.params, "actor_id", actor_ids)
+                and _matches(entry.params, "release_year", {movie.release_year})
+            )
+        if entry.route == "read_actors":
+            # No new actors, but filtered lists can gain this movie's cast
+            filtered = "movie_id" in entry.params or "genre_id" in entry.params
+            return filtered and bool(actor_ids) and (
+                _matches(entry.params, "movie_id", {movie.id})
+                and _matches(entry.params, "genre_id", genre_ids)
+            )
+        if entry.route == "read_actor":
+            return _path_id(entry, "actor_id") in actor_ids
+        if entry.route == "read_director":
+            return _path_id(entry, "director_id") == movie.director_id
+        if entry.route == "read_collaborators":
+            return _path_id(entry, "actor_id") in actor_ids
+        # Facet counts cover the whole catalog, any movie may gain a related one,
+        # any path may get shorter and film counts rank autocomplete
+        return entry.route in ("search", "read_autocomplete", "read_movie_facets", "read_related_movies", "read_actor_path") + STATS_ROUTES
+
+    response_cache.invalidate(stale)
+
+events.subscribe(events.GENRE_CREATED, _on_genre_created)
+events.subscribe(events.DIRECTOR_CREATED, _on_director_created)
+events.subscribe(events.ACTOR_CREATED, _on_actor_created)
+events.subscribe(events.MOVIE_CREATED, _on_movie_created)
+events.subscribe(events.CATALOG_BULK_LOADED, lambda count: response_cache.clear())
+events.subscribe(events.CATALOG_CHANGED, lambda versions: response_cache.clear())
@@ -0,0 +1,154 @@
+"""Incremental change feed for replication and cache warming.
+
+Triggers append a row to ``catalog_changes`` on every insert, update or
+delete of a movie, actor, director or genre, and on every insert or delete
+of a movie's cast or genre link (``movie_actors``, ``movie_genres``), in the
+writing transaction and whichever code path made it (``crud.create_*``, the
+bulk importer, seeding or manual SQL). A link change carries the movie's id
+as ``id`` and the actor's or genre's as ``ref_id``; links have no version.
+SQLite runs one writer at a time, so ``seq`` order is commit order: a
+consumer that has applied everything up to ``seq`` N never misses a change
+by asking for ``since=N`` next.
+
+``GET /api/changes?since=N`` returns the changes after N. With ``wait`` the
+request long-polls: it is held open until a write lands or the wait runs
+out. Writes made by this process wake waiters at once through `events`;
+writes from other processes are picked up by re-checking every
+`POLL_SECONDS`.
+
+A replica bootstraps by reading ``head_seq``, taking an export
+(``GET /api/movies/export``) and then following the feed from that seq;
+changes replayed over the export are idempotent by entity id and version.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, List, Set, Tuple
+
+from sqlalchemy import event, func, select, text
+
+from . import events, models
+from .database import Base
+
+CHANGES_TABLE = "catalog_changes"
+TRACKED_ENTITIES = ("genres", "directors", "actors", "movies")
+# (association table, column logged as ref_id); movie_id is logged as entity_id
+TRACKED_ASSOCIATIONS = (("movie_actors", "actor_id"), ("movie_genres", "genre_id"))
+
+DEFAULT_CHANGES_LIMIT = 500
+MAX_CHANGES_LIMIT = 5000
+MAX_WAIT_SECONDS = 30
+# How often a long poll re-reads the log for writes from other processes
+POLL_SECONDS = 1.0
+
+def create_change_triggers(connection) -> None:
+    """Install the change log triggers (idempotent)."""
+    for table in TRACKED_ENTITIES:
+        for op, row in (("insert", "new"), ("update", "new"), ("delete", "old")):
+            connection.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_change_{op} AFTER {op.upper()} ON {table} BEGIN "
+                f"INSERT INTO {CHANGES_TABLE} (entity, entity_id, op, version, changed_at) "
+                f"VALUES ('{table}', {row}.id, '{op}', {row}.version, CURRENT_TIMESTAMP); END"
+            ))
+
+def drop_change_triggers(connection) -> None:
+    for table in TRACKED_ENTITIES:
+        for op in ("insert", "update", "delete"):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {table}_change_{op}"))
+
+def create_association_change_triggers(connection) -> None:
+    """Log movie_actors and movie_genres inserts and deletes (idempotent)."""
+    for table, ref in TRACKED_ASSOCIATIONS:
+        for op, row in (("insert", "new"), ("delete", "old")):
+            connection.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_change_{op} AFTER {op.upper()} ON {table} BEGIN "
+                f"INSERT INTO {CHANGES_TABLE} (entity, entity_id, ref_id, op, changed_at) "
+                f"VALUES ('{table}', {row}.movie_id, {row}.{ref}, '{op}', CURRENT_TIMESTAMP); END"
+            ))
+
+def drop_association_change_triggers(connection) -> None:
+    for table, _ in TRACKED_ASSOCIATIONS:
+        for op in ("insert", "delete"):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {table}_change_{op}"))
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_on_metadata_create(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        create_change_triggers(connection)
+        create_association_change_triggers(connection)
+
+_changes = models.catalog_changes
+
+def changes_statement(since: int, limit: int):
+    return (
+        select(_changes.c.seq, _changes.c.entity, _changes.c.entity_id.label("id"),
+               _changes.c.ref_id, _changes.c.op, _changes.c.version, _changes.c.changed_at)
+        .where(_changes.c.seq > since)
+        .order_by(_changes.c.seq)
+        .limit(limit)
+    )
+
+def head_statement():
+    return select(func.coalesce(func.max(_changes.c.seq), 0))
+
+def feed(rows: List[Any], head: int, since: int) -> dict:
+    """The response body; `last_seq` is the `since` of the next call."""
+    return {
+        "changes": rows,
+        "last_seq": rows[-1].seq if rows else since,
+        "head_seq": head,
+    }
+
+class ChangeNotifier:
+    """Wakes long-polling requests when this process commits a catalog write."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.generation = 0
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    def notify(self, payload: Any = None) -> None:
+        with self._lock:
+            self.generation += 1
+            waiters = list(self._waiters)
+        for loop, woken in waiters:
+            try:
+                loop.call_soon_threadsafe(woken.set)
+            except RuntimeError:
+                # The waiter's loop has already closed
+                pass
+
+    async def wait(self, generation: int, timeout: float) -> None:
+        """Return once a write newer than `generation` is notified, or after `timeout` seconds."""
+        woken = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), woken)
+        with self._lock:
+            if self.generation != generation:
+                return
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(woken.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+notifier = ChangeNotifier()
+
+for _event in (events.GENRE_CREATED, events.DIRECTOR_CREATED, events.ACTOR_CREATED,
+               events.MOVIE_CREATED, events.CATALOG_BULK_LOADED):
+    events.subscribe(_event, notifier.notify)
+
+async def long_poll(fetch: Callable[[], Awaitable[Tuple[List[Any], int]]],
+                    wait: float) -> Tuple[List[Any], int]:
+    """Call `fetch` until it returns changes or `wait` seconds have passed."""
+    deadline = time.monotonic() + wait
+    while True:
+        # Read the generation first so a write landing during the fetch still wakes us
+        generation = notifier.generation
+        rows, head = await fetch()
+        remaining = deadline - time.monotonic()
+        if rows or remaining <= 0:
+            return rows, head
+        await notifier.wait(generation, min(POLL_SECONDS, remaining))
@@ -0,0 +1,109 @@
+"""Single-flight coalescing of identical concurrent GET requests.
+
+When many clients ask for the same thing at once (a movie page going viral),
+only the first request runs the handler; the others arriving while it is in
+flight wait for it and get a copy of its status, headers and body, without
+opening a session or running a query. Requests are identical when they have
+the same path and normalized query string, the same key `CachedRoute` uses
+for the response cache, so coalescing covers sync and async handlers alike
+and works with the cache disabled.
+
+Two rules keep shared responses as fresh as their own would have been:
+
+- a request only joins a flight started under the current cache
+  generation, so nothing that arrives after a write commits (and its
+  event is published) is answered with data read before it;
+- conditional requests (``If-None-Match``) never lead or join, since their
+  answer may be a 304 of their own.
+
+Streamed responses are not shared; waiting requests run the handler
+themselves. Flights are held in `concurrent.futures` futures, so waiters
+on any event loop or thread can be woken.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+
+COALESCE_ENABLED = os.getenv("COALESCE_ENABLED", "1") == "1"
+
+class SharedResponse:
+    """A response as the leader built it, replayable for each waiter."""
+    __slots__ = ("status_code", "body", "raw_headers")
+
+    def __init__(self, response: Response):
+        self.status_code = response.status_code
+        self.body = response.body
+        self.raw_headers: List[Tuple[bytes, bytes]] = list(response.raw_headers)
+
+    def replay(self) -> Response:
+        response = Response(content=self.body, status_code=self.status_code)
+        response.raw_headers = list(self.raw_headers)
+        return response
+
+class Flight:
+    __slots__ = ("generation", "future")
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        # Resolves to a SharedResponse, or None when waiters must run the handler themselves
+        self.future: Future = Future()
+
+class SingleFlight:
+    def __init__(self, enabled: bool = COALESCE_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, generation: int,
+                 compute: Callable[[], Awaitable[Response]]) -> Tuple[Response, bool]:
+        """Run `compute`, or share the result of an identical one in flight; True if shared."""
+        if not self.enabled:
+            return await compute(), False
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None or flight.generation != generation
+            if leader:
+                flight = self._flights[key] = Flight(generation)
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            shared: Optional[SharedResponse] = await asyncio.wrap_future(flight.future)
+            if shared is None:
+                return await compute(), False
+            return shared.replay(), True
+
+        try:
+            response = await compute()
+        except Exception as exc:
+            # Waiters raise the same error (a 404, say) as if they had run the handler
+            flight.future.set_exception(exc)
+            raise
+        except BaseException:
+            flight.future.set_result(None)
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+        flight.future.set_result(None if isinstance(response, StreamingResponse) else SharedResponse(response))
+        return response, False
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "in_flight": len(self._flights),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+            }
+
+single_flight = SingleFlight()
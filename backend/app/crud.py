@@ -1,7 +1,53 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional
-from . import models, schemas
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import Row, and_, or_, select
+from typing import Any, List, Optional, Tuple
+from . import batch, changes, events, fts, models, schemas, stats
+from .autocomplete import autocomplete_index
+from .batch import BatchLoader
+from .facets import FacetPage, FacetQuery, facet_index
+from .fields import Selection
+from .graph import ActorPath, actor_graph
+from .related import RelatedMovie, related_index
+from .versions import catalog_watcher
+from .pagination import keyset, parse_sort
+
+# Loading strategies
+# Eager-load options for each response schema, so serializing a result never
+# falls back to one lazy SELECT per row. Many-to-one relations are joined in,
+# collections are fetched with a single extra "IN" query per relationship.
+LOADING_STRATEGIES = {
+    schemas.MovieSummary: (
+        joinedload(models.Movie.director),
+    ),
+    schemas.Movie: (
+        joinedload(models.Movie.director),
+        selectinload(models.Movie.actors),
+        selectinload(models.Movie.genres),
+    ),
+    schemas.ActorWithMovies: (
+        selectinload(models.Actor.movies).joinedload(models.Movie.director),
+    ),
+    schemas.DirectorWithMovies: (
+        selectinload(models.Director.movies).joinedload(models.Movie.director),
+    ),
+}
+
+def loading_options(schema) -> tuple:
+    """Return the loader options needed to serialize rows into `schema`."""
+    return LOADING_STRATEGIES.get(schema, ())
+
+# Sortable columns for keyset-paginated listings; the primary key breaks ties.
+# Movie lists are read from the denormalized listing table.
+MOVIE_SORT_COLUMNS = {
+    "title": models.MovieListing.title,
+    "release_year": models.MovieListing.release_year,
+    "id": models.MovieListing.id,
+}
+
+ACTOR_SORT_COLUMNS = {
+    "name": models.Actor.name,
+    "id": models.Actor.id,
+}
 
 # Genre CRUD
 def get_genres(db: Session) -> List[models.Genre]:
@@ -10,88 +56,215 @@ def get_genres(db: Session) -> List[models.Genre]:
 def get_genre(db: Session, genre_id: int) -> Optional[models.Genre]:
     return db.query(models.Genre).filter(models.Genre.id == genre_id).first()
 
-def create_genre(db: Session, genre: schemas.GenreCreate) -> models.Genre:
+def add_genre(db: Session, genre: schemas.GenreCreate) -> models.Genre:
+    """Insert a genre in the session's transaction without committing."""
     db_genre = models.Genre(**genre.dict())
     db.add(db_genre)
-    db.commit()
+    db.flush()
+    return db_genre
+
+def create_genre(db: Session, genre: schemas.GenreCreate) -> models.Genre:
+    before = catalog_watcher.begin_write(db)
+    db_genre = add_genre(db, genre)
+    catalog_watcher.commit(db, before)
     db.refresh(db_genre)
+    events.publish(events.GENRE_CREATED, db_genre)
     return db_genre
 
 # Director CRUD
 def get_directors(db: Session) -> List[models.Director]:
     return db.query(models.Director).all()
 
+def director_statement(director_id: int):
+    return (
+        select(models.Director)
+        .options(*loading_options(schemas.DirectorWithMovies))
+        .where(models.Director.id == director_id)
+    )
+
 def get_director(db: Session, director_id: int) -> Optional[models.Director]:
-    return db.query(models.Director).filter(models.Director.id == director_id).first()
+    return db.scalars(director_statement(director_id)).first()
 
-def create_director(db: Session, director: schemas.DirectorCreate) -> models.Director:
+def add_director(db: Session, director: schemas.DirectorCreate) -> models.Director:
+    """Insert a director in the session's transaction without committing."""
     db_director = models.Director(**director.dict())
     db.add(db_director)
-    db.commit()
+    db.flush()
+    return db_director
+
+def create_director(db: Session, director: schemas.DirectorCreate) -> models.Director:
+    before = catalog_watcher.begin_write(db)
+    db_director = add_director(db, director)
+    catalog_watcher.commit(db, before)
     db.refresh(db_director)
+    events.publish(events.DIRECTOR_CREATED, db_director)
     return db_director
 
 # Actor CRUD
-def get_actors(db: Session, movie_id: Optional[int] = None, genre_id: Optional[int] = None) -> List[models.Actor]:
-    query = db.query(models.Actor)
+# Statement builders are shared by the sync functions here and the async
+# ones in crud_async, so both paths issue identical SQL.
+def actors_statement(
+    movie_id: Optional[int] = None,
+    genre_id: Optional[int] = None,
+    sort: str = "id",
+    limit: Optional[int] = None,
+    after: Optional[Tuple[Any, int]] = None,
+    columns: Optional[list] = None
+):
+    # Lean list routes select only the columns of their `fields.Selection`
+    query = select(*columns) if columns else select(models.Actor)
     
+    # Filters are semi-joins ("id IN (SELECT ...)") over the association
+    # indexes, so each actor is returned once however many movies match.
     if movie_id:
-        query = query.join(models.movie_actors).filter(models.movie_actors.c.movie_id == movie_id)
+        query = query.filter(models.Actor.id.in_(
+            select(models.movie_actors.c.actor_id)
+            .where(models.movie_actors.c.movie_id == movie_id)
+        ))
     
     if genre_id:
-        query = query.join(models.movie_actors).join(models.Movie).join(models.movie_genres).filter(
-            models.movie_genres.c.genre_id == genre_id
-        )
+        query = query.filter(models.Actor.id.in_(
+            select(models.movie_actors.c.actor_id)
+            .join(models.movie_genres, models.movie_genres.c.movie_id == models.movie_actors.c.movie_id)
+            .where(models.movie_genres.c.genre_id == genre_id)
+        ))
     
-    return query.all()
+    field, descending = parse_sort(sort)
+    return keyset(query, ACTOR_SORT_COLUMNS[field], models.Actor.id, after, limit, descending)
+
+def get_actors(
+    db: Session,
+    movie_id: Optional[int] = None,
+    genre_id: Optional[int] = None,
+    sort: str = "id",
+    limit: Optional[int] = None,
+    after: Optional[Tuple[Any, int]] = None
+) -> List[models.Actor]:
+    return db.scalars(actors_statement(movie_id, genre_id, sort, limit, after)).all()
+
+def get_actor_rows(
+    db: Session,
+    selection: Selection,
+    movie_id: Optional[int] = None,
+    genre_id: Optional[int] = None,
+    sort: str = "id",
+    limit: Optional[int] = None,
+    after: Optional[Tuple[Any, int]] = None
+) -> List[Row]:
+    """`get_actors` as Core rows holding only `selection`'s columns."""
+    return db.execute(actors_statement(movie_id, genre_id, sort, limit, after, selection.columns)).all()
+
+def actor_statement(actor_id: int):
+    return (
+        select(models.Actor)
+        .options(*loading_options(schemas.ActorWithMovies))
+        .where(models.Actor.id == actor_id)
+    )
 
 def get_actor(db: Session, actor_id: int) -> Optional[models.Actor]:
-    return db.query(models.Actor).filter(models.Actor.id == actor_id).first()
+    return db.scalars(actor_statement(actor_id)).first()
 
-def create_actor(db: Session, actor: schemas.ActorCreate) -> models.Actor:
+def add_actor(db: Session, actor: schemas.ActorCreate) -> models.Actor:
+    """Insert an actor in the session's transaction without committing."""
     db_actor = models.Actor(**actor.dict())
     db.add(db_actor)
-    db.commit()
+    db.flush()
+    return db_actor
+
+def create_actor(db: Session, actor: schemas.ActorCreate) -> models.Actor:
+    before = catalog_watcher.begin_write(db)
+    db_actor = add_actor(db, actor)
+    catalog_watcher.commit(db, before)
     db.refresh(db_actor)
+    events.publish(events.ACTOR_CREATED, db_actor)
     return db_actor
 
 # Movie CRUD
-def get_movies(
-    db: Session, 
+def movies_statement(
     genre_id: Optional[int] = None,
     director_id: Optional[int] = None,
     actor_id: Optional[int] = None,
-    release_year: Optional[int] = None
-) -> List[models.Movie]:
-    query = db.query(models.Movie)
-    
+    release_year: Optional[int] = None,
+    sort: str = "id",
+    limit: Optional[int] = None,
+    after: Optional[Tuple[Any, int]] = None,
+    columns: Optional[list] = None
+):
+    # Rows come from the listing table; director and year are its own indexed
+    # columns, while genre and actor filters are semi-joins over the
+    # association tables' reverse indexes instead of scans of packed lists.
+    listing = models.MovieListing
+    query = select(*columns) if columns else select(listing)
+
     if genre_id:
-        query = query.join(models.movie_genres).filter(models.movie_genres.c.genre_id == genre_id)
-    
+        query = query.filter(listing.id.in_(
+            select(models.movie_genres.c.movie_id)
+            .where(models.movie_genres.c.genre_id == genre_id)
+        ))
+
     if director_id:
-        query = query.filter(models.Movie.director_id == director_id)
-    
+        query = query.filter(listing.director_id == director_id)
+
     if actor_id:
-        query = query.join(models.movie_actors).filter(models.movie_actors.c.actor_id == actor_id)
+        query = query.filter(listing.id.in_(
+            select(models.movie_actors.c.movie_id)
+            .where(models.movie_actors.c.actor_id == actor_id)
+        ))
     
     if release_year:
-        query = query.filter(models.Movie.release_year == release_year)
+        query = query.filter(listing.release_year == release_year)
     
-    return query.all()
+    field, descending = parse_sort(sort)
+    return keyset(query, MOVIE_SORT_COLUMNS[field], listing.id, after, limit, descending)
+
+def get_movies(
+    db: Session, 
+    genre_id: Optional[int] = None,
+    director_id: Optional[int] = None,
+    actor_id: Optional[int] = None,
+    release_year: Optional[int] = None,
+    sort: str = "id",
+    limit: Optional[int] = None,
+    after: Optional[Tuple[Any, int]] = None
+) -> List[models.MovieListing]:
+    return db.scalars(movies_statement(
+        genre_id, director_id, actor_id, release_year, sort, limit, after
+    )).all()
+
+def get_movie_rows(
+    db: Session,
+    selection: Selection,
+    genre_id: Optional[int] = None,
+    director_id: Optional[int] = None,
+    actor_id: Optional[int] = None,
+    release_year: Optional[int] = None,
+    sort: str = "id",
+    limit: Optional[int] = None,
+    after: Optional[Tuple[Any, int]] = None
+) -> List[Row]:
+    """`get_movies` as Core rows holding only `selection`'s columns."""
+    return db.execute(movies_statement(
+        genre_id, director_id, actor_id, release_year, sort, limit, after, selection.columns
+    )).all()
+
+def movie_statement(movie_id: int):
+    return (
+        select(models.Movie)
+        .options(*loading_options(schemas.Movie))
+        .where(models.Movie.id == movie_id)
+    )
 
 def get_movie(db: Session, movie_id: int) -> Optional[models.Movie]:
-    return db.query(models.Movie).filter(models.Movie.id == movie_id).first()
+    return db.scalars(movie_statement(movie_id)).first()
 
-def create_movie(db: Session, movie: schemas.MovieCreate) -> models.Movie:
+def add_movie(db: Session, movie: schemas.MovieCreate) -> models.Movie:
+    """Insert a movie and its cast and genre links without committing."""
     # Create movie without relationships first
     movie_data = movie.dict()
     actor_ids = movie_data.pop('actor_ids', [])
     genre_ids = movie_data.pop('genre_ids', [])
     
     db_movie = models.Movie(**movie_data)
-    db.add(db_movie)
-    db.commit()
-    db.refresh(db_movie)
     
     # Add actor relationships
     if actor_ids:
@@ -103,6 +276,179 @@ def create_movie(db: Session, movie: schemas.MovieCreate) -> models.Movie:
         genres = db.query(models.Genre).filter(models.Genre.id.in_(genre_ids)).all()
         db_movie.genres = genres
     
-    db.commit()
-    db.refresh(db_movie)
-    return db_movie 
\ No newline at end of file
+    db.add(db_movie)
+    db.flush()
+    return db_movie
+
+def create_movie(db: Session, movie: schemas.MovieCreate) -> models.Movie:
+    # One transaction, so no reader (or change feed consumer) sees the movie without its cast
+    before = catalog_watcher.begin_write(db)
+    db_movie = add_movie(db, movie)
+    catalog_watcher.commit(db, before)
+    # Reload with the detail strategy so the response serializes without lazy loads
+    db_movie = get_movie(db, db_movie.id)
+    events.publish(events.MOVIE_CREATED, db_movie)
+    return db_movie 
+
+# Faceted search
+def listings_statement(movie_ids: List[int]):
+    return select(models.MovieListing).where(models.MovieListing.id.in_(movie_ids))
+
+def order_by_ids(rows, movie_ids: List[int]) -> list:
+    """Put hydrated rows back in the order of `movie_ids`."""
+    by_id = {row.id: row for row in rows}
+    return [by_id[movie_id] for movie_id in movie_ids if movie_id in by_id]
+
+def facet_search(
+    db: Session,
+    query: FacetQuery,
+    sort: str = "id",
+    limit: int = 50,
+    after: Optional[Tuple[Any, int]] = None
+) -> Tuple[List[models.MovieListing], FacetPage]:
+    """Filter and count in the facet index, then load the page's listings in one query."""
+    facet_index.ensure_loaded(db)
+    page = facet_index.search(query, sort, limit, after)
+    if not page.ids:
+        return [], page
+    return order_by_ids(db.scalars(listings_statement(page.ids)), page.ids), page
+
+# Batch lookups
+def batch_statement(resource: str, ids: List[int]):
+    """One eager-loading IN query for a `batch.RESOURCES` entity type."""
+    model, schema = batch.RESOURCES[resource]
+    return select(model).options(*loading_options(schema)).where(model.id.in_(ids))
+
+def load_batch(db: Session, loader: BatchLoader) -> None:
+    """Fill `loader` with one query per requested entity type."""
+    for resource, ids in loader.wanted():
+        loader.fill(resource, db.scalars(batch_statement(resource, ids)))
+
+def get_by_ids(db: Session, resource: str, ids: List[int]) -> list:
+    """Detail rows for `ids`, in that order; missing ids are skipped."""
+    loader = BatchLoader()
+    loader.want(resource, ids)
+    load_batch(db, loader)
+    return loader.get(resource, ids)
+
+# Related movies and collaborators
+def actors_by_id_statement(actor_ids: List[int]):
+    return select(models.Actor).where(models.Actor.id.in_(actor_ids))
+
+def related_results(movie_id: int, rows, related: List[RelatedMovie]) -> Optional[List[dict]]:
+    """Pair scores with hydrated listings; None if `movie_id` itself was not loaded."""
+    by_id = {row.id: row for row in rows}
+    if movie_id not in by_id:
+        return None
+    return [
+        {"movie": by_id[r.movie_id], "score": r.score, "shared_actors": r.shared_actors,
+         "shared_genres": r.shared_genres, "same_director": r.same_director}
+        for r in related if r.movie_id in by_id
+    ]
+
+def collaborator_results(actor_id: int, rows, collaborators: List[Tuple[int, int]]) -> Optional[List[dict]]:
+    by_id = {row.id: row for row in rows}
+    if actor_id not in by_id:
+        return None
+    return [
+        {"actor": by_id[other], "shared_movies": shared}
+        for other, shared in collaborators if other in by_id
+    ]
+
+def get_related_movies(db: Session, movie_id: int, limit: int = 10) -> Optional[List[dict]]:
+    """Top related movies from the co-occurrence index, or None if the movie does not exist."""
+    related_index.ensure_loaded(db)
+    related = related_index.related(movie_id, limit)
+    rows = db.scalars(listings_statement([movie_id] + [r.movie_id for r in related]))
+    return related_results(movie_id, rows, related)
+
+def get_collaborators(db: Session, actor_id: int, limit: int = 10) -> Optional[List[dict]]:
+    """Top co-stars by shared movies, or None if the actor does not exist."""
+    related_index.ensure_loaded(db)
+    collaborators = related_index.collaborators(actor_id, limit)
+    rows = db.scalars(actors_by_id_statement([actor_id] + [other for other, _ in collaborators]))
+    return collaborator_results(actor_id, rows, collaborators)
+
+# Degrees of separation
+def path_results(source: int, target: int, actor_rows, movie_rows, path: Optional[ActorPath]) -> Optional[dict]:
+    """Hydrate a path's ids; None if either endpoint actor does not exist."""
+    actors = {row.id: row for row in actor_rows}
+    if source not in actors or target not in actors:
+        return None
+    if path is None:
+        return {"degrees": None, "actors": [], "movies": []}
+    movies = {row.id: row for row in movie_rows}
+    return {
+        "degrees": path.degrees,
+        "actors": [actors[actor_id] for actor_id in path.actors],
+        "movies": [movies[movie_id] for movie_id in path.movies],
+    }
+
+def get_actor_path(db: Session, source: int, target: int, max_degrees: int) -> Optional[dict]:
+    """Shortest chain of movies linking two actors, or None if either does not exist."""
+    actor_graph.ensure_loaded(db)
+    path = actor_graph.shortest_path(source, target, max_degrees)
+    actor_rows = db.scalars(actors_by_id_statement([source, target] + (path.actors if path else [])))
+    movie_rows = db.scalars(listings_statement(path.movies)) if path and path.movies else []
+    return path_results(source, target, actor_rows, movie_rows, path)
+
+# Change feed
+def get_changes(db: Session, since: int, limit: int) -> Tuple[List[Row], int]:
+    """Changes after `since` and the newest seq in the log. The session's
+    transaction is ended first, so each poll sees commits made since the last."""
+    db.rollback()
+    rows = db.execute(changes.changes_statement(since, limit)).all()
+    return rows, db.execute(changes.head_statement()).scalar_one()
+
+# Statistics
+def get_genre_stats(db: Session) -> List[Row]:
+    return db.execute(stats.genre_stats_statement()).all()
+
+def get_year_stats(db: Session) -> List[Row]:
+    return db.execute(stats.year_stats_statement()).all()
+
+def get_top_stats(db: Session, dimension: str, limit: int) -> List[Row]:
+    """The directors or actors with the most movies."""
+    return db.execute(stats.top_statement(dimension, limit)).all()
+
+# Search
+def search(
+    db: Session,
+    q: str,
+    kind: Optional[str] = None,
+    prefix: bool = True,
+    limit: int = 10
+) -> List[schemas.SearchResult]:
+    match = fts.match_expression(q, prefix=prefix)
+    if match is None:
+        return []
+
+    hits = db.execute(fts.search_query(kind), {"match": match, "limit": limit}).all()
+
+    # Hydrate display names with one IN query per kind
+    ids_by_kind = {}
+    for rowid, _ in hits:
+        hit_kind, ref_id = fts.split_rowid(rowid)
+        ids_by_kind.setdefault(hit_kind, []).append(ref_id)
+
+    rows = {}
+    if ids_by_kind.get("movie"):
+        for movie in db.query(models.Movie.id, models.Movie.title, models.Movie.release_year).filter(
+            models.Movie.id.in_(ids_by_kind["movie"])
+        ):
+            rows["movie", movie.id] = {"name": movie.title, "release_year": movie.release_year}
+    for hit_kind, model in (("actor", models.Actor), ("director", models.Director)):
+        if ids_by_kind.get(hit_kind):
+            for person in db.query(model.id, model.name).filter(model.id.in_(ids_by_kind[hit_kind])):
+                rows[hit_kind, person.id] = {"name": person.name}
+
+    results = []
+    for rowid, score in hits:
+        key = fts.split_rowid(rowid)
+        if key in rows:
+            results.append(schemas.SearchResult(type=key[0], id=key[1], score=score, **rows[key]))
+    return results
+
+def autocomplete(db: Session, q: str, kind: Optional[str] = None, limit: int = 10) -> List[dict]:
+    autocomplete_index.ensure_loaded(db)
+    return autocomplete_index.complete(q, kind, limit)
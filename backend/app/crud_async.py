@@ -0,0 +1,173 @@
+"""Async counterparts of the read functions in `crud`, for `AsyncSession`.
+
+They execute the same statements `crud` builds, including its eager-loading
+strategies, which async sessions rely on since they cannot lazy-load.
+Writes stay on the sync path in `crud`.
+"""
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, List, Optional, Tuple
+from . import changes, crud, models, schemas, stats
+from .autocomplete import autocomplete_index
+from .batch import BatchLoader
+from .facets import FacetPage, FacetQuery, facet_index
+from .fields import Selection
+from .graph import actor_graph
+from .related import related_index
+
+# Genre reads
+async def get_genres(db: AsyncSession) -> List[models.Genre]:
+    return (await db.scalars(select(models.Genre))).all()
+
+async def get_genre(db: AsyncSession, genre_id: int) -> Optional[models.Genre]:
+    return await db.get(models.Genre, genre_id)
+
+# Director reads
+async def get_directors(db: AsyncSession) -> List[models.Director]:
+    return (await db.scalars(select(models.Director))).all()
+
+async def get_director(db: AsyncSession, director_id: int) -> Optional[models.Director]:
+    return (await db.scalars(crud.director_statement(director_id))).first()
+
+# Actor reads
+async def get_actors(
+    db: AsyncSession,
+    movie_id: Optional[int] = None,
+    genre_id: Optional[int] = None,
+    sort: str = "id",
+    limit: Optional[int] = None,
+    after: Optional[Tuple[Any, int]] = None
+) -> List[models.Actor]:
+    return (await db.scalars(crud.actors_statement(movie_id, genre_id, sort, limit, after))).all()
+
+async def get_actor_rows(
+    db: AsyncSession,
+    selection: Selection,
+    movie_id: Optional[int] = None,
+    genre_id: Optional[int] = None,
+    sort: str = "id",
+    limit: Optional[int] = None,
+    after: Optional[Tuple[Any, int]] = None
+) -> List[Row]:
+    return (await db.execute(crud.actors_statement(
+        movie_id, genre_id, sort, limit, after, selection.columns
+    ))).all()
+
+async def get_actor(db: AsyncSession, actor_id: int) -> Optional[models.Actor]:
+    return (await db.scalars(crud.actor_statement(actor_id))).first()
+
+# Movie reads
+async def get_movies(
+    db: AsyncSession,
+    genre_id: Optional[int] = None,
+    director_id: Optional[int] = None,
+    actor_id: Optional[int] = None,
+    release_year: Optional[int] = None,
+    sort: str = "id",
+    limit: Optional[int] = None,
+    after: Optional[Tuple[Any, int]] = None
+) -> List[models.MovieListing]:
+    return (await db.scalars(crud.movies_statement(
+        genre_id, director_id, actor_id, release_year, sort, limit, after
+    ))).all()
+
+async def get_movie_rows(
+    db: AsyncSession,
+    selection: Selection,
+    genre_id: Optional[int] = None,
+    director_id: Optional[int] = None,
+    actor_id: Optional[int] = None,
+    release_year: Optional[int] = None,
+    sort: str = "id",
+    limit: Optional[int] = None,
+    after: Optional[Tuple[Any, int]] = None
+) -> List[Row]:
+    return (await db.execute(crud.movies_statement(
+        genre_id, director_id, actor_id, release_year, sort, limit, after, selection.columns
+    ))).all()
+
+async def get_movie(db: AsyncSession, movie_id: int) -> Optional[models.Movie]:
+    return (await db.scalars(crud.movie_statement(movie_id))).first()
+
+# Faceted search
+async def facet_search(
+    db: AsyncSession,
+    query: FacetQuery,
+    sort: str = "id",
+    limit: int = 50,
+    after: Optional[Tuple[Any, int]] = None
+) -> Tuple[List[models.MovieListing], FacetPage]:
+    if not facet_index.loaded:
+        await db.run_sync(facet_index.ensure_loaded)
+    page = facet_index.search(query, sort, limit, after)
+    if not page.ids:
+        return [], page
+    return crud.order_by_ids(await db.scalars(crud.listings_statement(page.ids)), page.ids), page
+
+# Batch lookups
+async def load_batch(db: AsyncSession, loader: BatchLoader) -> None:
+    for resource, ids in loader.wanted():
+        loader.fill(resource, await db.scalars(crud.batch_statement(resource, ids)))
+
+async def get_by_ids(db: AsyncSession, resource: str, ids: List[int]) -> list:
+    loader = BatchLoader()
+    loader.want(resource, ids)
+    await load_batch(db, loader)
+    return loader.get(resource, ids)
+
+# Related movies and collaborators
+async def get_related_movies(db: AsyncSession, movie_id: int, limit: int = 10) -> Optional[List[dict]]:
+    if not related_index.loaded:
+        await db.run_sync(related_index.ensure_loaded)
+    related = related_index.related(movie_id, limit)
+    rows = await db.scalars(crud.listings_statement([movie_id] + [r.movie_id for r in related]))
+    return crud.related_results(movie_id, rows, related)
+
+async def get_collaborators(db: AsyncSession, actor_id: int, limit: int = 10) -> Optional[List[dict]]:
+    if not related_index.loaded:
+        await db.run_sync(related_index.ensure_loaded)
+    collaborators = related_index.collaborators(actor_id, limit)
+    rows = await db.scalars(crud.actors_by_id_statement([actor_id] + [other for other, _ in collaborators]))
+    return crud.collaborator_results(actor_id, rows, collaborators)
+
+# Degrees of separation
+async def get_actor_path(db: AsyncSession, source: int, target: int, max_degrees: int) -> Optional[dict]:
+    if not actor_graph.is_current():
+        await db.run_sync(actor_graph.ensure_loaded)
+    path = actor_graph.shortest_path(source, target, max_degrees)
+    actor_rows = await db.scalars(crud.actors_by_id_statement([source, target] + (path.actors if path else [])))
+    movie_rows = await db.scalars(crud.listings_statement(path.movies)) if path and path.movies else []
+    return crud.path_results(source, target, actor_rows, movie_rows, path)
+
+# Search
+async def search(
+    db: AsyncSession,
+    q: str,
+    kind: Optional[str] = None,
+    prefix: bool = True,
+    limit: int = 10
+) -> List[schemas.SearchResult]:
+    # A handful of short statements; reuse the sync implementation on the
+    # session's own connection rather than duplicating the hydration logic.
+    return await db.run_sync(lambda session: crud.search(session, q, kind, prefix, limit))
+
+async def autocomplete(db: AsyncSession, q: str, kind: Optional[str] = None, limit: int = 10) -> List[dict]:
+    if not autocomplete_index.loaded:
+        await db.run_sync(autocomplete_index.ensure_loaded)
+    return autocomplete_index.complete(q, kind, limit)
+
+# Change feed
+async def get_changes(db: AsyncSession, since: int, limit: int) -> Tuple[List[Row], int]:
+    await db.rollback()
+    rows = (await db.execute(changes.changes_statement(since, limit))).all()
+    return rows, (await db.execute(changes.head_statement())).scalar_one()
+
+# Statistics
+async def get_genre_stats(db: AsyncSession) -> List[Row]:
+    return (await db.execute(stats.genre_stats_statement())).all()
+
+async def get_year_stats(db: AsyncSession) -> List[Row]:
+    return (await db.execute(stats.year_stats_statement())).all()
+
+async def get_top_stats(db: AsyncSession, dimension: str, limit: int) -> List[Row]:
+    return (await db.execute(stats.top_statement(dimension, limit))).all()
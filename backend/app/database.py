@@ -1,20 +1,103 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 
-# SQLite database URL
-SQLITE_DATABASE_URL = "sqlite:///./movies.db"
+# SQLite database URL, e.g. sqlite:////app/data/movies.db in the container
+SQLITE_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./movies.db")
+
+# Engine profiles: PRAGMAs applied to every new connection.
+# "production" switches to WAL so readers never block behind a writer, trades
+# per-commit fsync for checkpoint-time fsync, and gives each connection a
+# memory-mapped window and a larger page cache.
+SQLITE_PROFILES = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 268435456,   # 256 MiB
+        "cache_size": -65536,     # 64 MiB (negative = KiB)
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,     # ms
+    },
+}
+
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "default")
+
+# PRAGMAs that write to the database file and must be skipped on read-only connections
+WRITE_PRAGMAS = {"journal_mode"}
+
+def sqlite_pragmas(profile: str = SQLITE_PROFILE) -> dict:
+    """PRAGMAs for `profile`, overridden by SQLITE_PRAGMA_<NAME> environment variables."""
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE {profile!r}, expected one of {sorted(SQLITE_PROFILES)}")
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for key, value in os.environ.items():
+        if key.startswith("SQLITE_PRAGMA_"):
+            pragmas[key[len("SQLITE_PRAGMA_"):].lower()] = value
+    return pragmas
+
+def apply_pragmas(engine, pragmas: dict, read_only: bool = False) -> None:
+    """Run `pragmas` on every connection `engine` opens (sync or async engines)."""
+    if read_only:
+        pragmas = {name: value for name, value in pragmas.items() if name not in WRITE_PRAGMAS}
+        pragmas["query_only"] = 1
+    if not pragmas:
+        return
+
+    @event.listens_for(getattr(engine, "sync_engine", engine), "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+# Connection pool size per engine; connections stay open and keep their page cache
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "5"))
+SQLITE_MAX_OVERFLOW = int(os.getenv("SQLITE_MAX_OVERFLOW", "10"))
+
+def _pool_args(url: str) -> dict:
+    # In-memory databases use a single static connection; sizing does not apply
+    if make_url(url).database in (None, "", ":memory:"):
+        return {}
+    return {"pool_size": SQLITE_POOL_SIZE, "max_overflow": SQLITE_MAX_OVERFLOW}
 
 # Create SQLite engine
 engine = create_engine(
-    SQLITE_DATABASE_URL, 
-    connect_args={"check_same_thread": False}
+    SQLITE_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    **_pool_args(SQLITE_DATABASE_URL)
 )
+apply_pragmas(engine, sqlite_pragmas())
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional read-only pool. With SQLITE_READ_POOL=1 GET routes get sessions from
+# a separate engine opened with mode=ro, so reads never wait for a pooled
+# connection held by a writer (and cannot write by accident).
+SQLITE_READ_POOL = os.getenv("SQLITE_READ_POOL", "0") == "1"
+
+def read_only_url(url: str) -> str:
+    """Rewrite a file SQLite URL to open the same file read-only."""
+    parsed = make_url(url)
+    database = os.path.abspath(parsed.database)
+    return str(parsed.set(database=f"file:{database}", query={"mode": "ro", "uri": "true"}))
+
+if SQLITE_READ_POOL:
+    read_engine = create_engine(
+        read_only_url(SQLITE_DATABASE_URL),
+        connect_args={"check_same_thread": False},
+        **_pool_args(SQLITE_DATABASE_URL)
+    )
+    apply_pragmas(read_engine, sqlite_pragmas(), read_only=True)
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+else:
+    read_engine = engine
+    ReadSessionLocal = SessionLocal
+
 # Create Base class
 Base = declarative_base()
 
@@ -24,4 +107,30 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+# Dependency to get a session for GET routes (the read-only pool when enabled)
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Optional async path (aiosqlite). With DB_ASYNC=1 the GET routes are served by
+# async handlers on AsyncSession instead of sync handlers on the threadpool.
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+ASYNC_SQLITE_DATABASE_URL = SQLITE_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+async_engine = create_async_engine(ASYNC_SQLITE_DATABASE_URL) if DB_ASYNC else None
+if async_engine is not None:
+    apply_pragmas(async_engine, sqlite_pragmas())
+
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False) if DB_ASYNC else None
+
+# Dependency to get an async database session
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("The async database path is disabled; set DB_ASYNC=1")
+    async with AsyncSessionLocal() as db:
+        yield db
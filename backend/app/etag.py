@@ -0,0 +1,105 @@
+"""Conditional GET support: strong ETags from per-table version counters.
+
+Every tracked table has a row in ``catalog_versions`` that triggers bump on
+each write, whichever process or code path made it. A response's ETag is a
+digest of the request URL and the versions of the tables it reads, so it is
+computed with one small query instead of hashing the body, and it changes as
+soon as any of those tables does.
+"""
+import hashlib
+from typing import List, Optional
+
+from fastapi import Depends, Request, Response
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .database import Base, get_async_db, get_read_db
+from .versions import TRACKED_TABLES, VERSION_TABLE, catalog_watcher, versions_statement
+
+# Cache-Control for responses that must be revalidated before every reuse
+REVALIDATE = "no-cache"
+
+class NotModified(Exception):
+    """Raised by `conditional_get` when the client's cached copy is current."""
+
+    def __init__(self, etag: str, cache_control: str):
+        self.etag = etag
+        self.cache_control = cache_control
+
+def create_version_triggers(connection) -> None:
+    """Seed one counter row per tracked table and install the bump triggers (idempotent)."""
+    for table in TRACKED_TABLES:
+        connection.execute(text(
+            f"INSERT OR IGNORE INTO {VERSION_TABLE} (table_name, version) VALUES ('{table}', 0)"
+        ))
+        bump = f"UPDATE {VERSION_TABLE} SET version = version + 1 WHERE table_name = '{table}';"
+        for op in ("INSERT", "UPDATE", "DELETE"):
+            connection.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_version_{op.lower()} "
+                f"AFTER {op} ON {table} BEGIN {bump} END"
+            ))
+
+def drop_version_triggers(connection) -> None:
+    for table in TRACKED_TABLES:
+        for op in ("insert", "update", "delete"):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {table}_version_{op}"))
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_on_metadata_create(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        create_version_triggers(connection)
+
+def compute_etag(request: Request, versions: List[tuple]) -> str:
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(request.url.path.encode())
+    digest.update(str(sorted(request.query_params.multi_items())).encode())
+    digest.update(repr(versions).encode())
+    return f'"{digest.hexdigest()}"'
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match header names `etag` (or is "*")."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+def conditional_get(*tables: str, max_age: Optional[int] = None, use_async: bool = False):
+    """Build a dependency that tags GET responses and answers 304 when possible.
+
+    `tables` are the tables the routes read; `max_age` lets clients and
+    proxies reuse a response for that many seconds without revalidating.
+    With `use_async` the versions are read through the async session.
+    """
+    cache_control = f"public, max-age={max_age}" if max_age else REVALIDATE
+    tables = set(tables)
+
+    def tag(request: Request, response: Response, rows: List[tuple], bind) -> None:
+        # Every table is read, so the same query also tells `catalog_watcher`
+        # about writes from other processes
+        catalog_watcher.observe(rows, bind)
+        # and are kept for the handler, which compares them with the snapshot's
+        request.state.catalog_versions = rows
+        etag = compute_etag(request, [row for row in rows if row[0] in tables])
+        if if_none_match(request, etag):
+            raise NotModified(etag, cache_control)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = cache_control
+
+    if use_async:
+        async def async_dependency(request: Request, response: Response,
+                                   db: AsyncSession = Depends(get_async_db)) -> None:
+            if request.method == "GET":
+                tag(request, response, (await db.execute(versions_statement())).all(), db.bind)
+
+        return async_dependency
+
+    def dependency(request: Request, response: Response, db: Session = Depends(get_read_db)) -> None:
+        if request.method == "GET":
+            tag(request, response, db.execute(versions_statement()).all(), db.get_bind())
+
+    return dependency
+
+def not_modified_response(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
@@ -0,0 +1,32 @@
+"""In-process notifications for catalog writes.
+
+`crud.create_*` publish an event after their transaction commits, and
+in-memory structures (response cache, indexes) subscribe to keep themselves
+current without polling the database. Writes made by other processes arrive
+as ``CATALOG_CHANGED`` once `versions.catalog_watcher` notices them.
+"""
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+
+GENRE_CREATED = "genre_created"
+DIRECTOR_CREATED = "director_created"
+ACTOR_CREATED = "actor_created"
+MOVIE_CREATED = "movie_created"
+# Rows were written outside crud.create_* (bulk import); payload is the row count
+CATALOG_BULK_LOADED = "catalog_bulk_loaded"
+# Another process wrote to the catalog (see app/versions.py); payload is the new versions
+CATALOG_CHANGED = "catalog_changed"
+
+_subscribers: Dict[str, List[Callable[[Any], None]]] = defaultdict(list)
+
+def subscribe(event: str, handler: Callable[[Any], None]) -> None:
+    """Call `handler(payload)` every time `event` is published."""
+    _subscribers[event].append(handler)
+
+def unsubscribe(event: str, handler: Callable[[Any], None]) -> None:
+    if handler in _subscribers[event]:
+        _subscribers[event].remove(handler)
+
+def publish(event: str, payload: Any) -> None:
+    for handler in list(_subscribers[event]):
+        handler(payload)
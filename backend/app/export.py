@@ -0,0 +1,182 @@
+"""Streaming catalog export as NDJSON or CSV.
+
+Rows come from the ``movie_listings`` read model (see app/listings.py),
+which already holds each movie's director, actor and genre ids, so the
+export is read ``ORDER BY id`` from one table, `EXPORT_BATCH_SIZE` rows at
+a time, and each batch is encoded and sent before the next one is read.
+Memory stays flat whatever the catalog size, and nothing goes through
+Pydantic.
+
+How batches are read depends on the journal mode:
+
+- under WAL (``SQLITE_PROFILE=production``) the export is one statement
+  streamed with ``yield_per``: a single consistent snapshot, read while
+  writers carry on;
+- otherwise an open statement holds SQLite's shared lock, which keeps every
+  writer out until it is closed, so each batch is its own keyset query
+  (``id > <last id sent>``) run to completion. Writes commit between
+  batches; the export is then not one snapshot, and a movie written
+  meanwhile is included if its id is past the batches already sent.
+
+Rows are ordered by id, so an interrupted export resumes with
+``after=<last id received>``. Records mirror the import format of
+app/bulk.py with ids in place of names::
+
+    {"id": 1, "title": "Heat", "release_year": 1995, "synopsis": null,
+     "duration": 170, "director_id": 4, "actor_ids": [2, 9], "genre_ids": [3]}
+
+CSV has a header row; ``actor_ids`` and ``genre_ids`` are ``|``-separated.
+
+The request's session stays open while the body streams: FastAPI closes
+``yield`` dependencies only once the response has been sent.
+"""
+import csv
+import io
+import zlib
+from typing import AsyncIterator, Iterable, Iterator, Union
+
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import models
+from .bulk import FORMATS, LIST_SEPARATOR
+from .listings import unpack_ids
+
+# Rows per driver fetch and per encoded chunk
+EXPORT_BATCH_SIZE = 1000
+GZIP_LEVEL = 6
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+COLUMNS = ("id", "title", "release_year", "synopsis", "duration", "director_id", "actor_ids", "genre_ids")
+
+JOURNAL_MODE = text("PRAGMA journal_mode")
+
+_listing = models.MovieListing
+
+def _rows_after(after: int):
+    return (
+        select(_listing.id, _listing.title, _listing.release_year, _listing.synopsis,
+               _listing.duration, _listing.director_id, _listing.actor_ids, _listing.genre_ids)
+        .where(_listing.id > after)
+        .order_by(_listing.id)
+    )
+
+def export_statement(after: int = 0):
+    return _rows_after(after).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+def batch_statement(after: int):
+    return _rows_after(after).limit(EXPORT_BATCH_SIZE)
+
+def streams_snapshot(journal_mode: str) -> bool:
+    """Whether one long read leaves writers unblocked, i.e. the database is in WAL mode."""
+    return journal_mode.lower() == "wal"
+
+class RowEncoder:
+    """Encode batches of export rows as NDJSON or CSV bytes."""
+
+    def __init__(self, fmt: str):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format {fmt!r}, expected one of {FORMATS}")
+        self.fmt = fmt
+
+    def header(self) -> bytes:
+        return ",".join(COLUMNS).encode() + b"\n" if self.fmt == "csv" else b""
+
+    def encode(self, rows) -> bytes:
+        if self.fmt == "ndjson":
+            return b"".join(orjson.dumps({
+                "id": row.id,
+                "title": row.title,
+                "release_year": row.release_year,
+                "synopsis": row.synopsis,
+                "duration": row.duration,
+                "director_id": row.director_id,
+                "actor_ids": unpack_ids(row.actor_ids),
+                "genre_ids": unpack_ids(row.genre_ids),
+            }, option=orjson.OPT_APPEND_NEWLINE) for row in rows)
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows((
+            row.id, row.title, row.release_year, row.synopsis, row.duration, row.director_id,
+            LIST_SEPARATOR.join(map(str, unpack_ids(row.actor_ids))),
+            LIST_SEPARATOR.join(map(str, unpack_ids(row.genre_ids))),
+        ) for row in rows)
+        return buffer.getvalue().encode()
+
+def iter_export(db: Session, fmt: str, after: int = 0) -> Iterator[bytes]:
+    """Yield the export one encoded batch at a time."""
+    encoder = RowEncoder(fmt)
+    header = encoder.header()
+    if header:
+        yield header
+    if not streams_snapshot(db.execute(JOURNAL_MODE).scalar()):
+        while rows := db.execute(batch_statement(after)).all():
+            yield encoder.encode(rows)
+            after = rows[-1].id
+        return
+    result = db.execute(export_statement(after))
+    try:
+        for rows in result.partitions():
+            yield encoder.encode(rows)
+    finally:
+        result.close()
+
+async def aiter_export(db: AsyncSession, fmt: str, after: int = 0) -> AsyncIterator[bytes]:
+    """`iter_export` on an AsyncSession."""
+    encoder = RowEncoder(fmt)
+    header = encoder.header()
+    if header:
+        yield header
+    if not streams_snapshot((await db.execute(JOURNAL_MODE)).scalar()):
+        while rows := (await db.execute(batch_statement(after))).all():
+            yield encoder.encode(rows)
+            after = rows[-1].id
+        return
+    result = await db.stream(export_statement(after))
+    try:
+        async for rows in result.partitions():
+            yield encoder.encode(rows)
+    finally:
+        await result.close()
+
+def _compressor():
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+def gzipped(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = _compressor()
+    for chunk in chunks:
+        # Sync-flush every batch so clients can decode rows as they arrive
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+async def agzipped(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = _compressor()
+    async for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+def accepts_gzip(request: Request) -> bool:
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() == "gzip":
+            return params.replace(" ", "") not in ("q=0", "q=0.0")
+    return False
+
+def export_response(request: Request, response: Response,
+                    chunks: Union[Iterator[bytes], AsyncIterator[bytes]], fmt: str) -> StreamingResponse:
+    """Stream `chunks`, gzipped when the client accepts it, keeping headers set on `response`."""
+    headers = {
+        "Content-Disposition": f'attachment; filename="movies.{fmt}"',
+        "Vary": "Accept-Encoding",
+    }
+    if accepts_gzip(request):
+        chunks = agzipped(chunks) if hasattr(chunks, "__aiter__") else gzipped(chunks)
+        headers["Content-Encoding"] = "gzip"
+    streaming = StreamingResponse(chunks, media_type=MEDIA_TYPES[fmt], headers=headers)
+    streaming.raw_headers.extend(response.raw_headers)
+    return streaming
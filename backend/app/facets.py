@@ -0,0 +1,368 @@
+"""In-memory facet index for multi-select movie filtering.
+
+Dense facets (genres, release years, durations) are kept as bitsets, one
+Python int per value with bit ``n`` set for movie id ``n``; AND/OR of whole
+facets is then a single big-int operation and counts are ``int.bit_count``.
+Sparse facets (actors, directors: a few movies each) are sorted id arrays
+that are turned into bitsets only when selected.
+
+The index is built from ordered scans of the tables on first use, then
+follows ``crud.create_movie`` through the write events; a bulk load, or a
+write from another process noticed through ``catalog_versions``
+(``CATALOG_CHANGED``, see app/versions.py), marks it stale so the next query
+rebuilds it. Queries return ordered pages of ids that
+the caller hydrates from the database.
+"""
+import threading
+from array import array
+from bisect import insort
+from functools import reduce
+from itertools import groupby
+from operator import itemgetter, or_
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import events
+
+# Sparse facet values with at least this many movies keep their bitset
+# once built, so popular actors are not re-encoded on every query
+DENSE_CACHE_MIN = 64
+
+# Bits read from a big int per step when walking a result in order
+WINDOW_BITS = 1024
+_WINDOW_MASK = (1 << WINDOW_BITS) - 1
+
+def bitset(ids: Iterable[int]) -> int:
+    """Build a bitset from ids through a byte buffer (linear, unlike OR-ing shifted ints)."""
+    ids = ids if isinstance(ids, (list, array)) else list(ids)
+    if len(ids) <= 8:
+        return reduce(or_, (1 << i for i in ids), 0)
+    buffer = bytearray(max(ids) // 8 + 1)
+    for i in ids:
+        buffer[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buffer, "little")
+
+def iter_bits(bits: int, descending: bool = False) -> Iterator[int]:
+    """Yield the positions of set bits in ascending (or descending) order.
+
+    Work is done a window at a time: one big-int operation finds the next
+    non-empty window, and its bits are then read from a small int.
+    """
+    if not descending:
+        while bits:
+            base = (bits & -bits).bit_length() - 1
+            chunk = (bits >> base) & _WINDOW_MASK
+            bits ^= chunk << base
+            while chunk:
+                low = chunk & -chunk
+                yield base + low.bit_length() - 1
+                chunk ^= low
+    else:
+        while bits:
+            base = max(0, bits.bit_length() - WINDOW_BITS)
+            chunk = bits >> base
+            bits &= (1 << base) - 1
+            while chunk:
+                high = chunk.bit_length() - 1
+                yield base + high
+                chunk ^= 1 << high
+
+def after_id(bits: int, movie_id: int, descending: bool = False) -> int:
+    """Keep only the bits past `movie_id` in the given order."""
+    if descending:
+        return bits & ((1 << movie_id) - 1)
+    return bits >> (movie_id + 1) << (movie_id + 1)
+
+def _fetchall(db: Session, sql: str) -> list:
+    """Run `sql` on the session's DBAPI connection and return plain tuples.
+
+    Full-table scans skip SQLAlchemy's result rows, which would otherwise
+    cost more than the scan itself.
+    """
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(sql)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+class FacetQuery:
+    """Selected facet values; an empty selection leaves that facet unfiltered."""
+
+    def __init__(self, genre_ids: Sequence[int] = (), genre_match: str = "any",
+                 actor_ids: Sequence[int] = (), actor_match: str = "any",
+                 director_ids: Sequence[int] = (), release_years: Sequence[int] = (),
+                 year_min: Optional[int] = None, year_max: Optional[int] = None,
+                 duration_min: Optional[int] = None, duration_max: Optional[int] = None):
+        self.genre_ids = list(genre_ids)
+        self.genre_match = genre_match
+        self.actor_ids = list(actor_ids)
+        self.actor_match = actor_match
+        self.director_ids = list(director_ids)
+        self.release_years = list(release_years)
+        self.year_min = year_min
+        self.year_max = year_max
+        self.duration_min = duration_min
+        self.duration_max = duration_max
+
+class FacetPage:
+    def __init__(self, ids: List[int], next_position: Optional[Tuple[int, int]], total: int,
+                 counts: Dict[str, Dict[int, int]]):
+        self.ids = ids
+        self.next_position = next_position
+        self.total = total
+        self.counts = counts
+
+class FacetIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Held for a whole load, so only one runs at a time
+        self._build_lock = threading.Lock()
+        self.loaded = False
+        # Movies created while a load is scanning, replayed once it finishes
+        self._pending: Optional[list] = None
+        # Bumped by `invalidate`, so a load that overlaps one stays stale
+        self._generation = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self.all = 0
+        self.genres: Dict[int, int] = {}
+        self.years: Dict[int, int] = {}
+        self.durations: Dict[int, int] = {}
+        self.actors: Dict[int, array] = {}
+        self.directors: Dict[int, array] = {}
+        self.year_of: Dict[int, int] = {}
+        # Movies per value of the whole catalog, the counts when nothing else is selected
+        self.sizes: Dict[str, Dict[int, int]] = {"genre_id": {}, "release_year": {}}
+        self._dense: Dict[Tuple[str, int], int] = {}
+
+    # Building and maintenance
+
+    def load(self, db: Session) -> None:
+        """(Re)build the index with one ordered scan per table.
+
+        Association rows are read in (key, movie_id) order straight from the
+        covering indexes, so each actor's or genre's ids arrive already
+        grouped and sorted.
+        """
+        with self._lock:
+            self._pending = []
+            generation = self._generation
+        years: Dict[int, List[int]] = {}
+        durations: Dict[int, List[int]] = {}
+        directors: Dict[int, List[int]] = {}
+        year_of: Dict[int, int] = {}
+        for movie_id, year, duration, director_id in _fetchall(
+            db, "SELECT id, release_year, duration, director_id FROM movies ORDER BY id"
+        ):
+            year_of[movie_id] = year
+            years.setdefault(year, []).append(movie_id)
+            if duration is not None:
+                durations.setdefault(duration, []).append(movie_id)
+            if director_id is not None:
+                directors.setdefault(director_id, []).append(movie_id)
+
+        def grouped(table: str, key: str) -> Dict[int, array]:
+            rows = _fetchall(db, f"SELECT {key}, movie_id FROM {table} ORDER BY {key}, movie_id")
+            return {
+                value: array("I", map(itemgetter(1), group))
+                for value, group in groupby(rows, key=itemgetter(0))
+            }
+
+        genres = grouped("movie_genres", "genre_id")
+        actors = grouped("movie_actors", "actor_id")
+
+        with self._lock:
+            self._reset()
+            self.all = bitset(year_of)
+            self.genres = {key: bitset(ids) for key, ids in genres.items()}
+            self.years = {key: bitset(ids) for key, ids in years.items()}
+            self.durations = {key: bitset(ids) for key, ids in durations.items()}
+            self.actors = actors
+            self.directors = {key: array("I", ids) for key, ids in directors.items()}
+            self.year_of = year_of
+            self.sizes = {
+                "genre_id": {key: len(ids) for key, ids in genres.items()},
+                "release_year": {key: len(ids) for key, ids in years.items()},
+            }
+            self.loaded = generation == self._generation
+            pending, self._pending = self._pending, None
+        for movie in pending:
+            if movie.id not in self.year_of:
+                self.add_movie(movie)
+
+    def ensure_loaded(self, db: Session) -> None:
+        if self.loaded:
+            return
+        with self._build_lock:
+            if not self.loaded:
+                self.load(db)
+
+    def invalidate(self) -> None:
+        """Mark the index stale; the next query rebuilds it."""
+        with self._lock:
+            self._generation += 1
+            self.loaded = False
+
+    def add_movie(self, movie) -> None:
+        """Index one new movie (an ORM `Movie` with its genres and actors loaded)."""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(movie)
+                return
+            if not self.loaded:
+                return
+            bit = 1 << movie.id
+            self.all |= bit
+            self.year_of[movie.id] = movie.release_year
+            self.years[movie.release_year] = self.years.get(movie.release_year, 0) | bit
+            self._grow("release_year", movie.release_year)
+            if movie.duration is not None:
+                self.durations[movie.duration] = self.durations.get(movie.duration, 0) | bit
+            if movie.director_id is not None:
+                insort(self.directors.setdefault(movie.director_id, array("I")), movie.id)
+                self._dense.pop(("director_id", movie.director_id), None)
+            for genre in movie.genres:
+                self.genres[genre.id] = self.genres.get(genre.id, 0) | bit
+                self._grow("genre_id", genre.id)
+            for actor in movie.actors:
+                insort(self.actors.setdefault(actor.id, array("I")), movie.id)
+                self._dense.pop(("actor_id", actor.id), None)
+
+    def _grow(self, facet: str, key: int) -> None:
+        sizes = self.sizes[facet]
+        sizes[key] = sizes.get(key, 0) + 1
+
+    # Queries
+
+    def _any(self, facet: Dict[int, int], keys: Iterable[int]) -> int:
+        return reduce(or_, (facet.get(key, 0) for key in keys), 0)
+
+    def _items(self, facet: Dict[int, int]) -> List[Tuple[int, int]]:
+        """A copy of `facet`'s entries; `add_movie` may be adding keys meanwhile."""
+        with self._lock:
+            return list(facet.items())
+
+    def _sparse(self, name: str, key: int) -> int:
+        # Under the lock, so a bitset built before `add_movie` extends the ids is not cached after it
+        with self._lock:
+            bits = self._dense.get((name, key))
+            if bits is None:
+                ids = (self.actors if name == "actor_id" else self.directors).get(key, ())
+                bits = bitset(ids)
+                if len(ids) >= DENSE_CACHE_MIN:
+                    self._dense[name, key] = bits
+            return bits
+
+    def _range(self, facet: Dict[int, int], low: Optional[int], high: Optional[int]) -> int:
+        return reduce(or_, (
+            bits for key, bits in self._items(facet)
+            if (low is None or key >= low) and (high is None or key <= high)
+        ), 0)
+
+    def _filters(self, query: FacetQuery) -> Dict[str, int]:
+        """One bitset per active facet; the result is their intersection."""
+        filters = {}
+        if query.genre_ids:
+            if query.genre_match == "all":
+                filters["genre_id"] = reduce(lambda a, b: a & b, (self.genres.get(g, 0) for g in query.genre_ids))
+            else:
+                filters["genre_id"] = self._any(self.genres, query.genre_ids)
+        if query.actor_ids:
+            bitsets = [self._sparse("actor_id", a) for a in query.actor_ids]
+            filters["actor_id"] = reduce(lambda a, b: a & b, bitsets) if query.actor_match == "all" \
+                else reduce(or_, bitsets)
+        if query.director_ids:
+            filters["director_id"] = reduce(or_, (self._sparse("director_id", d) for d in query.director_ids))
+        if query.release_years:
+            filters["release_year"] = self._any(self.years, query.release_years)
+        if query.year_min is not None or query.year_max is not None:
+            filters["year_range"] = self._range(self.years, query.year_min, query.year_max)
+        if query.duration_min is not None or query.duration_max is not None:
+            filters["duration"] = self._range(self.durations, query.duration_min, query.duration_max)
+        return filters
+
+    def _intersect(self, filters: Dict[str, int], skip: Optional[str] = None) -> int:
+        result = self.all
+        for name, bits in filters.items():
+            if name != skip:
+                result &= bits
+        return result
+
+    def counts(self, query: FacetQuery, filters: Dict[str, int], result: int) -> Dict[str, Dict[int, int]]:
+        """Movies per facet value, with every other facet's selection applied.
+
+        Every genre and release year is counted. Actors and directors have far
+        too many values, so only the selected ones are.
+
+        Excluding a facet's own selection keeps its unselected options
+        meaningful for OR-style multi-select; with ``all`` matching the count
+        is instead how many results remain if that option is added.
+        """
+        def base(name: str, match: str = "any") -> int:
+            return result if match == "all" else self._intersect(filters, skip=name)
+
+        def dense_counts(name: str, facet: Dict[int, int], bits: int) -> Dict[int, int]:
+            if bits is self.all:
+                with self._lock:
+                    return dict(self.sizes[name])
+            return {key: n for key, value in self._items(facet) if (n := (bits & value).bit_count())}
+
+        counts = {
+            "genre_id": dense_counts("genre_id", self.genres, base("genre_id", query.genre_match)),
+            "release_year": dense_counts("release_year", self.years, base("release_year")),
+        }
+        director_base = base("director_id")
+        counts["director_id"] = {
+            d: (director_base & self._sparse("director_id", d)).bit_count() for d in query.director_ids
+        }
+        actor_base = base("actor_id", query.actor_match)
+        counts["actor_id"] = {
+            a: (actor_base & self._sparse("actor_id", a)).bit_count() for a in query.actor_ids
+        }
+        return counts
+
+    def search(self, query: FacetQuery, sort: str = "id", limit: int = 50,
+               after: Optional[Tuple[int, int]] = None) -> FacetPage:
+        """Filter, count and page. Positions are (sort key, id) pairs, as in keyset pagination."""
+        filters = self._filters(query)
+        result = self._intersect(filters)
+        field, descending = sort.lstrip("-"), sort.startswith("-")
+
+        if field == "id":
+            ids = self._page(result, limit + 1, descending, after[1] if after else None)
+        else:
+            ids = []
+            for year, year_bits in sorted(self._items(self.years), reverse=descending):
+                if after is not None and (year < after[0] if not descending else year > after[0]):
+                    continue
+                bits = result & year_bits
+                seek = after[1] if after is not None and year == after[0] else None
+                ids += self._page(bits, limit + 1 - len(ids), descending, seek)
+                if len(ids) > limit:
+                    break
+
+        next_position = None
+        if len(ids) > limit:
+            ids = ids[:limit]
+            last = ids[-1]
+            next_position = (last if field == "id" else self.year_of[last], last)
+        return FacetPage(ids, next_position, result.bit_count(), self.counts(query, filters, result))
+
+    def _page(self, bits: int, count: int, descending: bool, seek: Optional[int]) -> List[int]:
+        if seek is not None:
+            bits = after_id(bits, seek, descending)
+        ids = []
+        for movie_id in iter_bits(bits, descending):
+            ids.append(movie_id)
+            if len(ids) >= count:
+                break
+        return ids
+
+facet_index = FacetIndex()
+
+events.subscribe(events.MOVIE_CREATED, facet_index.add_movie)
+events.subscribe(events.CATALOG_BULK_LOADED, lambda count: facet_index.invalidate())
+events.subscribe(events.CATALOG_CHANGED, lambda versions: facet_index.invalidate())
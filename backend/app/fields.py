@@ -0,0 +1,143 @@
+"""Sparse field selection and lean serialization for list routes.
+
+List routes select only the columns a response needs as Core rows, skip the
+ORM identity map and Pydantic validation, and encode plain dicts with
+orjson. A `Projection` names the fields a resource exposes (nested ones as
+``director.name``) and the columns behind them; ``fields=`` narrows it, and
+the default selection matches the route's response model exactly.
+"""
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+from fastapi.responses import ORJSONResponse
+
+from . import models
+
+class Selection:
+    """Columns to select and a function shaping each row into a response dict."""
+
+    def __init__(self, columns: list, shape: Callable[[Any], dict]):
+        self.columns = columns
+        self.shape = shape
+
+    def rows(self, rows: Sequence[Any]) -> List[dict]:
+        shape = self.shape
+        return [shape(row) for row in rows]
+
+class Projection:
+    def __init__(self, name: str, fields: Dict[str, Any], nested: Dict[str, Tuple[Dict[str, Any], str]] = None):
+        """`fields` maps output names to columns; `nested` maps an object name to
+        its fields and the field whose NULL means the whole object is None."""
+        self.name = name
+        self.fields = fields
+        self.nested = nested or {}
+        self.default = self.select(None)
+
+    def allowed(self) -> List[str]:
+        names = list(self.fields)
+        for prefix, (fields, _) in self.nested.items():
+            names += [prefix] + [f"{prefix}.{field}" for field in fields]
+        return names
+
+    def select(self, fields: Optional[str], extra: Sequence[str] = ()) -> Selection:
+        """Parse a ``fields=`` value; `extra` columns (sort keys) are selected but not returned."""
+        return _select(self, fields, tuple(extra))
+
+@lru_cache(maxsize=256)
+def _select(projection: Projection, fields: Optional[str], extra: Tuple[str, ...]) -> Selection:
+    if fields is None:
+        flat = list(projection.fields)
+        nested = {prefix: list(sub) for prefix, (sub, _) in projection.nested.items()}
+    else:
+        flat, nested = [], {}
+        for name in filter(None, (part.strip() for part in fields.split(","))):
+            prefix, _, field = name.partition(".")
+            if name in projection.fields:
+                flat.append(name)
+            elif prefix in projection.nested and not field:
+                nested[prefix] = list(projection.nested[prefix][0])
+            elif prefix in projection.nested and field in projection.nested[prefix][0]:
+                nested.setdefault(prefix, []).append(field)
+            else:
+                raise HTTPException(status_code=400, detail=(
+                    f"Unknown field '{name}' for {projection.name}; "
+                    f"choose from {', '.join(projection.allowed())}"
+                ))
+        # The id keys every item and its cursor
+        if "id" not in flat:
+            flat.insert(0, "id")
+
+    columns, labels = [], []
+
+    def column(source, label: str) -> int:
+        if label not in labels:
+            labels.append(label)
+            columns.append(source.label(label))
+        return labels.index(label)
+
+    flat = list(dict.fromkeys(flat))
+    flat_positions = [column(projection.fields[name], name) for name in flat]
+    for name in extra:
+        column(projection.fields[name], name)
+
+    groups = []
+    for prefix, names in nested.items():
+        sub, present = projection.nested[prefix]
+        names = list(dict.fromkeys(names))
+        positions = [column(sub[name], f"{prefix}_{name}") for name in names]
+        groups.append((prefix, tuple(names), itemgetter(*positions) if len(positions) > 1 else None,
+                       positions[0], column(sub[present], f"{prefix}_{present}")))
+
+    keys = tuple(flat)
+    get_flat = itemgetter(*flat_positions) if len(flat_positions) > 1 else None
+
+    def shape(row) -> dict:
+        item = dict(zip(keys, get_flat(row))) if get_flat else {keys[0]: row[flat_positions[0]]}
+        for prefix, names, getter, first, present in groups:
+            if row[present] is None:
+                item[prefix] = None
+            else:
+                item[prefix] = dict(zip(names, getter(row))) if getter else {names[0]: row[first]}
+        return item
+
+    return Selection(columns, shape)
+
+def lean_response(response: Response, content: Any) -> ORJSONResponse:
+    """Encode `content` with orjson, keeping headers dependencies set on `response`
+    (ETag, next-page cursor)."""
+    lean = ORJSONResponse(content)
+    lean.raw_headers.extend(response.raw_headers)
+    return lean
+
+_listing = models.MovieListing
+
+MOVIE_SUMMARY = Projection(
+    "movies",
+    {
+        "id": _listing.id,
+        "title": _listing.title,
+        "release_year": _listing.release_year,
+        "synopsis": _listing.synopsis,
+        "duration": _listing.duration,
+    },
+    {
+        "director": ({
+            "id": _listing.director_id,
+            "name": _listing.director_name,
+            "birth_year": _listing.director_birth_year,
+            "bio": _listing.director_bio,
+        }, "name"),
+    },
+)
+
+ACTOR = Projection(
+    "actors",
+    {
+        "id": models.Actor.id,
+        "name": models.Actor.name,
+        "birth_year": models.Actor.birth_year,
+        "bio": models.Actor.bio,
+    },
+)
@@ -0,0 +1,117 @@
+"""SQLite FTS5 full-text index over movie titles/synopses and people names/bios.
+
+The index is a single contentless FTS5 table, so every kind is ranked on the
+same bm25 scale. Each row's rowid packs the entity kind and id together
+(``id * ROWID_STRIDE + kind code``), which lets the sync triggers address a row
+directly and lets queries filter by kind without an extra column.
+"""
+import re
+from typing import List, Optional
+
+from sqlalchemy import event, text
+
+from .database import Base
+
+SEARCH_TABLE = "search_index"
+
+ROWID_STRIDE = 4
+KIND_CODES = {"movie": 1, "actor": 2, "director": 3}
+KIND_NAMES = {code: kind for kind, code in KIND_CODES.items()}
+
+# Names and titles weigh ten times as much as synopses and bios
+NAME_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+# (kind, table, name column, body column)
+INDEXED_TABLES = [
+    ("movie", "movies", "title", "synopsis"),
+    ("actor", "actors", "name", "bio"),
+    ("director", "directors", "name", "bio"),
+]
+
+def _rowid(code: int, ref: str) -> str:
+    return f"{ref}.id * {ROWID_STRIDE} + {code}"
+
+def _ddl() -> List[str]:
+    statements = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "name, body, content='', prefix='2 3 4', tokenize='unicode61 remove_diacritics 2')"
+    ]
+    for kind, table, name, body in INDEXED_TABLES:
+        code = KIND_CODES[kind]
+        insert = (
+            f"INSERT INTO {SEARCH_TABLE}(rowid, name, body) "
+            f"VALUES ({_rowid(code, 'new')}, new.{name}, new.{body});"
+        )
+        delete = (
+            f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, body) "
+            f"VALUES ('delete', {_rowid(code, 'old')}, old.{name}, old.{body});"
+        )
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_ai AFTER INSERT ON {table} BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_ad AFTER DELETE ON {table} BEGIN {delete} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_au AFTER UPDATE OF {name}, {body} ON {table} "
+            f"BEGIN {delete} {insert} END",
+        ]
+    return statements
+
+def _drop_ddl() -> List[str]:
+    statements = [f"DROP TABLE IF EXISTS {SEARCH_TABLE}"]
+    for _, table, _, _ in INDEXED_TABLES:
+        statements += [f"DROP TRIGGER IF EXISTS {table}_search_{suffix}" for suffix in ("ai", "ad", "au")]
+    return statements
+
+def create_search_index(connection) -> None:
+    """Create the FTS table and its sync triggers (idempotent)."""
+    for statement in _ddl():
+        connection.execute(text(statement))
+
+def drop_search_index(connection) -> None:
+    for statement in _drop_ddl():
+        connection.execute(text(statement))
+
+def rebuild_search_index(connection) -> None:
+    """Repopulate the index from the base tables."""
+    connection.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('delete-all')"))
+    for kind, table, name, body in INDEXED_TABLES:
+        connection.execute(text(
+            f"INSERT INTO {SEARCH_TABLE}(rowid, name, body) "
+            f"SELECT {_rowid(KIND_CODES[kind], table)}, {name}, {body} FROM {table}"
+        ))
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_on_metadata_create(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        create_search_index(connection)
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+def match_expression(q: str, prefix: bool = True) -> Optional[str]:
+    """Turn free user input into a safe FTS5 MATCH expression.
+
+    Every word is quoted so FTS5 operators in the input are taken literally,
+    and all words must match. With `prefix` the last word is matched as a
+    prefix, which is what a typeahead box needs while the user is typing.
+    """
+    tokens = _TOKEN.findall(q)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    if prefix:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+def search_query(kind: Optional[str] = None):
+    """Ranked (rowid, score) query; binds :match and :limit."""
+    where = f"{SEARCH_TABLE} MATCH :match"
+    if kind is not None:
+        where += f" AND rowid % {ROWID_STRIDE} = {KIND_CODES[kind]}"
+    return text(
+        f"SELECT rowid, -bm25({SEARCH_TABLE}, {NAME_WEIGHT}, {BODY_WEIGHT}) AS score "
+        f"FROM {SEARCH_TABLE} WHERE {where} ORDER BY bm25({SEARCH_TABLE}, {NAME_WEIGHT}, {BODY_WEIGHT}) "
+        f"LIMIT :limit"
+    )
+
+def split_rowid(rowid: int):
+    """Return the (kind, id) pair packed into a search rowid."""
+    return KIND_NAMES[rowid % ROWID_STRIDE], rowid // ROWID_STRIDE
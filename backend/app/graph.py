@@ -0,0 +1,243 @@
+"""Actor-movie graph for degrees-of-separation queries.
+
+The ``Actor.movies``/``Movie.actors`` relationship is held as two CSR
+(compressed sparse row) adjacency lists indexed by database id: the movies
+of actor ``a`` are ``actor_edges[actor_offsets[a]:actor_offsets[a + 1]]``
+and likewise for a movie's cast. Four flat ``array("I")`` buffers cost 4
+bytes per edge and offset, so millions of edges take tens of megabytes.
+
+Shortest paths come from a bidirectional BFS that always expands the
+smaller frontier, capped at `MAX_DEGREES` actor hops. Movies created after
+the build go into a small overlay; once it grows past `OVERLAY_MAX` movies
+the arrays are rebuilt on the next query, as they are after a bulk load or
+a write from another process (``CATALOG_CHANGED``). Answers are memoized in
+an LRU that every graph change clears.
+"""
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import events
+
+MAX_DEGREES = 6
+PATH_CACHE_SIZE = 1024
+# Movies kept outside the CSR arrays before they are rebuilt
+OVERLAY_MAX = 5000
+# Rows per DBAPI fetch while building
+FETCH_SIZE = 50000
+
+class ActorPath:
+    """``actors[i]`` and ``actors[i + 1]`` both appear in ``movies[i]``."""
+
+    def __init__(self, actors: List[int], movies: List[int]):
+        self.actors = actors
+        self.movies = movies
+
+    @property
+    def degrees(self) -> int:
+        return len(self.movies)
+
+def csr(rows: Iterable[List[Tuple[int, int]]], size: int) -> Tuple[array, array]:
+    """Offsets and edges from chunks of (source, target) rows ordered by source."""
+    edges = array("I")
+    degree = Counter()
+    for chunk in rows:
+        edges.extend(map(itemgetter(1), chunk))
+        degree.update(map(itemgetter(0), chunk))
+    offsets = array("I", bytes(4 * (size + 2)))
+    total = 0
+    for node in range(size + 1):
+        offsets[node] = total
+        total += degree.get(node, 0)
+    offsets[size + 1] = total
+    return offsets, edges
+
+def _chunks(db: Session, sql: str) -> Iterable[list]:
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(sql)
+        while True:
+            chunk = cursor.fetchmany(FETCH_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        cursor.close()
+
+class ActorGraph:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Held for a whole load, so only one runs at a time
+        self._build_lock = threading.Lock()
+        self.loaded = False
+        # Movies created while a load is scanning, replayed once it finishes
+        self._pending: Optional[list] = None
+        # Bumped by `invalidate`, so a load that overlaps one stays stale
+        self._generation = 0
+        self._cache: "OrderedDict[Tuple[int, int, int], Optional[ActorPath]]" = OrderedDict()
+        self.build([], [], 0, 0)
+
+    # Building and maintenance
+
+    def build(self, actor_rows: Iterable[list], movie_rows: Iterable[list],
+              max_actor_id: int, max_movie_id: int) -> None:
+        """Replace the graph from chunks of (actor_id, movie_id) rows ordered by
+        actor and of (movie_id, actor_id) rows ordered by movie."""
+        actor_offsets, actor_edges = csr(actor_rows, max_actor_id)
+        movie_offsets, movie_edges = csr(movie_rows, max_movie_id)
+        with self._lock:
+            self.actor_offsets, self.actor_edges = actor_offsets, actor_edges
+            self.movie_offsets, self.movie_edges = movie_offsets, movie_edges
+            self.max_actor_id, self.max_movie_id = max_actor_id, max_movie_id
+            self.overlay_movies: Dict[int, List[int]] = {}
+            self.overlay_casts: Dict[int, List[int]] = {}
+            self._cache.clear()
+
+    def load(self, db: Session) -> None:
+        with self._lock:
+            self._pending = []
+            generation = self._generation
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.execute(
+                "SELECT (SELECT COALESCE(MAX(id), 0) FROM actors), (SELECT COALESCE(MAX(id), 0) FROM movies)"
+            )
+            max_actor_id, max_movie_id = cursor.fetchone()
+        finally:
+            cursor.close()
+        self.build(
+            _chunks(db, "SELECT actor_id, movie_id FROM movie_actors ORDER BY actor_id, movie_id"),
+            _chunks(db, "SELECT movie_id, actor_id FROM movie_actors ORDER BY movie_id, actor_id"),
+            max_actor_id, max_movie_id,
+        )
+        with self._lock:
+            self.loaded = generation == self._generation
+            pending, self._pending = self._pending, None
+        for movie in pending:
+            if movie.id > max_movie_id:
+                self.add_movie(movie)
+
+    def is_current(self) -> bool:
+        """Loaded, with an overlay small enough to keep answering from."""
+        return self.loaded and len(self.overlay_casts) <= OVERLAY_MAX
+
+    def ensure_loaded(self, db: Session) -> None:
+        if self.is_current():
+            return
+        # Callers that find it stale together wait for a single rebuild
+        with self._build_lock:
+            if not self.is_current():
+                self.load(db)
+
+    def invalidate(self) -> None:
+        """Mark the graph stale; the next query rebuilds it."""
+        with self._lock:
+            self._generation += 1
+            self.loaded = False
+            self._cache.clear()
+
+    def add_movie(self, movie) -> None:
+        """Add a new movie's cast to the overlay."""
+        actor_ids = sorted({actor.id for actor in movie.actors})
+        if not actor_ids:
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(movie)
+                return
+            if not self.loaded:
+                return
+            self.overlay_casts[movie.id] = actor_ids
+            for actor_id in actor_ids:
+                self.overlay_movies.setdefault(actor_id, []).append(movie.id)
+            self._cache.clear()
+
+    # Queries
+
+    def movies_of(self, actor_id: int):
+        movies = self.overlay_movies.get(actor_id, ())
+        if actor_id <= self.max_actor_id:
+            edges = self.actor_edges[self.actor_offsets[actor_id]:self.actor_offsets[actor_id + 1]]
+            return edges + array("I", movies) if movies else edges
+        return movies
+
+    def cast_of(self, movie_id: int):
+        if movie_id <= self.max_movie_id:
+            return self.movie_edges[self.movie_offsets[movie_id]:self.movie_offsets[movie_id + 1]]
+        return self.overlay_casts.get(movie_id, ())
+
+    def _expand(self, frontier: List[int], parents: Dict[int, Tuple[int, int]], movies_seen: set,
+                other: Dict[int, Tuple[int, int]]) -> Tuple[List[int], Optional[int]]:
+        """Advance one actor hop; return the next frontier and a meeting actor if any."""
+        next_frontier = []
+        for actor_id in frontier:
+            for movie_id in self.movies_of(actor_id):
+                if movie_id in movies_seen:
+                    continue
+                movies_seen.add(movie_id)
+                for costar in self.cast_of(movie_id):
+                    if costar in parents:
+                        continue
+                    parents[costar] = (actor_id, movie_id)
+                    if costar in other:
+                        return next_frontier, costar
+                    next_frontier.append(costar)
+        return next_frontier, None
+
+    def _search(self, source: int, target: int, max_degrees: int) -> Optional[ActorPath]:
+        if source == target:
+            return ActorPath([source], [])
+        forward: Dict[int, Tuple[int, int]] = {source: (-1, -1)}
+        backward: Dict[int, Tuple[int, int]] = {target: (-1, -1)}
+        forward_movies, backward_movies = set(), set()
+        forward_frontier, backward_frontier = [source], [target]
+        for _ in range(max_degrees):
+            if not forward_frontier or not backward_frontier:
+                return None
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier, meeting = self._expand(forward_frontier, forward, forward_movies, backward)
+            else:
+                backward_frontier, meeting = self._expand(backward_frontier, backward, backward_movies, forward)
+            if meeting is not None:
+                return self._join(meeting, forward, backward)
+        return None
+
+    def _join(self, meeting: int, forward: Dict[int, Tuple[int, int]],
+              backward: Dict[int, Tuple[int, int]]) -> ActorPath:
+        actors, movies = [meeting], []
+        actor_id = meeting
+        while forward[actor_id][0] != -1:
+            actor_id, movie_id = forward[actor_id]
+            actors.insert(0, actor_id)
+            movies.insert(0, movie_id)
+        actor_id = meeting
+        while backward[actor_id][0] != -1:
+            actor_id, movie_id = backward[actor_id]
+            actors.append(actor_id)
+            movies.append(movie_id)
+        return ActorPath(actors, movies)
+
+    def shortest_path(self, source: int, target: int, max_degrees: int = MAX_DEGREES) -> Optional[ActorPath]:
+        """A shortest chain of shared movies from `source` to `target`, or None
+        if there is none within `max_degrees` hops."""
+        key = (source, target, max_degrees)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        path = self._search(source, target, max_degrees)
+        with self._lock:
+            self._cache[key] = path
+            if len(self._cache) > PATH_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return path
+
+actor_graph = ActorGraph()
+
+events.subscribe(events.MOVIE_CREATED, actor_graph.add_movie)
+events.subscribe(events.CATALOG_BULK_LOADED, lambda count: actor_graph.invalidate())
+events.subscribe(events.CATALOG_CHANGED, lambda versions: actor_graph.invalidate())
@@ -0,0 +1,113 @@
+"""Denormalized movie listing read model.
+
+``movie_listings`` holds one row per movie with everything a `MovieSummary`
+needs: the movie's own columns, its director's fields, and its genre and
+actor ids packed as ``",1,5,"``. Listings are then read from one table, with
+no join to ``directors``; genre and actor filters still go through the
+association tables' reverse indexes (see `crud.movies_statement`), since a
+packed list can only be searched by scanning it.
+
+Triggers keep it current on every write to ``movies``, ``directors``,
+``movie_genres`` and ``movie_actors``, whichever code path made the write
+(``crud.create_movie``, the bulk importer, or manual SQL), in the same
+transaction. `rebuild_listings` repopulates it from the base tables.
+"""
+from typing import List
+
+from sqlalchemy import event, text
+
+from .database import Base
+
+LISTING_TABLE = "movie_listings"
+
+# Packed id lists start and end with the separator, so ",5," matches id 5 only
+SEPARATOR = ","
+
+# (association table, foreign key column, packed listing column)
+PACKED_COLUMNS = [
+    ("movie_genres", "genre_id", "genre_ids"),
+    ("movie_actors", "actor_id", "actor_ids"),
+]
+
+def _director(field: str, ref: str) -> str:
+    return f"(SELECT {field} FROM directors WHERE id = {ref}.director_id)"
+
+def _ddl() -> List[str]:
+    t = LISTING_TABLE
+    statements = [
+        f"CREATE TRIGGER IF NOT EXISTS movies_listing_ai AFTER INSERT ON movies BEGIN "
+        f"INSERT INTO {t} (id, title, release_year, synopsis, duration, director_id, "
+        f"director_name, director_birth_year, director_bio, genre_ids, actor_ids) VALUES ("
+        f"new.id, new.title, new.release_year, new.synopsis, new.duration, new.director_id, "
+        f"{_director('name', 'new')}, {_director('birth_year', 'new')}, {_director('bio', 'new')}, "
+        f"'{SEPARATOR}', '{SEPARATOR}'); END",
+
+        f"CREATE TRIGGER IF NOT EXISTS movies_listing_au AFTER UPDATE ON movies BEGIN "
+        f"UPDATE {t} SET id = new.id, title = new.title, release_year = new.release_year, "
+        f"synopsis = new.synopsis, duration = new.duration, director_id = new.director_id, "
+        f"director_name = {_director('name', 'new')}, director_birth_year = {_director('birth_year', 'new')}, "
+        f"director_bio = {_director('bio', 'new')} WHERE id = old.id; END",
+
+        f"CREATE TRIGGER IF NOT EXISTS movies_listing_ad AFTER DELETE ON movies BEGIN "
+        f"DELETE FROM {t} WHERE id = old.id; END",
+
+        f"CREATE TRIGGER IF NOT EXISTS directors_listing_au "
+        f"AFTER UPDATE OF name, birth_year, bio ON directors BEGIN "
+        f"UPDATE {t} SET director_name = new.name, director_birth_year = new.birth_year, "
+        f"director_bio = new.bio WHERE director_id = new.id; END",
+
+        f"CREATE TRIGGER IF NOT EXISTS directors_listing_ad AFTER DELETE ON directors BEGIN "
+        f"UPDATE {t} SET director_name = NULL, director_birth_year = NULL, director_bio = NULL "
+        f"WHERE director_id = old.id; END",
+    ]
+    for table, key, packed in PACKED_COLUMNS:
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_listing_ai AFTER INSERT ON {table} BEGIN "
+            f"UPDATE {t} SET {packed} = {packed} || new.{key} || '{SEPARATOR}' WHERE id = new.movie_id; END",
+
+            f"CREATE TRIGGER IF NOT EXISTS {table}_listing_ad AFTER DELETE ON {table} BEGIN "
+            f"UPDATE {t} SET {packed} = replace({packed}, '{SEPARATOR}' || old.{key} || '{SEPARATOR}', "
+            f"'{SEPARATOR}') WHERE id = old.movie_id; END",
+        ]
+    return statements
+
+def _trigger_names() -> List[str]:
+    names = ["movies_listing_ai", "movies_listing_au", "movies_listing_ad",
+             "directors_listing_au", "directors_listing_ad"]
+    for table, _, _ in PACKED_COLUMNS:
+        names += [f"{table}_listing_ai", f"{table}_listing_ad"]
+    return names
+
+def create_listing_triggers(connection) -> None:
+    """Install the triggers that keep listings in sync (idempotent)."""
+    for statement in _ddl():
+        connection.execute(text(statement))
+
+def drop_listing_triggers(connection) -> None:
+    for name in _trigger_names():
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
+def rebuild_listings(connection) -> None:
+    """Repopulate every listing from the base tables."""
+    packed = ", ".join(
+        f"'{SEPARATOR}' || COALESCE((SELECT group_concat({key}, '{SEPARATOR}') FROM {table} "
+        f"WHERE {table}.movie_id = movies.id) || '{SEPARATOR}', '')"
+        for table, key, _ in PACKED_COLUMNS
+    )
+    connection.execute(text(f"DELETE FROM {LISTING_TABLE}"))
+    connection.execute(text(
+        f"INSERT INTO {LISTING_TABLE} (id, title, release_year, synopsis, duration, director_id, "
+        f"director_name, director_birth_year, director_bio, genre_ids, actor_ids) "
+        f"SELECT movies.id, movies.title, movies.release_year, movies.synopsis, movies.duration, "
+        f"movies.director_id, directors.name, directors.birth_year, directors.bio, {packed} "
+        f"FROM movies LEFT JOIN directors ON directors.id = movies.director_id"
+    ))
+
+def unpack_ids(packed: str) -> List[int]:
+    """``",5,1,"`` -> ``[1, 5]``"""
+    return sorted(int(part) for part in packed.split(SEPARATOR) if part)
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_on_metadata_create(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        create_listing_triggers(connection)
@@ -1,40 +1,126 @@
-from fastapi import FastAPI
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import APIRouter, Depends, FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine
-from . import models
-from .routers import movies, actors, directors, genres
-
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
-
-# Create FastAPI app
-app = FastAPI(
-    title="Movie Explorer API",
-    description="A comprehensive API for exploring movies, actors, directors, and genres",
-    version="1.0.0",
-    docs_url="/docs",
-    redoc_url="/redoc"
-)
-
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://localhost:5173"],  # Vue.js dev server
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include routers
-app.include_router(movies.router, prefix="/api")
-app.include_router(actors.router, prefix="/api")
-app.include_router(directors.router, prefix="/api")
-app.include_router(genres.router, prefix="/api")
-
-@app.get("/")
+from fastapi.responses import PlainTextResponse
+from .database import DB_ASYNC
+from . import startup
+from .cache import response_cache
+from .coalesce import single_flight
+from .etag import NotModified, conditional_get, not_modified_response
+from .metrics import QUERY_COUNT_HEADER_NAME, QUERY_TIME_HEADER_NAME, InstrumentedRoute, MetricsMiddleware, registry
+from .pagination import NEXT_CURSOR_HEADER
+from .routers import movies, actors, directors, genres, search, facets, batch, changes, stats, autocomplete
+
+logger = logging.getLogger("app.startup")
+
+# Conditional GET: every router is tagged with the tables its responses read.
+# Genres and directors change rarely, so clients may reuse them for a minute.
+REFERENCE_MAX_AGE = 60
+
+ROUTERS = [
+    (movies, ("movies", "directors", "actors", "genres", "movie_actors", "movie_genres"), None),
+    (actors, ("actors", "movies", "directors", "movie_actors", "movie_genres"), None),
+    (directors, ("directors", "movies"), REFERENCE_MAX_AGE),
+    (genres, ("genres",), REFERENCE_MAX_AGE),
+    (search, ("movies", "actors", "directors"), None),
+    (autocomplete, ("movies", "actors", "directors", "movie_actors"), None),
+    (facets, ("movies", "directors", "movie_actors", "movie_genres"), None),
+    (batch, ("movies", "directors", "actors", "genres", "movie_actors", "movie_genres"), None),
+    (stats, ("movies", "directors", "actors", "genres", "movie_actors", "movie_genres"), None),
+]
+
+# Service endpoints outside the /api namespace
+service_router = APIRouter(route_class=InstrumentedRoute)
+
+@service_router.get("/")
 def read_root():
     return {"message": "Welcome to Movie Explorer API", "docs": "/docs"}
 
-@app.get("/health")
+@service_router.get("/health")
 def health_check():
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy"} 
+
+@service_router.get("/cache/stats")
+def cache_stats():
+    """Response cache hit/miss/eviction counters and request coalescing counters."""
+    return {**response_cache.stats(), "coalescing": single_flight.stats()}
+
+@service_router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Per-route latency, SQL and serialization metrics in Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Per-worker startup: create a missing schema, build indexes, then optionally warm up."""
+    started = time.perf_counter()
+    if app.state.init_schema and await run_in_threadpool(startup.ensure_schema):
+        logger.info("Created database schema")
+    if app.state.load_indexes:
+        await run_in_threadpool(startup.load_indexes)
+    if app.state.warm_up:
+        report = await startup.warm_up(app)
+        logger.info("Warm-up: %s", report)
+    app.state.startup_seconds = round(time.perf_counter() - started, 3)
+    yield
+
+def create_app(async_db: bool = DB_ASYNC, init_schema: bool = startup.SCHEMA_AUTO_CREATE,
+               warm_up: bool = startup.WARM_UP, load_indexes: bool = startup.LOAD_INDEXES) -> FastAPI:
+    """Build the API. With `async_db` GET routes run as async handlers on AsyncSession.
+
+    Nothing touches the database until the lifespan starts: `init_schema`
+    creates missing tables, `load_indexes` builds the autocomplete index and
+    `warm_up` primes caches (see app/startup.py).
+    """
+    app = FastAPI(
+        lifespan=lifespan,
+        title="Movie Explorer API",
+        description="A comprehensive API for exploring movies, actors, directors, and genres",
+        version="1.0.0",
+        docs_url="/docs",
+        redoc_url="/redoc"
+    )
+
+    app.state.init_schema = init_schema
+    app.state.warm_up = warm_up
+    app.state.load_indexes = load_indexes
+
+    # Configure CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000", "http://localhost:5173"],  # Vue.js dev server
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, "ETag", QUERY_COUNT_HEADER_NAME, QUERY_TIME_HEADER_NAME],
+    )
+    # Outermost, so latency includes every other middleware
+    app.add_middleware(MetricsMiddleware)
+
+    @app.exception_handler(NotModified)
+    def not_modified_handler(request: Request, exc: NotModified):
+        return not_modified_response(exc.etag, exc.cache_control)
+
+    # Include routers; async GET routes are matched first, writes fall through
+    for module, tables, max_age in ROUTERS:
+        if async_db:
+            app.include_router(module.async_router, prefix="/api", dependencies=[
+                Depends(conditional_get(*tables, max_age=max_age, use_async=True))
+            ])
+        app.include_router(module.router, prefix="/api", dependencies=[
+            Depends(conditional_get(*tables, max_age=max_age))
+        ])
+
+    # The change feed long-polls, so it sits outside the cached, ETagged routers
+    if async_db:
+        app.include_router(changes.async_router, prefix="/api")
+    app.include_router(changes.router, prefix="/api")
+
+    app.include_router(service_router)
+    return app
+
+app = create_app()
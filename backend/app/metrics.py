@@ -0,0 +1,254 @@
+"""Per-route request, SQL and serialization metrics in Prometheus text format.
+
+`MetricsMiddleware` opens a `RequestStats` for every HTTP request and keeps it
+in a context variable. SQLAlchemy cursor hooks, registered on the `Engine`
+class so they cover every engine (sync, read-only, aiosqlite and test
+engines), add each statement's count and time to it. `InstrumentedRoute`
+marks when the endpoint returned, so the rest of the route handler (response
+model validation and JSON encoding) is reported as serialization time.
+Everything is aggregated by route template, e.g. ``/api/movies/{movie_id}``.
+
+Set ``QUERY_COUNT_HEADER=1`` to get ``X-Query-Count``/``X-Query-Time-Ms`` on
+every response, and ``SLOW_QUERY_MS`` to log statements slower than that.
+"""
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+QUERY_COUNT_HEADER = os.getenv("QUERY_COUNT_HEADER", "0") == "1"
+SLOW_QUERY_MS = float(os.environ["SLOW_QUERY_MS"]) if os.getenv("SLOW_QUERY_MS") else None
+
+QUERY_COUNT_HEADER_NAME = "X-Query-Count"
+QUERY_TIME_HEADER_NAME = "X-Query-Time-Ms"
+
+# Route label for requests that matched no route (404s), so junk paths
+# cannot create unbounded label sets
+UNMATCHED_ROUTE = "<unmatched>"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+slow_query_logger = logging.getLogger("app.sql.slow")
+
+class RequestStats:
+    __slots__ = ("statements", "sql_seconds", "endpoint_done", "serialization_seconds", "coalesced")
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.endpoint_done: Optional[float] = None
+        self.serialization_seconds: Optional[float] = None
+        # Answered with the response of an identical request in flight (see app/coalesce.py)
+        self.coalesced = False
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def current_stats() -> Optional[RequestStats]:
+    """Stats of the request being handled, or None outside a request."""
+    return _current.get()
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+class RouteMetrics:
+    __slots__ = ("responses", "coalesced", "latency", "statements", "sql_seconds", "serialization")
+
+    def __init__(self):
+        self.responses: Dict[int, int] = {}
+        self.coalesced = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.sql_seconds = Histogram(LATENCY_BUCKETS)
+        self.serialization = Histogram(LATENCY_BUCKETS)
+
+# (name, type, help) in output order
+METRICS = (
+    ("http_requests_total", "counter", "Requests by route template and status code."),
+    ("http_requests_coalesced_total", "counter",
+     "Requests answered with the response of an identical request already in flight."),
+    ("http_request_duration_seconds", "histogram", "Request latency by route template."),
+    ("http_request_sql_statements", "histogram", "SQL statements issued per request."),
+    ("http_request_sql_seconds", "histogram", "Time spent executing SQL per request."),
+    ("http_response_serialization_seconds", "histogram",
+     "Time from the endpoint returning to the response being built (validation and JSON encoding)."),
+)
+
+class MetricsRegistry:
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        with self._lock:
+            metrics = self._routes.get((method, route))
+            if metrics is None:
+                metrics = self._routes[(method, route)] = RouteMetrics()
+            metrics.responses[status] = metrics.responses.get(status, 0) + 1
+            metrics.coalesced += stats.coalesced
+            metrics.latency.observe(seconds)
+            metrics.statements.observe(stats.statements)
+            metrics.sql_seconds.observe(stats.sql_seconds)
+            if stats.serialization_seconds is not None:
+                metrics.serialization.observe(stats.serialization_seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        sections = {name: [f"# HELP {name} {text}", f"# TYPE {name} {kind}"] for name, kind, text in METRICS}
+        with self._lock:
+            for (method, route), metrics in sorted(self._routes.items()):
+                labels = f'method="{method}",route="{_escape(route)}"'
+                for status, count in sorted(metrics.responses.items()):
+                    sections["http_requests_total"].append(
+                        f'http_requests_total{{{labels},status="{status}"}} {count}'
+                    )
+                if metrics.coalesced:
+                    sections["http_requests_coalesced_total"].append(
+                        f"http_requests_coalesced_total{{{labels}}} {metrics.coalesced}"
+                    )
+                sections["http_request_duration_seconds"] += metrics.latency.samples(
+                    "http_request_duration_seconds", labels)
+                sections["http_request_sql_statements"] += metrics.statements.samples(
+                    "http_request_sql_statements", labels)
+                sections["http_request_sql_seconds"] += metrics.sql_seconds.samples(
+                    "http_request_sql_seconds", labels)
+                if metrics.serialization.count:
+                    sections["http_response_serialization_seconds"] += metrics.serialization.samples(
+                        "http_response_serialization_seconds", labels)
+        return "\n".join(line for lines in sections.values() for line in lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+registry = MetricsRegistry()
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing each request and recording it under its route template."""
+
+    def __init__(self, app, query_count_header: Optional[bool] = None):
+        self.app = app
+        self.query_count_header = QUERY_COUNT_HEADER if query_count_header is None else query_count_header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_stats(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.query_count_header:
+                    headers = MutableHeaders(scope=message)
+                    headers[QUERY_COUNT_HEADER_NAME] = str(stats.statements)
+                    headers[QUERY_TIME_HEADER_NAME] = f"{stats.sql_seconds * 1000:.3f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            registry.observe(
+                scope["method"], getattr(route, "path", UNMATCHED_ROUTE), status,
+                time.perf_counter() - started, stats,
+            )
+
+def _mark_endpoint_done(call):
+    """Wrap an endpoint so the current request records when it returned."""
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def timed(*args, **kwargs):
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                _endpoint_done()
+    else:
+        @functools.wraps(call)
+        def timed(*args, **kwargs):
+            try:
+                return call(*args, **kwargs)
+            finally:
+                _endpoint_done()
+    return timed
+
+def _endpoint_done() -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.endpoint_done = time.perf_counter()
+
+class InstrumentedRoute(APIRoute):
+    """Route class that reports serialization time to `MetricsMiddleware`."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dependant.call = _mark_endpoint_done(self.dependant.call)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            stats = _current.get()
+            if stats is not None and stats.endpoint_done is not None:
+                stats.serialization_seconds = time.perf_counter() - stats.endpoint_done
+            return response
+
+        return timed_handler
+
+# SQL hooks
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("query_started", time.perf_counter())
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_seconds += elapsed
+    if SLOW_QUERY_MS is not None and elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_query_logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, " ".join(statement.split()))
@@ -1,40 +1,129 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, Table, text
+from sqlalchemy.orm import declared_attr, relationship
 from .database import Base
 from datetime import datetime
 
-# Association table for many-to-many relationship between movies and actors
+# Association table for many-to-many relationship between movies and actors.
+# The composite primary key serves movie -> actors lookups, the reverse index
+# serves actor -> movies lookups; both are covering for the filter queries.
 movie_actors = Table(
     'movie_actors',
     Base.metadata,
-    Column('movie_id', Integer, ForeignKey('movies.id')),
-    Column('actor_id', Integer, ForeignKey('actors.id'))
+    Column('movie_id', Integer, ForeignKey('movies.id'), primary_key=True),
+    Column('actor_id', Integer, ForeignKey('actors.id'), primary_key=True),
+    Index('ix_movie_actors_actor_id_movie_id', 'actor_id', 'movie_id')
 )
 
 # Association table for many-to-many relationship between movies and genres
 movie_genres = Table(
     'movie_genres',
     Base.metadata,
-    Column('movie_id', Integer, ForeignKey('movies.id')),
-    Column('genre_id', Integer, ForeignKey('genres.id'))
+    Column('movie_id', Integer, ForeignKey('movies.id'), primary_key=True),
+    Column('genre_id', Integer, ForeignKey('genres.id'), primary_key=True),
+    Index('ix_movie_genres_genre_id_movie_id', 'genre_id', 'movie_id')
 )
 
-class Movie(Base):
+# Per-table write counters, bumped by triggers on every insert/update/delete
+# (see app/etag.py). They make response ETags cheap to compute.
+catalog_versions = Table(
+    'catalog_versions',
+    Base.metadata,
+    Column('table_name', String, primary_key=True),
+    Column('version', Integer, nullable=False, default=0)
+)
+
+# Append-only log of catalog writes, filled by triggers (see app/changes.py).
+# AUTOINCREMENT keeps seq strictly increasing, never reused after a delete.
+catalog_changes = Table(
+    'catalog_changes',
+    Base.metadata,
+    Column('seq', Integer, primary_key=True),
+    Column('entity', String, nullable=False),
+    Column('entity_id', Integer, nullable=False),
+    # Actor or genre id of a movie_actors/movie_genres change
+    Column('ref_id', Integer),
+    Column('op', String, nullable=False),
+    Column('version', Integer),
+    Column('changed_at', DateTime, nullable=False),
+    sqlite_autoincrement=True
+)
+
+# Movie counts and duration totals per genre, release year, director and actor,
+# kept current by triggers (see app/stats.py). The index serves "top N" reads.
+catalog_stats = Table(
+    'catalog_stats',
+    Base.metadata,
+    Column('dimension', String, primary_key=True),
+    Column('key', Integer, primary_key=True),
+    Column('movie_count', Integer, nullable=False, default=0),
+    Column('total_duration', Integer, nullable=False, default=0),
+    Column('duration_count', Integer, nullable=False, default=0),
+    Index('ix_catalog_stats_dimension_movie_count_key', 'dimension', text('movie_count DESC'), 'key')
+)
+
+class Versioned:
+    """Last-write time and a row version the ORM bumps on every UPDATE."""
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, nullable=False, default=1)
+
+    @declared_attr
+    def __mapper_args__(cls):
+        return {"version_id_col": cls.__table__.c.version}
+
+class Movie(Versioned, Base):
     __tablename__ = "movies"
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True, nullable=False)
-    release_year = Column(Integer, nullable=False)
+    release_year = Column(Integer, index=True, nullable=False)
     synopsis = Column(String)
     duration = Column(Integer)  # duration in minutes
-    director_id = Column(Integer, ForeignKey("directors.id"))
+    director_id = Column(Integer, ForeignKey("directors.id"), index=True)
 
     # Relationships
     director = relationship("Director", back_populates="movies")
     actors = relationship("Actor", secondary=movie_actors, back_populates="movies")
     genres = relationship("Genre", secondary=movie_genres, back_populates="movies")
 
-class Actor(Base):
+# Denormalized read model for movie listings, one row per movie, kept in sync by
+# triggers (see app/listings.py). Genre and actor ids are packed as ",1,5,".
+class MovieListing(Base):
+    __tablename__ = "movie_listings"
+
+    id = Column(Integer, primary_key=True)  # movies.id
+    title = Column(String, nullable=False)
+    release_year = Column(Integer, nullable=False)
+    synopsis = Column(String)
+    duration = Column(Integer)
+    director_id = Column(Integer)
+    director_name = Column(String)
+    director_birth_year = Column(Integer)
+    director_bio = Column(String)
+    genre_ids = Column(String, nullable=False, default=",")
+    actor_ids = Column(String, nullable=False, default=",")
+
+    # One index per sort order and for the director filter, each ending in id
+    # so keyset pagination can seek on it
+    __table_args__ = (
+        Index("ix_movie_listings_title_id", "title", "id"),
+        Index("ix_movie_listings_release_year_id", "release_year", "id"),
+        Index("ix_movie_listings_director_id_id", "director_id", "id"),
+    )
+
+    @property
+    def director(self):
+        """The director fields shaped like `schemas.Director`, or None."""
+        if self.director_name is None:
+            return None
+        return {
+            "id": self.director_id,
+            "name": self.director_name,
+            "birth_year": self.director_birth_year,
+            "bio": self.director_bio,
+        }
+
+class Actor(Versioned, Base):
     __tablename__ = "actors"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -45,7 +134,7 @@ class Actor(Base):
     # Relationships
     movies = relationship("Movie", secondary=movie_actors, back_populates="actors")
 
-class Director(Base):
+class Director(Versioned, Base):
     __tablename__ = "directors"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -56,7 +145,7 @@ class Director(Base):
     # Relationships
     movies = relationship("Movie", back_populates="director")
 
-class Genre(Base):
+class Genre(Versioned, Base):
     __tablename__ = "genres"
 
     id = Column(Integer, primary_key=True, index=True)
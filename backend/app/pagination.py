@@ -0,0 +1,100 @@
+import base64
+import json
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_
+
+# Page size limits shared by every paginated list endpoint
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded or belongs to another sort order."""
+
+def encode_cursor(sort: str, key: Any, row_id: int) -> str:
+    """Encode the position after a row as an opaque, URL-safe cursor."""
+    raw = json.dumps([sort, key, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    """Decode a cursor produced by `encode_cursor` for the same sort order."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, key, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+    if cursor_sort != sort or not isinstance(row_id, int):
+        raise InvalidCursor("Cursor does not match the requested sort order")
+    return key, row_id
+
+def parse_sort(sort: str) -> Tuple[str, bool]:
+    """Split a sort parameter such as "-release_year" into (field, descending)."""
+    return sort.lstrip("-"), sort.startswith("-")
+
+def keyset(query, sort_column, id_column, after: Optional[Tuple[Any, int]] = None,
+           limit: Optional[int] = None, descending: bool = False):
+    """Order `query` by (sort_column, id_column) and seek past the `after` position.
+
+    Seeking on the composite key instead of using OFFSET lets SQLite walk the
+    index straight to the next page, so deep pages cost the same as the first.
+    """
+    position = tuple_(sort_column, id_column)
+    if after is not None:
+        bound = tuple_(*after)
+        query = query.filter(position < bound if descending else position > bound)
+
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column, id_column)
+
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+def split_page(rows: List[Any], limit: int, sort: str) -> Tuple[List[Any], Optional[str]]:
+    """Trim a `limit + 1` fetch to one page and build the cursor for the next one."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    field, _ = parse_sort(sort)
+    last = rows[-1]
+    return rows, encode_cursor(sort, getattr(last, field), last.id)
+
+def cursor_position(cursor: Optional[str], sort: str) -> Optional[Tuple[Any, int]]:
+    """Decode a `cursor` query parameter, answering 400 if it is invalid."""
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor, sort)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def page_response(response: Response, rows: List[Any], limit: int, sort: str) -> List[Any]:
+    """Trim a `limit + 1` fetch and set the next-page cursor header on `response`."""
+    rows, next_cursor = split_page(rows, limit, sort)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return rows
+
+class PageQuery:
+    """Sort order, page size and cursor position of a list request."""
+
+    def __init__(self, sort: str, limit: int, after: Optional[Tuple[Any, int]]):
+        self.sort = sort
+        self.limit = limit
+        self.after = after
+
+def page_query(sort_pattern: str):
+    """Dependency reading the `sort`, `limit` and `cursor` parameters of a list endpoint."""
+    def dependency(
+        sort: str = Query("id", pattern=sort_pattern, description="Sort field, prefix with '-' for descending"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+        cursor: Optional[str] = Query(None, description=f"Cursor from the {NEXT_CURSOR_HEADER} header of the previous page"),
+    ) -> PageQuery:
+        return PageQuery(sort, limit, cursor_position(cursor, sort))
+
+    return dependency
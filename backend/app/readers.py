@@ -0,0 +1,105 @@
+"""GET routes defined once for both database paths.
+
+A read handler is an ``async def`` that takes a `Reader` instead of a
+session and awaits its read functions by their `crud` names, e.g.
+``await reader.get_movie(movie_id=1)``. `ReadRouter` registers each handler
+twice: on a module's ``router``, where `Reader` runs the `crud` function on
+the threadpool with a sync session, and on its ``async_router``, where
+`AsyncReader` awaits the `crud_async` function of the same name on an
+``AsyncSession``. Both registrations share the handler's route name, so
+the response cache and ETags treat them as one route.
+"""
+import functools
+import inspect
+from typing import AsyncIterator, Iterator, List, Optional
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import crud, crud_async, export
+from .database import get_async_db, get_read_db
+from .snapshot import Snapshot, snapshot_store
+
+class Reader:
+    """`crud` read functions bound to a sync session, run on the threadpool.
+
+    `versions` are the ``catalog_versions`` rows `conditional_get` read for
+    the request's ETag, if any; `snapshot` checks freshness against them.
+    """
+
+    def __init__(self, db: Session, versions: Optional[List[tuple]] = None):
+        self.db = db
+        self.versions = versions
+
+    def __getattr__(self, name: str):
+        # Looked up per call, so monkeypatched crud functions are honoured
+        function = getattr(crud, name)
+        return functools.partial(run_in_threadpool, function, self.db)
+
+    async def snapshot(self) -> Optional[Snapshot]:
+        return await run_in_threadpool(snapshot_store.fresh, self.db, self.versions)
+
+    def export(self, fmt: str, after: int) -> Iterator[bytes]:
+        return export.iter_export(self.db, fmt, after)
+
+class AsyncReader(Reader):
+    """`crud_async` read functions bound to an async session."""
+
+    def __init__(self, db: AsyncSession, versions: Optional[List[tuple]] = None):
+        self.db = db
+        self.versions = versions
+
+    def __getattr__(self, name: str):
+        return functools.partial(getattr(crud_async, name), self.db)
+
+    async def snapshot(self) -> Optional[Snapshot]:
+        return await snapshot_store.fresh_async(self.db, self.versions)
+
+    def export(self, fmt: str, after: int) -> AsyncIterator[bytes]:
+        return export.aiter_export(self.db, fmt, after)
+
+# Router dependencies, `conditional_get` among them, run before these
+def get_reader(request: Request, db: Session = Depends(get_read_db)) -> Reader:
+    return Reader(db, getattr(request.state, "catalog_versions", None))
+
+def get_async_reader(request: Request, db: AsyncSession = Depends(get_async_db)) -> AsyncReader:
+    return AsyncReader(db, getattr(request.state, "catalog_versions", None))
+
+def _async_variant(handler):
+    """A copy of `handler` whose `Reader` parameter is filled by `get_async_reader`."""
+    signature = inspect.signature(handler)
+    parameters = [
+        parameter.replace(default=Depends(get_async_reader)) if parameter.annotation is Reader else parameter
+        for parameter in signature.parameters.values()
+    ]
+
+    @functools.wraps(handler)
+    async def variant(*args, **kwargs):
+        return await handler(*args, **kwargs)
+
+    variant.__name__ = f"{handler.__name__}_async"
+    variant.__signature__ = signature.replace(parameters=parameters)
+    return variant
+
+class ReadRouter:
+    """Registers read handlers on a sync and an async router at once."""
+
+    def __init__(self, router: APIRouter, async_router: APIRouter):
+        self.router = router
+        self.async_router = async_router
+
+    def route(self, path: str, method: str, name: Optional[str] = None, **kwargs):
+        def decorator(handler):
+            route_name = name or handler.__name__
+            self.router.api_route(path, methods=[method], name=route_name, **kwargs)(handler)
+            self.async_router.api_route(path, methods=[method], name=route_name, **kwargs)(_async_variant(handler))
+            return handler
+        return decorator
+
+    def get(self, path: str, **kwargs):
+        return self.route(path, "GET", **kwargs)
+
+    def post(self, path: str, **kwargs):
+        return self.route(path, "POST", **kwargs)
@@ -0,0 +1,262 @@
+"""Co-occurrence index behind "related movies" and actor collaborators.
+
+Collaborations are precomputed: each actor has a sorted array of co-star
+ids and a parallel array of how many movies they share. Related movies are
+scored on read from the inverted lists (actor -> movies, director -> movies):
+candidates are the movies sharing a cast member or the director, ranked by
+shared cast, same director and genre overlap. Only a few hundred candidates
+are scored per request, so no movie-by-movie matrix is kept.
+
+Like the facet index, it is built from ordered scans on first use, follows
+``crud.create_movie`` through the write events, and is rebuilt after a bulk
+load or a write from another process (``CATALOG_CHANGED``). `build` takes
+plain tuples so the benchmark can feed it directly.
+"""
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import chain, groupby
+from operator import itemgetter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import events
+
+# Score weights: a shared cast member counts most, then the director, then
+# genre overlap (Jaccard, 0-1)
+CAST_WEIGHT = 3.0
+DIRECTOR_WEIGHT = 2.0
+GENRE_WEIGHT = 1.0
+
+# Actors and directors with more movies than this are not used to find
+# candidates (they would pull in thousands), though shared ones still score
+CANDIDATE_FANOUT = 500
+
+# Movies from the movie's rarest genre considered when cast and director
+# give fewer candidates than requested
+GENRE_FALLBACK = 200
+
+class RelatedMovie(NamedTuple):
+    movie_id: int
+    score: float
+    shared_actors: int
+    shared_genres: int
+    same_director: bool
+
+def _iterrows(db: Session, sql: str) -> Iterable[tuple]:
+    """Stream plain tuples from the session's DBAPI connection."""
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(sql)
+        yield from cursor
+    finally:
+        cursor.close()
+
+class RelatedIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Held for a whole load, so only one runs at a time
+        self._build_lock = threading.Lock()
+        self.loaded = False
+        # Movies created while a load is scanning, replayed once it finishes
+        self._pending: Optional[list] = None
+        # Bumped by `invalidate`, so a load that overlaps one stays stale
+        self._generation = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self.cast: Dict[int, array] = {}
+        self.director_of: Dict[int, int] = {}
+        # Genre ids as a bitmask per movie; genre bit positions in `genre_bits`
+        self.genre_mask: Dict[int, int] = {}
+        self.genre_bits: Dict[int, int] = {}
+        self.actor_movies: Dict[int, array] = {}
+        self.director_movies: Dict[int, array] = {}
+        self.genre_movies: Dict[int, array] = {}
+        self.costars: Dict[int, array] = {}
+        self.shared: Dict[int, array] = {}
+
+    # Building and maintenance
+
+    def build(self, movies: Iterable[Tuple[int, Optional[int]]],
+              cast_rows: Iterable[Tuple[int, int]],
+              genre_rows: Iterable[Tuple[int, int]]) -> None:
+        """Replace the index contents.
+
+        `movies` are (id, director_id) pairs and the row iterables are
+        (movie_id, actor_id/genre_id) pairs, all in movie id order.
+        """
+        director_of: Dict[int, int] = {}
+        director_movies: Dict[int, array] = {}
+        for movie_id, director_id in movies:
+            if director_id is not None:
+                director_of[movie_id] = director_id
+                director_movies.setdefault(director_id, array("I")).append(movie_id)
+
+        cast = {movie_id: array("I", map(itemgetter(1), rows))
+                for movie_id, rows in groupby(cast_rows, key=itemgetter(0))}
+        actor_movies: Dict[int, array] = {}
+        for movie_id, actors in cast.items():
+            for actor_id in actors:
+                movies_of = actor_movies.get(actor_id)
+                if movies_of is None:
+                    movies_of = actor_movies[actor_id] = array("I")
+                movies_of.append(movie_id)
+
+        genre_bits: Dict[int, int] = {}
+        genre_mask: Dict[int, int] = {}
+        genre_movies: Dict[int, array] = {}
+        for movie_id, genre_id in genre_rows:
+            bit = genre_bits.setdefault(genre_id, len(genre_bits))
+            genre_mask[movie_id] = genre_mask.get(movie_id, 0) | (1 << bit)
+            genre_movies.setdefault(genre_id, array("I")).append(movie_id)
+
+        # Co-star counts: one C-level Counter pass over the casts of each actor's movies
+        costars: Dict[int, array] = {}
+        shared: Dict[int, array] = {}
+        for actor_id, movies_of in actor_movies.items():
+            counter = Counter(chain.from_iterable(map(cast.__getitem__, movies_of)))
+            del counter[actor_id]
+            keys = sorted(counter)
+            costars[actor_id] = array("I", keys)
+            shared[actor_id] = array("I", map(counter.__getitem__, keys))
+
+        with self._lock:
+            self._reset()
+            self.cast = cast
+            self.director_of = director_of
+            self.genre_mask = genre_mask
+            self.genre_bits = genre_bits
+            self.actor_movies = actor_movies
+            self.director_movies = director_movies
+            self.genre_movies = genre_movies
+            self.costars = costars
+            self.shared = shared
+            self.loaded = True
+
+    def load(self, db: Session) -> None:
+        """(Re)build the index from the movies and association tables."""
+        with self._lock:
+            self._pending = []
+            generation = self._generation
+        self.build(
+            _iterrows(db, "SELECT id, director_id FROM movies ORDER BY id"),
+            _iterrows(db, "SELECT movie_id, actor_id FROM movie_actors ORDER BY movie_id, actor_id"),
+            _iterrows(db, "SELECT movie_id, genre_id FROM movie_genres ORDER BY movie_id"),
+        )
+        with self._lock:
+            self.loaded = generation == self._generation
+            pending, self._pending = self._pending, None
+        for movie in pending:
+            if not self.has_movie(movie.id):
+                self.add_movie(movie)
+
+    def ensure_loaded(self, db: Session) -> None:
+        if self.loaded:
+            return
+        with self._build_lock:
+            if not self.loaded:
+                self.load(db)
+
+    def invalidate(self) -> None:
+        """Mark the index stale; the next query rebuilds it."""
+        with self._lock:
+            self._generation += 1
+            self.loaded = False
+
+    def add_movie(self, movie) -> None:
+        """Index one new movie (an ORM `Movie` with its genres and actors loaded)."""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(movie)
+                return
+            if not self.loaded:
+                return
+            movie_id = movie.id
+            if movie.director_id is not None:
+                self.director_of[movie_id] = movie.director_id
+                insort(self.director_movies.setdefault(movie.director_id, array("I")), movie_id)
+            for genre in movie.genres:
+                bit = self.genre_bits.setdefault(genre.id, len(self.genre_bits))
+                self.genre_mask[movie_id] = self.genre_mask.get(movie_id, 0) | (1 << bit)
+                insort(self.genre_movies.setdefault(genre.id, array("I")), movie_id)
+            actor_ids = sorted({actor.id for actor in movie.actors})
+            if actor_ids:
+                self.cast[movie_id] = array("I", actor_ids)
+            for actor_id in actor_ids:
+                insort(self.actor_movies.setdefault(actor_id, array("I")), movie_id)
+                costars = self.costars.setdefault(actor_id, array("I"))
+                shared = self.shared.setdefault(actor_id, array("I"))
+                for other in actor_ids:
+                    if other == actor_id:
+                        continue
+                    i = bisect_left(costars, other)
+                    if i < len(costars) and costars[i] == other:
+                        shared[i] += 1
+                    else:
+                        costars.insert(i, other)
+                        shared.insert(i, 1)
+
+    # Queries
+
+    def has_movie(self, movie_id: int) -> bool:
+        return movie_id in self.cast or movie_id in self.director_of or movie_id in self.genre_mask
+
+    def collaborators(self, actor_id: int, limit: int = 10) -> List[Tuple[int, int]]:
+        """Top (co-star id, shared movie count) pairs, most shared first, then by id."""
+        costars = self.costars.get(actor_id)
+        if not costars:
+            return []
+        shared = self.shared[actor_id]
+        top = heapq.nsmallest(limit, range(len(costars)), key=lambda i: (-shared[i], costars[i]))
+        return [(costars[i], shared[i]) for i in top]
+
+    def _candidates(self, movie_id: int, limit: int) -> set:
+        candidates = set()
+        for actor_id in self.cast.get(movie_id, ()):
+            movies_of = self.actor_movies.get(actor_id, ())
+            if len(movies_of) <= CANDIDATE_FANOUT:
+                candidates.update(movies_of)
+        director_id = self.director_of.get(movie_id)
+        if director_id is not None:
+            movies_of = self.director_movies.get(director_id, ())
+            if len(movies_of) <= CANDIDATE_FANOUT:
+                candidates.update(movies_of)
+        candidates.discard(movie_id)
+        if len(candidates) < limit:
+            genre_ids = [g for g, bit in self.genre_bits.items() if self.genre_mask.get(movie_id, 0) >> bit & 1]
+            if genre_ids:
+                rarest = min(genre_ids, key=lambda g: len(self.genre_movies[g]))
+                movies_of = self.genre_movies[rarest]
+                # The movies closest to this one by id, i.e. added around the same time
+                i = bisect_left(movies_of, movie_id)
+                window = movies_of[max(0, i - GENRE_FALLBACK // 2):i + GENRE_FALLBACK // 2 + 1]
+                candidates.update(m for m in window if m != movie_id)
+        return candidates
+
+    def related(self, movie_id: int, limit: int = 10) -> List[RelatedMovie]:
+        """Top related movies, best score first, then by id."""
+        cast = set(self.cast.get(movie_id, ()))
+        director_id = self.director_of.get(movie_id)
+        mask = self.genre_mask.get(movie_id, 0)
+        scored = []
+        for other in self._candidates(movie_id, limit):
+            shared_actors = len(cast.intersection(self.cast.get(other, ())))
+            same_director = director_id is not None and self.director_of.get(other) == director_id
+            other_mask = self.genre_mask.get(other, 0)
+            shared_genres = (mask & other_mask).bit_count()
+            union = (mask | other_mask).bit_count()
+            score = (CAST_WEIGHT * shared_actors + DIRECTOR_WEIGHT * same_director
+                     + GENRE_WEIGHT * (shared_genres / union if union else 0.0))
+            if score > 0:
+                scored.append(RelatedMovie(other, round(score, 4), shared_actors, shared_genres, same_director))
+        return heapq.nsmallest(limit, scored, key=lambda r: (-r.score, r.movie_id))
+
+related_index = RelatedIndex()
+
+events.subscribe(events.MOVIE_CREATED, related_index.add_movie)
+events.subscribe(events.CATALOG_BULK_LOADED, lambda count: related_index.invalidate())
+events.subscribe(events.CATALOG_CHANGED, lambda versions: related_index.invalidate())
@@ -1,30 +1,100 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from .. import crud, models, schemas
+from ..batch import MAX_BATCH_IDS, batch_response, query_ids
+from ..cache import CachedRoute
 from ..database import get_db
+from ..graph import MAX_DEGREES
+from ..fields import ACTOR, lean_response
+from ..pagination import PageQuery, page_query, page_response, parse_sort
+from ..readers import ReadRouter, Reader, get_reader
+from ..write_queue import write_queue
 
-router = APIRouter(prefix="/actors", tags=["actors"])
+router = APIRouter(prefix="/actors", tags=["actors"], route_class=CachedRoute)
 
-@router.get("/", response_model=List[schemas.Actor])
-def read_actors(
+# Async read routes, mounted ahead of `router` when the async database path is enabled
+async_router = APIRouter(prefix="/actors", tags=["actors"], route_class=CachedRoute)
+
+# Read routes go on both
+reads = ReadRouter(router, async_router)
+
+IDS_DESCRIPTION = f"Comma-separated actor IDs to fetch in full detail (at most {MAX_BATCH_IDS})"
+
+FIELDS_DESCRIPTION = "Comma-separated fields to return, e.g. id,name (default: all)"
+
+SORT_PATTERN = "^-?(id|name)$"
+
+@reads.get("/", response_model=List[schemas.Actor])
+async def read_actors(
+    response: Response,
     movie_id: Optional[int] = Query(None, description="Filter by movie ID"),
     genre_id: Optional[int] = Query(None, description="Filter by genre ID (based on movies they've acted in)"),
-    db: Session = Depends(get_db)
+    page: PageQuery = Depends(page_query(SORT_PATTERN)),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    ids: Optional[str] = Query(None, description=IDS_DESCRIPTION),
+    reader: Reader = Depends(get_reader)
 ):
-    """Get all actors with optional filtering by movie or genre."""
-    actors = crud.get_actors(db=db, movie_id=movie_id, genre_id=genre_id)
-    return actors
+    """Get a page of actors with optional filtering by movie or genre.
+
+    The cursor for the next page, if any, is returned in the X-Next-Cursor header.
+    `fields` narrows each item to the listed fields; the id is always included.
+    With `ids`, the listed actors are returned in full detail instead, in that order.
+    """
+    if ids is not None:
+        return batch_response(response, "actors", await reader.get_by_ids("actors", query_ids(ids)))
+    selection = ACTOR.select(fields, extra=[parse_sort(page.sort)[0]])
+    actors = await reader.get_actor_rows(
+        selection=selection,
+        movie_id=movie_id,
+        genre_id=genre_id,
+        sort=page.sort,
+        limit=page.limit + 1,
+        after=page.after
+    )
+    return lean_response(response, selection.rows(page_response(response, actors, page.limit, page.sort)))
 
-@router.get("/{actor_id}", response_model=schemas.ActorWithMovies)
-def read_actor(actor_id: int, db: Session = Depends(get_db)):
+@reads.get("/{actor_id}", response_model=schemas.ActorWithMovies)
+async def read_actor(actor_id: int, reader: Reader = Depends(get_reader)):
     """Get a specific actor by ID with their movie filmography."""
-    db_actor = crud.get_actor(db, actor_id=actor_id)
+    snapshot = await reader.snapshot()
+    db_actor = snapshot.actor(actor_id) if snapshot else await reader.get_actor(actor_id=actor_id)
     if db_actor is None:
         raise HTTPException(status_code=404, detail="Actor not found")
     return db_actor
 
+@reads.get("/{actor_id}/collaborators", response_model=List[schemas.Collaborator])
+async def read_collaborators(
+    actor_id: int,
+    limit: int = Query(10, ge=1, le=50, description="Number of collaborators"),
+    reader: Reader = Depends(get_reader)
+):
+    """Actors who appeared with this one most often."""
+    collaborators = await reader.get_collaborators(actor_id=actor_id, limit=limit)
+    if collaborators is None:
+        raise HTTPException(status_code=404, detail="Actor not found")
+    return collaborators
+
+@reads.get("/{actor_id}/path/{other_id}", response_model=schemas.ActorPath)
+async def read_actor_path(
+    actor_id: int,
+    other_id: int,
+    max_degrees: int = Query(MAX_DEGREES, ge=1, le=MAX_DEGREES, description="Longest chain of movies to search"),
+    reader: Reader = Depends(get_reader)
+):
+    """Shortest chain of shared movies linking two actors.
+
+    `degrees` is null when they are not connected within `max_degrees`.
+    """
+    path = await reader.get_actor_path(source=actor_id, target=other_id, max_degrees=max_degrees)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Actor not found")
+    return path
+
 @router.post("/", response_model=schemas.Actor)
-def create_actor(actor: schemas.ActorCreate, db: Session = Depends(get_db)):
+async def create_actor(actor: schemas.ActorCreate, db: Session = Depends(get_db)):
     """Create a new actor."""
-    return crud.create_actor(db=db, actor=actor) 
\ No newline at end of file
+    if write_queue.enabled:
+        return await write_queue.write(db, crud.add_actor, actor)
+    return await run_in_threadpool(crud.create_actor, db, actor)
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List, Optional
+from .. import schemas
+from ..autocomplete import DEFAULT_LIMIT, MAX_LIMIT, MAX_QUERY_LENGTH
+from ..cache import CachedRoute
+from ..readers import ReadRouter, Reader, get_reader
+from .search import KIND_PATTERN
+
+router = APIRouter(prefix="/autocomplete", tags=["search"], route_class=CachedRoute)
+
+# Async read routes, mounted ahead of `router` when the async database path is enabled
+async_router = APIRouter(prefix="/autocomplete", tags=["search"], route_class=CachedRoute)
+
+# Read routes go on both
+reads = ReadRouter(router, async_router)
+
+@reads.get("", response_model=List[schemas.AutocompleteResult], name="read_autocomplete")
+async def read_autocomplete(
+    q: str = Query(..., min_length=1, max_length=MAX_QUERY_LENGTH, description="Partial, possibly misspelled name"),
+    type: Optional[str] = Query(None, pattern=KIND_PATTERN, description="Restrict results to one kind"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT, description="Maximum number of results"),
+    reader: Reader = Depends(get_reader)
+):
+    """Typo-tolerant name suggestions, ranked by trigram similarity and film count."""
+    return await reader.autocomplete(q, kind=type, limit=limit)
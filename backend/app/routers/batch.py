@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
+from .. import schemas
+from ..batch import batch_results, parse_lookups
+from ..cache import CachedRoute
+from ..readers import ReadRouter, Reader, get_reader
+
+router = APIRouter(prefix="/batch", tags=["batch"], route_class=CachedRoute)
+
+# Async read routes, mounted ahead of `router` when the async database path is enabled
+async_router = APIRouter(prefix="/batch", tags=["batch"], route_class=CachedRoute)
+
+# Read routes go on both
+reads = ReadRouter(router, async_router)
+
+@reads.post("", response_model=schemas.BatchResponse, name="read_batch")
+async def read_batch(batch: schemas.BatchRequest, reader: Reader = Depends(get_reader)):
+    """Resolve several entity lookups in one call.
+
+    Each path is "/{movies|actors|directors|genres}/{id}" or
+    "/{resource}?ids=1,2,3", answered with the same body as the matching GET
+    and its own status. Lookups are grouped into one query per entity type.
+    """
+    loader, lookups, errors = parse_lookups(batch.requests)
+    await reader.load_batch(loader)
+    return ORJSONResponse({"responses": batch_results(loader, batch.requests, lookups, errors)})
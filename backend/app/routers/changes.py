@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, Query
+from .. import changes, schemas
+from ..metrics import InstrumentedRoute
+from ..readers import ReadRouter, Reader, get_reader
+
+# Not cached or ETagged: an empty answer is only current until the next write
+router = APIRouter(prefix="/changes", tags=["changes"], route_class=InstrumentedRoute)
+
+# Async read routes, mounted ahead of `router` when the async database path is enabled
+async_router = APIRouter(prefix="/changes", tags=["changes"], route_class=InstrumentedRoute)
+
+# Read routes go on both
+reads = ReadRouter(router, async_router)
+
+SINCE_DESCRIPTION = "Return changes after this seq (last_seq of the previous call)"
+
+WAIT_DESCRIPTION = "Seconds to hold the request open when nothing has changed yet (long poll)"
+
+@reads.get("", response_model=schemas.ChangeFeed, name="read_changes")
+async def read_changes(
+    since: int = Query(0, ge=0, description=SINCE_DESCRIPTION),
+    limit: int = Query(changes.DEFAULT_CHANGES_LIMIT, ge=1, le=changes.MAX_CHANGES_LIMIT, description="Maximum number of changes"),
+    wait: float = Query(0, ge=0, le=changes.MAX_WAIT_SECONDS, description=WAIT_DESCRIPTION),
+    reader: Reader = Depends(get_reader)
+):
+    """Catalog inserts, updates and deletes in commit order, for syncing deltas.
+
+    The handler is async so a long poll holds no worker thread; on the sync path queries run on the threadpool.
+    """
+    rows, head = await changes.long_poll(lambda: reader.get_changes(since, limit), wait)
+    return changes.feed(rows, head, since)
@@ -1,26 +1,40 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List
 from .. import crud, models, schemas
+from ..cache import CachedRoute
 from ..database import get_db
+from ..readers import ReadRouter, Reader, get_reader
+from ..write_queue import write_queue
 
-router = APIRouter(prefix="/directors", tags=["directors"])
+router = APIRouter(prefix="/directors", tags=["directors"], route_class=CachedRoute)
 
-@router.get("/", response_model=List[schemas.Director])
-def read_directors(db: Session = Depends(get_db)):
+# Async read routes, mounted ahead of `router` when the async database path is enabled
+async_router = APIRouter(prefix="/directors", tags=["directors"], route_class=CachedRoute)
+
+# Read routes go on both
+reads = ReadRouter(router, async_router)
+
+@reads.get("/", response_model=List[schemas.Director])
+async def read_directors(reader: Reader = Depends(get_reader)):
     """Get all directors."""
-    directors = crud.get_directors(db)
+    snapshot = await reader.snapshot()
+    directors = snapshot.directors() if snapshot else await reader.get_directors()
     return directors
 
-@router.get("/{director_id}", response_model=schemas.DirectorWithMovies)
-def read_director(director_id: int, db: Session = Depends(get_db)):
+@reads.get("/{director_id}", response_model=schemas.DirectorWithMovies)
+async def read_director(director_id: int, reader: Reader = Depends(get_reader)):
     """Get a specific director by ID with their filmography."""
-    db_director = crud.get_director(db, director_id=director_id)
+    snapshot = await reader.snapshot()
+    db_director = snapshot.director(director_id) if snapshot else await reader.get_director(director_id=director_id)
     if db_director is None:
         raise HTTPException(status_code=404, detail="Director not found")
     return db_director
 
 @router.post("/", response_model=schemas.Director)
-def create_director(director: schemas.DirectorCreate, db: Session = Depends(get_db)):
+async def create_director(director: schemas.DirectorCreate, db: Session = Depends(get_db)):
     """Create a new director."""
-    return crud.create_director(db=db, director=director) 
\ No newline at end of file
+    if write_queue.enabled:
+        return await write_queue.write(db, crud.add_director, director)
+    return await run_in_threadpool(crud.create_director, db, director)
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, Query, Response
+from typing import List, Optional
+from .. import schemas
+from ..cache import CachedRoute
+from ..facets import FacetPage, FacetQuery
+from ..pagination import NEXT_CURSOR_HEADER, PageQuery, encode_cursor, page_query
+from ..readers import ReadRouter, Reader, get_reader
+
+router = APIRouter(prefix="/facets", tags=["facets"], route_class=CachedRoute)
+
+# Async read routes, mounted ahead of `router` when the async database path is enabled
+async_router = APIRouter(prefix="/facets", tags=["facets"], route_class=CachedRoute)
+
+# Read routes go on both
+reads = ReadRouter(router, async_router)
+
+SORT_PATTERN = "^-?(id|release_year)$"
+MATCH_PATTERN = "^(any|all)$"
+
+def facet_query(
+    genre_id: List[int] = Query([], description="Genre IDs (repeat the parameter to select several)"),
+    genre_match: str = Query("any", pattern=MATCH_PATTERN, description="Match any or all selected genres"),
+    actor_id: List[int] = Query([], description="Actor IDs"),
+    actor_match: str = Query("any", pattern=MATCH_PATTERN, description="Match any or all selected actors"),
+    director_id: List[int] = Query([], description="Director IDs (any)"),
+    release_year: List[int] = Query([], description="Release years (any)"),
+    year_min: Optional[int] = Query(None, description="Earliest release year"),
+    year_max: Optional[int] = Query(None, description="Latest release year"),
+    duration_min: Optional[int] = Query(None, ge=0, description="Minimum duration in minutes"),
+    duration_max: Optional[int] = Query(None, ge=0, description="Maximum duration in minutes"),
+) -> FacetQuery:
+    return FacetQuery(
+        genre_ids=genre_id, genre_match=genre_match, actor_ids=actor_id, actor_match=actor_match,
+        director_ids=director_id, release_years=release_year, year_min=year_min, year_max=year_max,
+        duration_min=duration_min, duration_max=duration_max,
+    )
+
+def faceted_response(response: Response, movies: list, page: FacetPage, sort: str) -> dict:
+    if page.next_position is not None:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(sort, *page.next_position)
+    return {"total": page.total, "movies": movies, "counts": page.counts}
+
+@reads.get("/movies", response_model=schemas.FacetedMovies, name="read_movie_facets")
+async def read_movie_facets(
+    response: Response,
+    query: FacetQuery = Depends(facet_query),
+    page: PageQuery = Depends(page_query(SORT_PATTERN)),
+    reader: Reader = Depends(get_reader)
+):
+    """Filter movies on several values per facet, with per-facet counts.
+
+    Facets combine with AND; values within a facet combine with OR unless
+    `genre_match`/`actor_match` is "all". Counts for each facet are computed
+    with the other facets' selections applied.
+    """
+    movies, facet_page = await reader.facet_search(query, sort=page.sort, limit=page.limit, after=page.after)
+    return faceted_response(response, movies, facet_page, page.sort)
@@ -1,26 +1,40 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List
 from .. import crud, models, schemas
+from ..cache import CachedRoute
 from ..database import get_db
+from ..readers import ReadRouter, Reader, get_reader
+from ..write_queue import write_queue
 
-router = APIRouter(prefix="/genres", tags=["genres"])
+router = APIRouter(prefix="/genres", tags=["genres"], route_class=CachedRoute)
 
-@router.get("/", response_model=List[schemas.Genre])
-def read_genres(db: Session = Depends(get_db)):
+# Async read routes, mounted ahead of `router` when the async database path is enabled
+async_router = APIRouter(prefix="/genres", tags=["genres"], route_class=CachedRoute)
+
+# Read routes go on both
+reads = ReadRouter(router, async_router)
+
+@reads.get("/", response_model=List[schemas.Genre])
+async def read_genres(reader: Reader = Depends(get_reader)):
     """Get all genres."""
-    genres = crud.get_genres(db)
+    snapshot = await reader.snapshot()
+    genres = snapshot.genres() if snapshot else await reader.get_genres()
     return genres
 
-@router.get("/{genre_id}", response_model=schemas.Genre)
-def read_genre(genre_id: int, db: Session = Depends(get_db)):
+@reads.get("/{genre_id}", response_model=schemas.Genre)
+async def read_genre(genre_id: int, reader: Reader = Depends(get_reader)):
     """Get a specific genre by ID."""
-    db_genre = crud.get_genre(db, genre_id=genre_id)
+    snapshot = await reader.snapshot()
+    db_genre = snapshot.genre(genre_id) if snapshot else await reader.get_genre(genre_id=genre_id)
     if db_genre is None:
         raise HTTPException(status_code=404, detail="Genre not found")
     return db_genre
 
 @router.post("/", response_model=schemas.Genre)
-def create_genre(genre: schemas.GenreCreate, db: Session = Depends(get_db)):
+async def create_genre(genre: schemas.GenreCreate, db: Session = Depends(get_db)):
     """Create a new genre."""
-    return crud.create_genre(db=db, genre=genre) 
\ No newline at end of file
+    if write_queue.enabled:
+        return await write_queue.write(db, crud.add_genre, genre)
+    return await run_in_threadpool(crud.create_genre, db, genre)
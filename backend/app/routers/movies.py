@@ -1,38 +1,134 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from .. import crud, models, schemas
+from .. import bulk, crud, models, schemas
+from ..batch import MAX_BATCH_IDS, batch_response, query_ids
+from ..cache import CachedRoute
 from ..database import get_db
+from ..export import export_response
+from ..fields import MOVIE_SUMMARY, lean_response
+from ..pagination import PageQuery, page_query, page_response, parse_sort
+from ..readers import ReadRouter, Reader, get_reader
+from ..write_queue import write_queue
 
-router = APIRouter(prefix="/movies", tags=["movies"])
+router = APIRouter(prefix="/movies", tags=["movies"], route_class=CachedRoute)
 
-@router.get("/", response_model=List[schemas.MovieSummary])
-def read_movies(
+# Async read routes, mounted ahead of `router` when the async database path is enabled
+async_router = APIRouter(prefix="/movies", tags=["movies"], route_class=CachedRoute)
+
+# Read routes go on both
+reads = ReadRouter(router, async_router)
+
+IDS_DESCRIPTION = f"Comma-separated movie IDs to fetch in full detail (at most {MAX_BATCH_IDS})"
+
+FIELDS_DESCRIPTION = "Comma-separated fields to return, e.g. id,title,director.name (default: all)"
+
+SORT_PATTERN = "^-?(id|title|release_year)$"
+
+EXPORT_FORMAT_PATTERN = "^(ndjson|csv)$"
+
+AFTER_DESCRIPTION = "Resume after this movie ID (the last one received)"
+
+@reads.get("/", response_model=List[schemas.MovieSummary])
+async def read_movies(
+    response: Response,
     genre_id: Optional[int] = Query(None, description="Filter by genre ID"),
     director_id: Optional[int] = Query(None, description="Filter by director ID"),
     actor_id: Optional[int] = Query(None, description="Filter by actor ID"),
     release_year: Optional[int] = Query(None, description="Filter by release year"),
-    db: Session = Depends(get_db)
+    page: PageQuery = Depends(page_query(SORT_PATTERN)),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    ids: Optional[str] = Query(None, description=IDS_DESCRIPTION),
+    reader: Reader = Depends(get_reader)
 ):
-    """Get all movies with optional filtering by genre, director, actor, or release year."""
-    movies = crud.get_movies(
-        db=db,
+    """Get a page of movies with optional filtering by genre, director, actor, or release year.
+
+    The cursor for the next page, if any, is returned in the X-Next-Cursor header.
+    `fields` narrows each item to the listed fields; the id is always included.
+    With `ids`, the listed movies are returned in full detail instead, in that order.
+    """
+    if ids is not None:
+        return batch_response(response, "movies", await reader.get_by_ids("movies", query_ids(ids)))
+    selection = MOVIE_SUMMARY.select(fields, extra=[parse_sort(page.sort)[0]])
+    movies = await reader.get_movie_rows(
+        selection=selection,
         genre_id=genre_id,
         director_id=director_id,
         actor_id=actor_id,
-        release_year=release_year
+        release_year=release_year,
+        sort=page.sort,
+        limit=page.limit + 1,
+        after=page.after
     )
-    return movies
+    return lean_response(response, selection.rows(page_response(response, movies, page.limit, page.sort)))
+
+@reads.get("/export", response_class=StreamingResponse)
+async def export_movies(
+    request: Request,
+    response: Response,
+    format: str = Query("ndjson", pattern=EXPORT_FORMAT_PATTERN, description="Output format"),
+    after: int = Query(0, ge=0, description=AFTER_DESCRIPTION),
+    reader: Reader = Depends(get_reader)
+):
+    """Stream the whole catalog as NDJSON or CSV, ordered by id, with cast and genre ids.
 
-@router.get("/{movie_id}", response_model=schemas.Movie)
-def read_movie(movie_id: int, db: Session = Depends(get_db)):
+    Gzipped when the client sends Accept-Encoding: gzip. An interrupted export
+    resumes with `after` set to the last id received.
+    """
+    return export_response(request, response, reader.export(format, after), format)
+
+@reads.get("/{movie_id}", response_model=schemas.Movie)
+async def read_movie(movie_id: int, reader: Reader = Depends(get_reader)):
     """Get a specific movie by ID with full details including cast and genres."""
-    db_movie = crud.get_movie(db, movie_id=movie_id)
+    snapshot = await reader.snapshot()
+    db_movie = snapshot.movie(movie_id) if snapshot else await reader.get_movie(movie_id=movie_id)
     if db_movie is None:
         raise HTTPException(status_code=404, detail="Movie not found")
     return db_movie
 
+@reads.get("/{movie_id}/related", response_model=List[schemas.RelatedMovie])
+async def read_related_movies(
+    movie_id: int,
+    limit: int = Query(10, ge=1, le=50, description="Number of related movies"),
+    reader: Reader = Depends(get_reader)
+):
+    """Movies sharing cast, director or genres with this one, best match first."""
+    related = await reader.get_related_movies(movie_id=movie_id, limit=limit)
+    if related is None:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    return related
+
 @router.post("/", response_model=schemas.Movie)
-def create_movie(movie: schemas.MovieCreate, db: Session = Depends(get_db)):
+async def create_movie(movie: schemas.MovieCreate, db: Session = Depends(get_db)):
     """Create a new movie."""
-    return crud.create_movie(db=db, movie=movie) 
\ No newline at end of file
+    if write_queue.enabled:
+        return await write_queue.write(db, crud.add_movie, movie)
+    return await run_in_threadpool(crud.create_movie, db, movie)
+
+@router.post("/bulk", response_model=schemas.BulkImportReport)
+async def bulk_import_movies(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$", description="Body format; defaults from Content-Type"),
+    batch_size: int = Query(bulk.BATCH_SIZE, ge=1, le=50000, description="Rows per transaction"),
+    db: Session = Depends(get_db)
+):
+    """Stream an NDJSON or CSV catalog into the database.
+
+    Directors, actors and genres are given by name and created when missing.
+    The body is processed as it arrives, one transaction per batch.
+    """
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    parser = bulk.RecordParser(format)
+    importer = bulk.BulkImporter(db, batch_size=batch_size)
+
+    def consume(lines):
+        for line, record, error in parser.feed(lines):
+            importer.add(line, record, error)
+
+    # Database work runs on the threadpool so the event loop keeps streaming
+    async for lines in bulk.iter_line_chunks(request.stream()):
+        await run_in_threadpool(consume, lines)
+    return await run_in_threadpool(importer.finish)
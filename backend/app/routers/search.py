@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List, Optional
+from .. import schemas
+from ..cache import CachedRoute
+from ..readers import ReadRouter, Reader, get_reader
+
+router = APIRouter(prefix="/search", tags=["search"], route_class=CachedRoute)
+
+# Async read routes, mounted ahead of `router` when the async database path is enabled
+async_router = APIRouter(prefix="/search", tags=["search"], route_class=CachedRoute)
+
+# Read routes go on both
+reads = ReadRouter(router, async_router)
+
+KIND_PATTERN = "^(movie|actor|director)$"
+
+@reads.get("/", response_model=List[schemas.SearchResult])
+async def search(
+    q: str = Query(..., min_length=1, description="Search text"),
+    type: Optional[str] = Query(None, pattern=KIND_PATTERN, description="Restrict results to one kind"),
+    prefix: bool = Query(True, description="Match the last word as a prefix (typeahead)"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of results"),
+    reader: Reader = Depends(get_reader)
+):
+    """Full-text search over movie titles and synopses and actor/director names and bios, best match first."""
+    return await reader.search(q=q, kind=type, prefix=prefix, limit=limit)
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List
+from .. import schemas
+from ..cache import CachedRoute
+from ..readers import ReadRouter, Reader, get_reader
+from ..stats import ACTOR, DEFAULT_TOP_LIMIT, DIRECTOR, MAX_TOP_LIMIT
+
+router = APIRouter(prefix="/stats", tags=["stats"], route_class=CachedRoute)
+
+# Async read routes, mounted ahead of `router` when the async database path is enabled
+async_router = APIRouter(prefix="/stats", tags=["stats"], route_class=CachedRoute)
+
+# Read routes go on both
+reads = ReadRouter(router, async_router)
+
+@reads.get("/genres", response_model=List[schemas.GenreStats], name="read_genre_stats")
+async def read_genre_stats(reader: Reader = Depends(get_reader)):
+    """Movie count and average duration per genre, busiest first."""
+    return await reader.get_genre_stats()
+
+@reads.get("/years", response_model=List[schemas.YearStats], name="read_year_stats")
+async def read_year_stats(reader: Reader = Depends(get_reader)):
+    """Movie count and average duration per release year."""
+    return await reader.get_year_stats()
+
+@reads.get("/directors", response_model=List[schemas.PersonStats], name="read_director_stats")
+async def read_director_stats(
+    limit: int = Query(DEFAULT_TOP_LIMIT, ge=1, le=MAX_TOP_LIMIT, description="Number of directors"),
+    reader: Reader = Depends(get_reader)
+):
+    """Directors with the most movies."""
+    return await reader.get_top_stats(DIRECTOR, limit)
+
+@reads.get("/actors", response_model=List[schemas.PersonStats], name="read_actor_stats")
+async def read_actor_stats(
+    limit: int = Query(DEFAULT_TOP_LIMIT, ge=1, le=MAX_TOP_LIMIT, description="Number of actors"),
+    reader: Reader = Depends(get_reader)
+):
+    """The most prolific actors."""
+    return await reader.get_top_stats(ACTOR, limit)
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
 # Base schemas
 class GenreBase(BaseModel):
@@ -79,6 +80,126 @@ class Movie(MovieBase):
     class Config:
         from_attributes = True
 
+# Faceted search schemas
+class FacetedMovies(BaseModel):
+    total: int
+    movies: List[MovieSummary]
+    # Facet name -> value -> number of matching movies
+    counts: Dict[str, Dict[int, int]]
+
+class RelatedMovie(BaseModel):
+    movie: MovieSummary
+    score: float
+    shared_actors: int
+    shared_genres: int
+    same_director: bool
+
+class Collaborator(BaseModel):
+    actor: Actor
+    # Movies the two actors appeared in together
+    shared_movies: int
+
+class ActorPath(BaseModel):
+    # Number of movies in the chain; None when no path exists within the cap
+    degrees: Optional[int] = None
+    # actors[i] and actors[i + 1] both appear in movies[i]
+    actors: List[Actor] = []
+    movies: List[MovieSummary] = []
+
+# Batch schemas
+class BatchRequest(BaseModel):
+    # Entity paths such as "/movies/1" or "/actors?ids=2,3", at most 50 per call
+    requests: List[str] = Field(..., min_length=1, max_length=50)
+
+class BatchResult(BaseModel):
+    path: str
+    status: int
+    body: Any
+
+class BatchResponse(BaseModel):
+    responses: List[BatchResult]
+
+# Change feed schemas
+class Change(BaseModel):
+    seq: int
+    entity: str  # movies, actors, directors, genres, movie_actors or movie_genres
+    id: int
+    # The actor or genre of a movie_actors/movie_genres change, whose id is the movie's
+    ref_id: Optional[int] = None
+    op: str  # insert, update or delete
+    version: Optional[int] = None
+    changed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class ChangeFeed(BaseModel):
+    changes: List[Change]
+    # Pass as `since` on the next call
+    last_seq: int
+    # Newest seq in the log
+    head_seq: int
+
+# Statistics schemas
+class GenreStats(BaseModel):
+    id: int
+    name: str
+    movie_count: int
+    # Mean of the known durations, in minutes
+    average_duration: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+class YearStats(BaseModel):
+    release_year: int
+    movie_count: int
+    average_duration: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+class PersonStats(BaseModel):
+    id: int
+    name: str
+    movie_count: int
+    average_duration: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+# Bulk import schemas
+class BulkMovie(MovieBase):
+    director: Optional[str] = None
+    actors: List[str] = []
+    genres: List[str] = []
+
+class BulkImportReport(BaseModel):
+    imported: int
+    rejected: int
+    directors_created: int
+    actors_created: int
+    genres_created: int
+    seconds: float
+    rows_per_second: Optional[float] = None
+    errors: List[dict] = []
+
+# Search schemas
+class SearchResult(BaseModel):
+    type: str
+    id: int
+    name: str
+    release_year: Optional[int] = None
+    score: float
+
+class AutocompleteResult(BaseModel):
+    type: str
+    id: int
+    name: str
+    release_year: Optional[int] = None
+    popularity: int
+    score: float
+
 # Update forward references
 ActorWithMovies.model_rebuild()
 DirectorWithMovies.model_rebuild() 
\ No newline at end of file
@@ -1,7 +1,14 @@
 from sqlalchemy.orm import Session
 from .database import SessionLocal, engine
 from . import models
-import json
+from .bulk import BATCH_SIZE, FORMATS, import_lines
+from .fts import rebuild_search_index
+from .listings import rebuild_listings
+from .stats import rebuild_stats
+from .snapshot import SNAPSHOT_PATH, SnapshotStore
+from .startup import ensure_schema
+import argparse
+import sys
 
 def seed_database():
     """Seed the database with sample movie data."""
@@ -143,5 +150,71 @@ def seed_database():
     finally:
         db.close()
 
+def import_catalog(path: str, fmt: str = None, batch_size: int = BATCH_SIZE) -> dict:
+    """Bulk-import an NDJSON or CSV catalog file ('-' reads stdin)."""
+    if fmt is None:
+        fmt = "csv" if path.endswith(".csv") else "ndjson"
+
+    def progress(importer):
+        print(f"  {importer.imported} movies imported ({importer.rate()} rows/sec)", file=sys.stderr)
+
+    db = SessionLocal()
+    try:
+        if path == "-":
+            report = import_lines(db, sys.stdin, fmt, batch_size, on_batch=progress)
+        else:
+            with open(path, newline="", encoding="utf-8") as f:
+                report = import_lines(db, f, fmt, batch_size, on_batch=progress)
+    finally:
+        db.close()
+
+    print(
+        f"Imported {report['imported']} movies ({report['rejected']} rejected) "
+        f"in {report['seconds']}s, {report['rows_per_second']} rows/sec"
+    )
+    for error in report["errors"]:
+        print(f"  line {error['line']}: {error['error']}", file=sys.stderr)
+    return report
+
+def rebuild_derived_tables():
+    """Recompute the search index, movie listings and statistics from the base tables."""
+    with engine.begin() as connection:
+        rebuild_search_index(connection)
+        rebuild_listings(connection)
+        rebuild_stats(connection)
+    print("Rebuilt search index, movie listings and statistics")
+
+def build_catalog_snapshot():
+    """Write the memory-mapped catalog snapshot served with SNAPSHOT_ENABLED=1."""
+    store = SnapshotStore(SNAPSHOT_PATH, enabled=True)
+    if not store.enabled:
+        print("No snapshot path for an in-memory database; set SNAPSHOT_PATH", file=sys.stderr)
+    elif store.rebuild():
+        print(f"Wrote catalog snapshot to {store.path}")
+    else:
+        print("Another process is building the snapshot", file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed the database or bulk-import a movie catalog.")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("seed", help="Load the sample movies (default)")
+    importer = commands.add_parser("import", help="Stream an NDJSON or CSV catalog into the database")
+    importer.add_argument("path", help="Catalog file, or '-' for stdin")
+    importer.add_argument("--format", choices=FORMATS, help="Defaults from the file extension")
+    importer.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows per transaction")
+    commands.add_parser("rebuild", help="Recompute derived tables (search index, movie listings, statistics)")
+    commands.add_parser("snapshot", help="Build the memory-mapped catalog snapshot")
+    args = parser.parse_args(argv)
+
+    ensure_schema()
+    if args.command == "import":
+        import_catalog(args.path, args.format, args.batch_size)
+    elif args.command == "rebuild":
+        rebuild_derived_tables()
+    elif args.command == "snapshot":
+        build_catalog_snapshot()
+    else:
+        seed_database()
+
 if __name__ == "__main__":
-    seed_database() 
\ No newline at end of file
+    main() 
\ No newline at end of file
@@ -0,0 +1,406 @@
+"""Memory-mapped catalog snapshot shared by every worker.
+
+A snapshot is one read-only file of flat arrays: per entity (movies, actors,
+directors, genres) a sorted ``ids`` column, int32 columns (``NULL_INT`` for
+NULL) and string columns stored as uint64 offsets into a UTF-8 blob with a
+null flag per row; plus CSR adjacency (per-row offsets into a flat id array)
+for movie -> actors, movie -> genres, actor -> movies and director ->
+movies. Workers ``mmap`` it, so every process reads the same page-cache
+pages instead of building its own ORM objects, and reads take no pooled
+connection beyond a freshness check.
+
+The file records the ``catalog_versions`` (see app/etag.py) it was built
+from, inside the same read transaction as the data. `SnapshotStore.fresh`
+serves it only while those still match the database, so a response is never
+older than its ETag; the versions compared are the ones `conditional_get`
+already read for that ETag. Otherwise the route falls back to SQL and a
+rebuild is scheduled. Writes in this process schedule one too, debounced: it
+starts once writes pause for `REBUILD_DELAY_SECONDS`, and no later than
+`REBUILD_MAX_DELAY_SECONDS` after the first of them, so a burst of writes
+costs one rebuild. Rebuilds run on a background thread, take an exclusive
+``flock`` so one worker builds at a time, write a temporary file and
+``os.replace`` it over the old one; workers notice the new inode and remap
+it on their next read.
+
+With ``SNAPSHOT_ENABLED=1`` the detail routes (movie, actor, director,
+genre) and the genre and director lists read from it.
+"""
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import events, models
+from .database import SQLITE_DATABASE_URL, engine
+from .etag import TRACKED_TABLES, versions_statement
+
+MAGIC = b"MXSNAP01"
+NULL_INT = -2 ** 31
+ALIGNMENT = 8
+
+def _default_path() -> Optional[str]:
+    database = make_url(SQLITE_DATABASE_URL).database
+    if not database or database == ":memory:":
+        return None
+    return os.path.abspath(database) + ".snapshot"
+
+SNAPSHOT_ENABLED = os.getenv("SNAPSHOT_ENABLED", "0") == "1"
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH") or _default_path()
+# A rebuild waits until no write has arrived for this many seconds...
+REBUILD_DELAY_SECONDS = float(os.getenv("SNAPSHOT_REBUILD_DELAY_SECONDS", "1.0"))
+# ...but not longer than this after the first write it covers
+REBUILD_MAX_DELAY_SECONDS = float(os.getenv("SNAPSHOT_REBUILD_MAX_DELAY_SECONDS", "10.0"))
+
+# Entity -> (table, int32 columns, string columns)
+ENTITIES = {
+    "movies": (models.Movie.__table__, ("release_year", "duration", "director_id"), ("title", "synopsis")),
+    "actors": (models.Actor.__table__, ("birth_year",), ("name", "bio")),
+    "directors": (models.Director.__table__, ("birth_year",), ("name", "bio")),
+    "genres": (models.Genre.__table__, (), ("name", "description")),
+}
+
+# Adjacency -> (table, source column, target column, source entity)
+LINKS = {
+    "movie_actors": (models.movie_actors, "movie_id", "actor_id", "movies"),
+    "movie_genres": (models.movie_genres, "movie_id", "genre_id", "movies"),
+    "actor_movies": (models.movie_actors, "actor_id", "movie_id", "actors"),
+    "director_movies": (models.Movie.__table__, "director_id", "id", "directors"),
+}
+
+logger = logging.getLogger("app.snapshot")
+
+# Building
+
+def csr(ids: array, pairs: Iterable[Tuple[int, int]]) -> Tuple[array, array]:
+    """Offsets per row of `ids` and targets from (source, target) pairs ordered by source."""
+    offsets, targets = array("I", [0]), array("i")
+    row, size = 0, len(ids)
+    for source, target in pairs:
+        while row < size and ids[row] < source:
+            offsets.append(len(targets))
+            row += 1
+        if row < size and ids[row] == source:
+            targets.append(target)
+    while row < size:
+        offsets.append(len(targets))
+        row += 1
+    return offsets, targets
+
+def _columns(connection, table, ints: Tuple[str, ...], strings: Tuple[str, ...]) -> Dict[str, Any]:
+    sections = {"ids": array("i")}
+    for name in ints:
+        sections[name] = array("i")
+    blobs = {name: (array("Q", [0]), bytearray(), bytearray()) for name in strings}
+    columns = [table.c.id] + [table.c[name] for name in ints + strings]
+    for row in connection.execute(select(*columns).order_by(table.c.id)):
+        sections["ids"].append(row[0])
+        for position, name in enumerate(ints, start=1):
+            value = row[position]
+            sections[name].append(NULL_INT if value is None else value)
+        for position, name in enumerate(strings, start=1 + len(ints)):
+            offsets, blob, nulls = blobs[name]
+            value = row[position]
+            nulls.append(value is None)
+            if value is not None:
+                blob += value.encode()
+            offsets.append(len(blob))
+    for name, (offsets, blob, nulls) in blobs.items():
+        sections[f"{name}.offsets"] = offsets
+        sections[f"{name}.blob"] = blob
+        sections[f"{name}.nulls"] = nulls
+    return sections
+
+def build_snapshot(bind: Engine, path: str) -> dict:
+    """Write a snapshot of the catalog to `path`; returns its header."""
+    sections: Dict[str, Any] = {}
+    with bind.connect() as connection:
+        # One read transaction, so the versions describe exactly the rows read
+        connection.exec_driver_sql("BEGIN")
+        versions = [list(row) for row in connection.execute(versions_statement(TRACKED_TABLES))]
+        for entity, (table, ints, strings) in ENTITIES.items():
+            for name, data in _columns(connection, table, ints, strings).items():
+                sections[f"{entity}.{name}"] = data
+        for link, (table, source, target, entity) in LINKS.items():
+            pairs = connection.execute(
+                select(table.c[source], table.c[target])
+                .where(table.c[source].is_not(None))
+                .order_by(table.c[source], table.c[target])
+            )
+            offsets, targets = csr(sections[f"{entity}.ids"], pairs)
+            sections[f"{link}.offsets"] = offsets
+            sections[f"{link}.targets"] = targets
+        connection.rollback()
+
+    layout, position = {}, 0
+    for name, data in sections.items():
+        size = len(data) * (data.itemsize if isinstance(data, array) else 1)
+        layout[name] = [position, data.typecode if isinstance(data, array) else "B", size]
+        position += size + (-size % ALIGNMENT)
+    header = json.dumps({
+        "byteorder": sys.byteorder,
+        "versions": versions,
+        "built_at": datetime.utcnow().isoformat(),
+        "counts": {entity: len(sections[f"{entity}.ids"]) for entity in ENTITIES},
+        "sections": layout,
+    }).encode()
+    header += b" " * (-(len(MAGIC) + 4 + len(header)) % ALIGNMENT)
+    base = len(MAGIC) + 4 + len(header)
+
+    with open(path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for name, data in sections.items():
+            f.seek(base + layout[name][0])
+            f.write(data.tobytes() if isinstance(data, array) else data)
+        f.truncate(base + position)
+        f.flush()
+        os.fsync(f.fileno())
+    return json.loads(header)
+
+# Reading
+
+class Snapshot:
+    """Read-only view of a snapshot file; rows come back shaped like the response schemas."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a catalog snapshot")
+        (length,) = struct.unpack("<I", view[len(MAGIC):len(MAGIC) + 4])
+        base = len(MAGIC) + 4 + length
+        self.header = json.loads(bytes(view[len(MAGIC) + 4:base]))
+        if self.header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was built on a {self.header['byteorder']}-endian host")
+        self.versions = [tuple(row) for row in self.header["versions"]]
+        self._sections = {
+            name: view[base + offset:base + offset + size].cast(typecode)
+            for name, (offset, typecode, size) in self.header["sections"].items()
+        }
+
+    def _row(self, entity: str, entity_id: int) -> Optional[int]:
+        ids = self._sections[f"{entity}.ids"]
+        row = bisect_left(ids, entity_id)
+        return row if row < len(ids) and ids[row] == entity_id else None
+
+    def _int(self, entity: str, name: str, row: int) -> Optional[int]:
+        value = self._sections[f"{entity}.{name}"][row]
+        return None if value == NULL_INT else value
+
+    def _str(self, entity: str, name: str, row: int) -> Optional[str]:
+        if self._sections[f"{entity}.{name}.nulls"][row]:
+            return None
+        offsets = self._sections[f"{entity}.{name}.offsets"]
+        return str(self._sections[f"{entity}.{name}.blob"][offsets[row]:offsets[row + 1]], "utf-8")
+
+    def _targets(self, link: str, row: int):
+        offsets = self._sections[f"{link}.offsets"]
+        return self._sections[f"{link}.targets"][offsets[row]:offsets[row + 1]]
+
+    def _rows(self, entity: str, ids) -> List[int]:
+        rows = (self._row(entity, entity_id) for entity_id in ids)
+        return [row for row in rows if row is not None]
+
+    def _genre(self, row: int) -> dict:
+        return {
+            "id": self._sections["genres.ids"][row],
+            "name": self._str("genres", "name", row),
+            "description": self._str("genres", "description", row),
+        }
+
+    def _person(self, entity: str, row: int) -> dict:
+        return {
+            "id": self._sections[f"{entity}.ids"][row],
+            "name": self._str(entity, "name", row),
+            "birth_year": self._int(entity, "birth_year", row),
+            "bio": self._str(entity, "bio", row),
+        }
+
+    def _movie_summary(self, row: int) -> dict:
+        director_id = self._int("movies", "director_id", row)
+        director_row = self._row("directors", director_id) if director_id is not None else None
+        return {
+            "id": self._sections["movies.ids"][row],
+            "title": self._str("movies", "title", row),
+            "release_year": self._int("movies", "release_year", row),
+            "synopsis": self._str("movies", "synopsis", row),
+            "duration": self._int("movies", "duration", row),
+            "director": self._person("directors", director_row) if director_row is not None else None,
+        }
+
+    def genres(self) -> List[dict]:
+        return [self._genre(row) for row in range(len(self._sections["genres.ids"]))]
+
+    def genre(self, genre_id: int) -> Optional[dict]:
+        row = self._row("genres", genre_id)
+        return self._genre(row) if row is not None else None
+
+    def directors(self) -> List[dict]:
+        return [self._person("directors", row) for row in range(len(self._sections["directors.ids"]))]
+
+    def director(self, director_id: int) -> Optional[dict]:
+        row = self._row("directors", director_id)
+        if row is None:
+            return None
+        movies = self._rows("movies", self._targets("director_movies", row))
+        return {**self._person("directors", row), "movies": [self._movie_summary(m) for m in movies]}
+
+    def actor(self, actor_id: int) -> Optional[dict]:
+        row = self._row("actors", actor_id)
+        if row is None:
+            return None
+        movies = self._rows("movies", self._targets("actor_movies", row))
+        return {**self._person("actors", row), "movies": [self._movie_summary(m) for m in movies]}
+
+    def movie(self, movie_id: int) -> Optional[dict]:
+        row = self._row("movies", movie_id)
+        if row is None:
+            return None
+        actors = self._rows("actors", self._targets("movie_actors", row))
+        genres = self._rows("genres", self._targets("movie_genres", row))
+        return {
+            **self._movie_summary(row),
+            "actors": [self._person("actors", a) for a in actors],
+            "genres": [self._genre(g) for g in genres],
+        }
+
+# Serving
+
+class SnapshotStore:
+    """The current snapshot of this process, remapped when another worker swaps the file."""
+
+    def __init__(self, path: Optional[str] = SNAPSHOT_PATH, enabled: bool = SNAPSHOT_ENABLED,
+                 bind: Engine = engine):
+        self.path = path
+        self.enabled = enabled and path is not None
+        self.bind = bind
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Snapshot] = None
+        self._file: Optional[Tuple[int, int, int]] = None
+        self._timer: Optional[threading.Timer] = None
+        # First unbuilt rebuild request, and when the rebuild is due
+        self._pending_since: Optional[float] = None
+        self._due = 0.0
+        self._building = False
+        self.builds = 0
+
+    def latest(self) -> Optional[Snapshot]:
+        """The snapshot on disk, mapped once per file version."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key != self._file:
+                # Views into the old map stay valid until requests using it finish
+                self._snapshot = Snapshot(self.path)
+                self._file = key
+            return self._snapshot
+
+    def _usable(self, versions: List[tuple]) -> Optional[Snapshot]:
+        snapshot = self.latest()
+        if snapshot is not None and snapshot.versions == [tuple(row) for row in versions]:
+            return snapshot
+        self.schedule_rebuild(postpone=False)
+        return None
+
+    def fresh(self, db: Session, versions: Optional[List[tuple]] = None) -> Optional[Snapshot]:
+        """The snapshot if it matches the database, else None (and a rebuild is scheduled).
+
+        `versions` are `versions_statement()` rows the request has already
+        read; they are only queried when not given.
+        """
+        if not self.enabled:
+            return None
+        if versions is None:
+            versions = db.execute(versions_statement(TRACKED_TABLES)).all()
+        return self._usable(versions)
+
+    async def fresh_async(self, db: AsyncSession, versions: Optional[List[tuple]] = None) -> Optional[Snapshot]:
+        if not self.enabled:
+            return None
+        if versions is None:
+            versions = (await db.execute(versions_statement(TRACKED_TABLES))).all()
+        return self._usable(versions)
+
+    def schedule_rebuild(self, payload: Any = None, postpone: bool = True) -> None:
+        """Request a rebuild; with `postpone` (writes) it is pushed back to let further writes join it."""
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if self._pending_since is None:
+                if self._building and not postpone:
+                    # A stale read during a build: the build may already cover it
+                    return
+                self._pending_since = now
+            elif not postpone:
+                return
+            self._due = min(now + REBUILD_DELAY_SECONDS, self._pending_since + REBUILD_MAX_DELAY_SECONDS)
+            if self._timer is None and not self._building:
+                self._start_timer(now)
+
+    def _start_timer(self, now: float) -> None:
+        self._timer = threading.Timer(max(0.0, self._due - now), self._background_rebuild)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_rebuild(self) -> None:
+        with self._lock:
+            self._timer = None
+            now = time.monotonic()
+            if now < self._due:
+                # Postponed by writes since the timer was set
+                self._start_timer(now)
+                return
+            self._pending_since = None
+            self._building = True
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception("Snapshot rebuild failed")
+        finally:
+            with self._lock:
+                self._building = False
+                # Writes that arrived during the build get the next one
+                if self._pending_since is not None:
+                    self._start_timer(time.monotonic())
+
+    def rebuild(self) -> bool:
+        """Build a new snapshot and swap it in; False if another process is building one."""
+        with open(self.path + ".lock", "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            temporary = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                header = build_snapshot(self.bind, temporary)
+                os.replace(temporary, self.path)
+            finally:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+        self.builds += 1
+        logger.info("Built catalog snapshot: %s", header["counts"])
+        return True
+
+snapshot_store = SnapshotStore()
+
+for _event in (events.GENRE_CREATED, events.DIRECTOR_CREATED, events.ACTOR_CREATED,
+               events.MOVIE_CREATED, events.CATALOG_BULK_LOADED):
+    events.subscribe(_event, snapshot_store.schedule_rebuild)
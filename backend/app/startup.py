@@ -0,0 +1,146 @@
+"""Process startup: schema creation, index builds and an optional warm-up.
+
+Importing the app touches no database. The app's lifespan runs these steps
+once per worker before it accepts traffic:
+
+- `ensure_schema` creates the schema only when a table is missing, checked
+  with one ``sqlite_master`` query instead of the per-table introspection
+  ``create_all`` does (``SCHEMA_AUTO_CREATE=0`` skips it where migrations
+  are run as a separate step with ``alembic upgrade head``).
+- `load_indexes` builds the autocomplete index, so no request pays for it
+  (``LOAD_INDEXES=0`` leaves it to the first query).
+- `warm_up` (``WARM_UP=1``) reads the database file into the OS page cache,
+  sends `WARM_UP_PATHS` through the app in-process so statements compile,
+  serializers build, the reference lists (genres, directors) land in the
+  response cache and the facet index loads, then replays the SQL those
+  requests ran on every pooled connection to fill each one's SQLite page
+  and prepared-statement caches.
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine, make_url
+
+# Imported for their after_create DDL (triggers, search index)
+from . import changes, etag, fts, listings, stats  # noqa: F401
+from .autocomplete import autocomplete_index
+from .database import SQLITE_POOL_SIZE, Base, engine
+
+SCHEMA_AUTO_CREATE = os.getenv("SCHEMA_AUTO_CREATE", "1") == "1"
+WARM_UP = os.getenv("WARM_UP", "0") == "1"
+LOAD_INDEXES = os.getenv("LOAD_INDEXES", "1") == "1"
+# Bytes of the database file read ahead; matches the production mmap window
+WARM_UP_MAX_BYTES = int(os.getenv("WARM_UP_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Reference lists first: they are cached for REFERENCE_MAX_AGE and most pages need them
+WARM_UP_PATHS = (
+    "/api/genres/",
+    "/api/directors/",
+    "/api/movies/",
+    "/api/movies/?sort=-release_year",
+    "/api/movies/?sort=title",
+    "/api/actors/",
+    "/api/movies/1",
+    "/api/actors/1",
+    "/api/facets/movies?limit=1",
+    "/api/autocomplete?q=a&limit=1",
+)
+
+def ensure_schema(bind: Engine = engine) -> bool:
+    """Create missing tables (with their triggers); return True if any were created."""
+    with bind.begin() as connection:
+        existing = set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'")).scalars())
+        if set(Base.metadata.tables) <= existing:
+            return False
+        Base.metadata.create_all(bind=connection)
+    return True
+
+def load_indexes() -> None:
+    """Build the in-memory indexes that are too slow to build inside a request."""
+    autocomplete_index.build()
+
+def prime_file(bind: Engine, max_bytes: int = WARM_UP_MAX_BYTES) -> int:
+    """Read up to `max_bytes` of the database file so first queries hit the OS page cache."""
+    path = make_url(str(bind.url)).database
+    if not path or path == ":memory:" or not os.path.exists(path):
+        return 0
+    read = 0
+    with open(path, "rb", buffering=0) as f:
+        while read < max_bytes:
+            chunk = f.read(min(1 << 20, max_bytes - read))
+            if not chunk:
+                break
+            read += len(chunk)
+    return read
+
+class StatementRecorder:
+    """Collect the distinct SELECTs each sync engine runs while recording."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.statements: Dict[Engine, Dict[Tuple[str, str], tuple]] = {}
+
+    def __enter__(self):
+        event.listen(Engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(Engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip().upper().startswith("SELECT") or conn.dialect.is_async:
+            return
+        with self._lock:
+            self.statements.setdefault(conn.engine, {}).setdefault(
+                (statement, repr(parameters)), parameters
+            )
+
+def replay(bind: Engine, statements: List[Tuple[str, tuple]], connections: int) -> int:
+    """Run `statements` on `connections` pooled connections checked out together, so
+    each one is distinct and gets its own page and statement caches filled."""
+    held = []
+    try:
+        for _ in range(connections):
+            connection = bind.connect()
+            held.append(connection)
+            for statement, parameters in statements:
+                connection.exec_driver_sql(statement, parameters).fetchall()
+            connection.rollback()
+    finally:
+        for connection in held:
+            connection.close()
+    return len(held)
+
+async def warm_up(app, connections: int = SQLITE_POOL_SIZE) -> dict:
+    """Warm the process before it serves traffic; returns timings for the log."""
+    import httpx
+    from fastapi.concurrency import run_in_threadpool
+
+    from .metrics import registry
+
+    report = {}
+    started = time.perf_counter()
+    report["file_bytes"] = await run_in_threadpool(prime_file, engine)
+    report["file_seconds"] = round(time.perf_counter() - started, 3)
+
+    started = time.perf_counter()
+    transport = httpx.ASGITransport(app=app)
+    with StatementRecorder() as recorder:
+        async with httpx.AsyncClient(transport=transport, base_url="http://warm-up") as client:
+            report["statuses"] = {path: (await client.get(path)).status_code for path in WARM_UP_PATHS}
+    report["requests_seconds"] = round(time.perf_counter() - started, 3)
+
+    started = time.perf_counter()
+    report["statements"] = 0
+    for bind, statements in recorder.statements.items():
+        recorded = [(statement, parameters) for (statement, _), parameters in statements.items()]
+        await run_in_threadpool(replay, bind, recorded, connections)
+        report["statements"] += len(statements)
+    report["replay_seconds"] = round(time.perf_counter() - started, 3)
+
+    # Metrics should describe real traffic only
+    registry.reset()
+    return report
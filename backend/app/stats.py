@@ -0,0 +1,153 @@
+"""Aggregate catalog statistics kept current by triggers.
+
+``catalog_stats`` holds one row per (dimension, key): the number of movies
+per genre, release year, director and actor, with the sum and count of their
+known durations for averages. Triggers on ``movies``, ``movie_genres`` and
+``movie_actors`` adjust the affected rows in the writing transaction, so
+``crud.create_movie``, the bulk importer and manual SQL all keep them exact,
+and a dashboard read touches a handful of rows instead of grouping the
+catalog. The ``(dimension, movie_count DESC, key)`` index serves the "most
+prolific" lists without a sort.
+
+`rebuild_stats` recomputes every row from the base tables
+(``python -m app.seed_data rebuild``).
+"""
+from typing import List
+
+from sqlalchemy import case, event, func, select, text
+
+from . import models
+from .database import Base
+
+STATS_TABLE = "catalog_stats"
+
+GENRE = "genre"
+YEAR = "year"
+DIRECTOR = "director"
+ACTOR = "actor"
+
+DEFAULT_TOP_LIMIT = 10
+MAX_TOP_LIMIT = 100
+
+# Association table -> (dimension, foreign key column)
+LINK_DIMENSIONS = {
+    "movie_genres": (GENRE, "genre_id"),
+    "movie_actors": (ACTOR, "actor_id"),
+}
+
+def _adjust(dimension: str, key: str, sign: int, duration: str) -> str:
+    """Add (or with ``sign=-1`` remove) one movie of `duration` under `key`."""
+    return (
+        f"INSERT INTO {STATS_TABLE} (dimension, key, movie_count, total_duration, duration_count) "
+        f"SELECT '{dimension}', {key}, {sign}, {sign} * COALESCE({duration}, 0), "
+        f"{sign} * ({duration} IS NOT NULL) WHERE {key} IS NOT NULL "
+        f"ON CONFLICT (dimension, key) DO UPDATE SET "
+        f"movie_count = movie_count + excluded.movie_count, "
+        f"total_duration = total_duration + excluded.total_duration, "
+        f"duration_count = duration_count + excluded.duration_count;"
+    )
+
+def _own(ref: str, sign: int) -> str:
+    """Adjust the counters keyed on the movie row's own columns."""
+    return (_adjust(YEAR, f"{ref}.release_year", sign, f"{ref}.duration")
+            + _adjust(DIRECTOR, f"{ref}.director_id", sign, f"{ref}.duration"))
+
+def _ddl() -> List[str]:
+    statements = [
+        f"CREATE TRIGGER IF NOT EXISTS movies_stats_ai AFTER INSERT ON movies BEGIN {_own('new', 1)} END",
+        f"CREATE TRIGGER IF NOT EXISTS movies_stats_ad AFTER DELETE ON movies BEGIN {_own('old', -1)} END",
+    ]
+    # A changed duration moves the totals of every genre and actor the movie is linked to
+    relinked = "".join(
+        f"UPDATE {STATS_TABLE} SET "
+        f"total_duration = total_duration - COALESCE(old.duration, 0) + COALESCE(new.duration, 0), "
+        f"duration_count = duration_count - (old.duration IS NOT NULL) + (new.duration IS NOT NULL) "
+        f"WHERE dimension = '{dimension}' AND key IN (SELECT {key} FROM {table} WHERE movie_id = new.id);"
+        for table, (dimension, key) in LINK_DIMENSIONS.items()
+    )
+    statements.append(
+        f"CREATE TRIGGER IF NOT EXISTS movies_stats_au "
+        f"AFTER UPDATE OF release_year, director_id, duration ON movies BEGIN "
+        f"{_own('old', -1)}{_own('new', 1)}{relinked} END"
+    )
+    for table, (dimension, key) in LINK_DIMENSIONS.items():
+        for op, row, sign in (("ai", "new", 1), ("ad", "old", -1)):
+            duration = f"(SELECT duration FROM movies WHERE id = {row}.movie_id)"
+            statements.append(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_stats_{op} AFTER {'INSERT' if sign > 0 else 'DELETE'} "
+                f"ON {table} BEGIN {_adjust(dimension, f'{row}.{key}', sign, duration)} END"
+            )
+    return statements
+
+def _trigger_names() -> List[str]:
+    names = ["movies_stats_ai", "movies_stats_ad", "movies_stats_au"]
+    for table in LINK_DIMENSIONS:
+        names += [f"{table}_stats_ai", f"{table}_stats_ad"]
+    return names
+
+def create_stats_triggers(connection) -> None:
+    """Install the triggers that keep the counters current (idempotent)."""
+    for statement in _ddl():
+        connection.execute(text(statement))
+
+def drop_stats_triggers(connection) -> None:
+    for name in _trigger_names():
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
+def rebuild_stats(connection) -> None:
+    """Recompute every counter from the base tables."""
+    insert = (
+        f"INSERT INTO {STATS_TABLE} (dimension, key, movie_count, total_duration, duration_count) "
+        f"SELECT '{{dimension}}', {{key}}, count(*), COALESCE(sum(movies.duration), 0), count(movies.duration) "
+        f"FROM {{source}} WHERE {{key}} IS NOT NULL GROUP BY {{key}}"
+    )
+    connection.execute(text(f"DELETE FROM {STATS_TABLE}"))
+    connection.execute(text(insert.format(dimension=YEAR, key="movies.release_year", source="movies")))
+    connection.execute(text(insert.format(dimension=DIRECTOR, key="movies.director_id", source="movies")))
+    for table, (dimension, key) in LINK_DIMENSIONS.items():
+        source = f"{table} JOIN movies ON movies.id = {table}.movie_id"
+        connection.execute(text(insert.format(dimension=dimension, key=f"{table}.{key}", source=source)))
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_on_metadata_create(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        create_stats_triggers(connection)
+
+_stats = models.catalog_stats
+
+def _average_duration():
+    return case(
+        (_stats.c.duration_count > 0, func.round(1.0 * _stats.c.total_duration / _stats.c.duration_count, 1)),
+        else_=None,
+    ).label("average_duration")
+
+def _counters(dimension: str):
+    return _stats.c.dimension == dimension
+
+def genre_stats_statement():
+    """Every genre, busiest first; genres without movies count zero."""
+    genres = models.Genre.__table__
+    movie_count = func.coalesce(_stats.c.movie_count, 0).label("movie_count")
+    return (
+        select(genres.c.id, genres.c.name, movie_count, _average_duration())
+        .select_from(genres.outerjoin(_stats, (_stats.c.key == genres.c.id) & _counters(GENRE)))
+        .order_by(movie_count.desc(), genres.c.id)
+    )
+
+def year_stats_statement():
+    return (
+        select(_stats.c.key.label("release_year"), _stats.c.movie_count, _average_duration())
+        .where(_counters(YEAR), _stats.c.movie_count > 0)
+        .order_by(_stats.c.key)
+    )
+
+def top_statement(dimension: str, limit: int):
+    """The `limit` directors or actors with the most movies, read off the counter index."""
+    people = (models.Director if dimension == DIRECTOR else models.Actor).__table__
+    return (
+        select(people.c.id, people.c.name, _stats.c.movie_count, _average_duration())
+        .select_from(_stats.join(people, people.c.id == _stats.c.key))
+        .where(_counters(dimension), _stats.c.movie_count > 0)
+        .order_by(_stats.c.movie_count.desc(), _stats.c.key)
+        .limit(limit)
+    )
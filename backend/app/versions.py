@@ -0,0 +1,136 @@
+"""Noticing catalog writes made by other processes.
+
+Caches and in-memory indexes follow this process's writes through `events`,
+but rows written by another uvicorn worker or by ``python -m app.seed_data
+import`` publish nothing here. Every write does bump ``catalog_versions``
+(see app/etag.py), so `catalog_watcher` compares the versions the process
+reads against the ones it can account for:
+
+- every GET that reaches a handler reads them for its ETag and passes them
+  to `observe`; response cache hits, which skip the handler, `poll` at most
+  every ``VERSION_POLL_SECONDS``;
+- this process's own writes go through `begin_write`/`commit`, which read
+  the versions in the writing transaction, under the write lock, right
+  before and after the write, and record the step so it is not mistaken
+  for someone else's.
+
+When the versions move past what the process accounts for, `observe`
+publishes ``CATALOG_CHANGED`` and subscribers resynchronize from the
+database: the response cache drops its entries and the in-memory indexes
+reload.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+from . import events, models
+from .bulk import lock_for_write
+
+VERSION_TABLE = "catalog_versions"
+TRACKED_TABLES = ("genres", "directors", "actors", "movies", "movie_actors", "movie_genres")
+
+# Longest a response cache hit goes without checking for other processes' writes
+VERSION_POLL_SECONDS = float(os.getenv("VERSION_POLL_SECONDS", "0.25"))
+# Own writes remembered until the versions they produced are observed
+OWN_WRITES_MAX = 1024
+
+Versions = Tuple[int, ...]
+
+def versions_statement(tables: Iterable[str] = TRACKED_TABLES):
+    versions = models.catalog_versions
+    return (
+        select(versions.c.table_name, versions.c.version)
+        .where(versions.c.table_name.in_(tuple(tables)))
+        .order_by(versions.c.table_name)
+    )
+
+def versions_key(rows: Iterable[tuple]) -> Versions:
+    """The version numbers of `versions_statement()` rows, in table name order."""
+    return tuple(version for _, version in rows)
+
+def _newer(versions: Versions, than: Versions) -> bool:
+    return any(new > old for new, old in zip(versions, than))
+
+class CatalogWatcher:
+    def __init__(self, poll_seconds: float = VERSION_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        # Versions the process's caches and indexes account for
+        self.known: Optional[Versions] = None
+        # Own commits not yet folded into `known`: versions before -> after
+        self._own: "OrderedDict[Versions, Versions]" = OrderedDict()
+        # The engine requests read from, for polling
+        self.bind = None
+        self.polled_at = 0.0
+        self.external_changes = 0
+
+    def _advance(self) -> None:
+        while self.known in self._own:
+            self.known = self._own.pop(self.known)
+
+    def observe(self, rows: Iterable[tuple], bind=None) -> None:
+        """Compare freshly read `versions_statement()` rows with the known versions."""
+        versions = versions_key(rows)
+        with self._lock:
+            if bind is not None:
+                self.bind = bind
+            self.polled_at = time.monotonic()
+            if self.known is None or len(self.known) != len(versions):
+                self.known = versions
+                return
+            self._advance()
+            if not _newer(versions, self.known):
+                return
+            self.known = tuple(max(new, old) for new, old in zip(versions, self.known))
+            self._own.clear()
+            self.external_changes += 1
+        events.publish(events.CATALOG_CHANGED, versions)
+
+    def poll_due(self) -> bool:
+        return self.bind is not None and time.monotonic() - self.polled_at >= self.poll_seconds
+
+    async def poll(self) -> None:
+        """Read the versions through the last seen engine if the last check is old enough."""
+        bind = self.bind
+        if not self.poll_due():
+            return
+        self.polled_at = time.monotonic()
+        if isinstance(bind, AsyncEngine):
+            async with bind.connect() as connection:
+                rows = (await connection.execute(versions_statement())).all()
+        else:
+            rows = await run_in_threadpool(self._read, bind)
+        self.observe(rows)
+
+    @staticmethod
+    def _read(bind) -> list:
+        with bind.connect() as connection:
+            return connection.execute(versions_statement()).all()
+
+    # Own writes
+
+    def begin_write(self, db: Session) -> Versions:
+        """Take the write lock and return the versions the write starts from."""
+        lock_for_write(db)
+        return versions_key(db.execute(versions_statement()).all())
+
+    def commit(self, db: Session, before: Versions) -> None:
+        """Commit a write started with `begin_write` and record it as this process's."""
+        after = versions_key(db.execute(versions_statement()).all())
+        db.commit()
+        with self._lock:
+            if self.known is None:
+                return
+            self._own[before] = after
+            while len(self._own) > OWN_WRITES_MAX:
+                self._own.popitem(last=False)
+            self._advance()
+
+catalog_watcher = CatalogWatcher()
@@ -0,0 +1,144 @@
+"""Group commit for concurrent create requests.
+
+SQLite has one writer at a time and every commit waits for a sync, so under
+bursts of POSTs each request queues for the write lock only to pay for its
+own commit. With ``WRITE_QUEUE_ENABLED=1`` the create routes hand their
+payload to a single writer thread instead. It takes everything that queued
+up while the previous batch was committing (up to ``WRITE_QUEUE_BATCH_SIZE``,
+optionally waiting ``WRITE_QUEUE_WINDOW_MS`` for more), applies the batch in
+one transaction and one commit, then resolves each caller with its own row.
+Batches grow with the load on their own, so a lone request does not wait.
+
+Each request runs inside a SAVEPOINT, so one that fails (a duplicate genre
+name, say) rolls back alone and its caller gets the exception, while the
+rest of the batch commits. Created movies are reloaded for their response
+before the commit; if that or the commit itself fails, nothing is written
+and every caller in the batch gets the error. Events are published per row
+after the commit, as `crud.create_*` do, so caches and indexes see the same
+notifications; a failing subscriber is logged, since its row is committed.
+
+Handlers await the result without holding a threadpool thread, so a batch
+can grow past the threadpool size.
+"""
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from . import crud, events, models
+from .versions import catalog_watcher
+
+WRITE_QUEUE_ENABLED = os.getenv("WRITE_QUEUE_ENABLED", "0") == "1"
+WRITE_QUEUE_BATCH_SIZE = int(os.getenv("WRITE_QUEUE_BATCH_SIZE", "64"))
+# How long the writer waits for more requests after the first one arrives
+WRITE_QUEUE_WINDOW_MS = float(os.getenv("WRITE_QUEUE_WINDOW_MS", "0"))
+
+CREATED_EVENTS = {
+    models.Genre: events.GENRE_CREATED,
+    models.Director: events.DIRECTOR_CREATED,
+    models.Actor: events.ACTOR_CREATED,
+    models.Movie: events.MOVIE_CREATED,
+}
+
+logger = logging.getLogger("app.write_queue")
+
+class PendingWrite:
+    __slots__ = ("bind", "add", "payload", "future")
+
+    def __init__(self, bind: Engine, add: Callable[[Session, Any], Any], payload: Any):
+        self.bind = bind
+        self.add = add
+        self.payload = payload
+        self.future: Future = Future()
+
+class WriteQueue:
+    """Single writer thread committing concurrent creates in batches."""
+
+    def __init__(self, batch_size: int = WRITE_QUEUE_BATCH_SIZE, window_ms: float = WRITE_QUEUE_WINDOW_MS,
+                 enabled: bool = WRITE_QUEUE_ENABLED):
+        self.batch_size = batch_size
+        self.window = window_ms / 1000
+        self.enabled = enabled
+        self._queue: "queue.Queue[PendingWrite]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.batches = 0
+        self.writes = 0
+
+    def submit(self, db: Session, add: Callable[[Session, Any], Any], payload: Any) -> Future:
+        """Queue `add(session, payload)` against the bind of `db`; the future holds the new row."""
+        pending = PendingWrite(db.get_bind(), add, payload)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+                self._thread.start()
+        self._queue.put(pending)
+        return pending.future
+
+    async def write(self, db: Session, add: Callable[[Session, Any], Any], payload: Any) -> Any:
+        return await asyncio.wrap_future(self.submit(db, add, payload))
+
+    def _collect(self) -> List[PendingWrite]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            by_bind: Dict[Engine, List[PendingWrite]] = {}
+            for pending in batch:
+                by_bind.setdefault(pending.bind, []).append(pending)
+            for bind, writes in by_bind.items():
+                try:
+                    self.apply(bind, writes)
+                except Exception as exc:
+                    logger.exception("Write batch failed")
+                    for pending in writes:
+                        if not pending.future.done():
+                            pending.future.set_exception(exc)
+
+    def apply(self, bind: Engine, writes: List[PendingWrite]) -> None:
+        """Run `writes` in one transaction, each in its own savepoint, and resolve their futures."""
+        created: List[tuple] = []
+        with Session(bind=bind, autoflush=False, expire_on_commit=False) as db:
+            # A real transaction first, so releasing a savepoint never commits
+            before = catalog_watcher.begin_write(db)
+            for pending in writes:
+                try:
+                    with db.begin_nested():
+                        created.append((pending, pending.add(db, pending.payload)))
+                except Exception as exc:
+                    pending.future.set_exception(exc)
+            # Reload movies with the detail strategy, one query for the batch.
+            # This happens before the commit, so if it fails nothing is written
+            # and callers can retry without creating duplicates.
+            movie_ids = [row.id for _, row in created if isinstance(row, models.Movie)]
+            movies = {movie.id: movie for movie in crud.get_by_ids(db, "movies", movie_ids)} if movie_ids else {}
+            catalog_watcher.commit(db, before)
+            db.expunge_all()
+        self.batches += 1
+        self.writes += len(created)
+        for pending, row in created:
+            row = movies.get(row.id, row) if isinstance(row, models.Movie) else row
+            try:
+                events.publish(CREATED_EVENTS[type(row)], row)
+            except Exception:
+                # The row is committed: its caller gets it, not a write error
+                logger.exception("Created event handler failed")
+            pending.future.set_result(row)
+
+write_queue = WriteQueue()
@@ -0,0 +1,107 @@
+"""Build time, memory and query latency of the autocomplete index.
+
+Indexes `--names` synthetic person names with skewed film counts and times
+lookups of names with one character replaced, reporting how often the
+intended name is among the results. Lookups pick names in proportion to
+their film count, as search traffic does, and again uniformly. Names join
+a first name from `bench.catalog.FIRST_NAMES` or made of syllables to a
+syllable surname, so like real credits they share common trigrams but are
+rarely identical::
+
+    python -m bench.autocomplete --names 2000000 --out autocomplete.json
+"""
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+
+from app.autocomplete import NameIndex, normalize, trigrams
+
+from .catalog import FIRST_NAMES, misspell
+from .related import current_rss_kb, time_queries
+from .run import git_commit
+
+SYLLABLES = [
+    "an", "ber", "ca", "da", "el", "fer", "go", "har", "is", "ja", "ko", "lan", "mar", "ne",
+    "o", "pe", "qui", "ro", "sen", "ta", "u", "vi", "wen", "xi", "ya", "zu", "son", "stein",
+    "ov", "ez", "ski", "li", "ma", "ri", "to", "ka", "mi", "na", "sha", "der",
+]
+
+def synthetic_name(rng: random.Random) -> str:
+    def word(low, high):
+        return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(low, high))).title()
+    first = rng.choice(FIRST_NAMES) if rng.random() < 0.5 else word(2, 3)
+    return f"{first} {word(2, 4)}"
+
+def run(names: int, seed: int, queries: int, limit: int) -> dict:
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    rows = [(entry_id, synthetic_name(rng), None, int(rng.paretovariate(1.2))) for entry_id in range(1, names + 1)]
+    names_by_id = {row[0]: row[1] for row in rows}
+    popular = rng.choices([row[0] for row in rows], weights=[row[3] for row in rows], k=queries)
+    rows.sort(key=lambda row: (-row[3], row[0]))
+    generate_seconds = time.perf_counter() - started
+
+    gc.collect()
+    rss_before = current_rss_kb()
+    index = NameIndex("actor")
+    started = time.perf_counter()
+    for row in rows:
+        index.add(*row)
+    build_seconds = time.perf_counter() - started
+    gc.collect()
+    rss_after = current_rss_kb()
+    del rows
+
+    found = {"popular": [], "uniform": []}
+
+    def lookup(sample):
+        def query(entry_id):
+            typed = misspell(rng, names_by_id[entry_id])
+            results = index.complete(trigrams(normalize(typed), open_end=True), limit)
+            found[sample].append(any(result["id"] == entry_id for result in results))
+        return query
+
+    popular_timings = time_queries(lookup("popular"), popular, rng, queries)
+    uniform_timings = time_queries(lookup("uniform"), range(1, names + 1), rng, queries)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "names": names,
+            "seed": seed,
+            "trigrams": len(index.postings),
+        },
+        "generate_seconds": round(generate_seconds, 2),
+        "build_seconds": round(build_seconds, 2),
+        "index_rss_kb": rss_after - rss_before,
+        "complete": popular_timings,
+        "complete_uniform": uniform_timings,
+        "recall_at_limit": round(sum(found["popular"]) / queries, 3),
+        "recall_at_limit_uniform": round(sum(found["uniform"]) / queries, 3),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the autocomplete index build and lookups.")
+    parser.add_argument("--names", type=int, default=1000000, help="Names indexed (e.g. 1000000, 5000000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--queries", type=int, default=1000, help="Misspelled lookups timed")
+    parser.add_argument("--limit", type=int, default=10, help="Results per lookup")
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(args.names, args.seed, args.queries, args.limit)
+    print(f"build {report['build_seconds']}s, index {report['index_rss_kb'] / 1024:.0f} MiB, "
+          f"complete p50 {report['complete']['p50_ms']} ms, p99 {report['complete']['p99_ms']} ms, "
+          f"recall {report['recall_at_limit']} (uniform {report['recall_at_limit_uniform']})", file=sys.stderr)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as out:
+            out.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
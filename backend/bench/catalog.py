@@ -0,0 +1,110 @@
+"""Deterministic synthetic movie catalogs for load and benchmark runs.
+
+The same ``--movies``/``--seed`` pair always produces the same file, so
+benchmark results from different commits are comparable. Popularity is
+skewed the way real catalogs are: a few actors appear in hundreds of films
+and most appear in one or two, and directors have long filmographies.
+Records use the bulk import format (see `app.bulk`)::
+
+    python -m bench.catalog --movies 100000 > catalog.ndjson
+    python -m app.seed_data import catalog.ndjson
+"""
+import argparse
+import json
+import random
+import string
+import sys
+from typing import Iterator
+
+GENRES = [
+    "Action", "Adventure", "Animation", "Biography", "Comedy", "Crime", "Documentary",
+    "Drama", "Family", "Fantasy", "History", "Horror", "Music", "Musical", "Mystery",
+    "Romance", "Sci-Fi", "Sport", "Thriller", "War", "Western",
+]
+
+FIRST_NAMES = [
+    "Ada", "Alan", "Alice", "Amir", "Ana", "Ben", "Carla", "Chen", "Clara", "Dev",
+    "Diego", "Elena", "Emma", "Farah", "Felix", "Grace", "Hana", "Hugo", "Ines", "Ivan",
+    "Jack", "Jade", "Jonas", "Kai", "Kenji", "Lara", "Leo", "Lucia", "Maya", "Milo",
+    "Nadia", "Noah", "Olga", "Omar", "Paula", "Priya", "Rosa", "Sam", "Tariq", "Vera",
+]
+
+LAST_NAMES = [
+    "Abbott", "Bauer", "Castillo", "Dubois", "Eriksen", "Fischer", "Garcia", "Hale",
+    "Ito", "Jensen", "Kowalski", "Larsen", "Moreau", "Nakamura", "Okafor", "Petrov",
+    "Quinn", "Rossi", "Santos", "Tanaka", "Umarov", "Varga", "Weber", "Xu", "Young",
+    "Zhang", "Adler", "Brennan", "Costa", "Dimitrov", "Evans", "Ferreira", "Gupta",
+    "Horvat", "Ivanova", "Kim", "Lindqvist", "Mendes", "Novak", "Ortiz",
+]
+
+TITLE_WORDS = [
+    "Silent", "Last", "Broken", "Golden", "Midnight", "Crimson", "Hidden", "Distant",
+    "Burning", "Frozen", "Lost", "Wild", "Iron", "Paper", "Glass", "Electric",
+    "River", "Empire", "Garden", "Horizon", "Shadow", "Signal", "Harbor", "Kingdom",
+    "Orbit", "Station", "Summer", "Winter", "Voyage", "Witness", "Echo", "Frontier",
+]
+
+SYNOPSIS_WORDS = [
+    "a", "detective", "family", "secret", "city", "journey", "war", "love", "heist",
+    "stranger", "island", "machine", "betrayal", "dream", "town", "captain", "letter",
+    "past", "storm", "escape", "friendship", "crime", "future", "song", "border",
+]
+
+def person_name(index: int) -> str:
+    """Unique, stable name for the `index`-th person."""
+    first = FIRST_NAMES[index % len(FIRST_NAMES)]
+    last = LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    generation = index // (len(FIRST_NAMES) * len(LAST_NAMES))
+    return f"{first} {last}" if generation == 0 else f"{first} {last} {generation + 1}"
+
+def misspell(rng: random.Random, name: str) -> str:
+    """`name` with one character replaced by a random letter."""
+    at = rng.randrange(len(name))
+    return name[:at] + rng.choice(string.ascii_lowercase) + name[at + 1:]
+
+def skewed(rng: random.Random, size: int, skew: float) -> int:
+    """Index in [0, size) with low indexes far more likely (popular people first)."""
+    return min(int(size * rng.random() ** skew), size - 1)
+
+def generate_catalog(movies: int, seed: int = 42) -> Iterator[dict]:
+    """Yield `movies` bulk-import records.
+
+    Scale ratios follow public film databases: about one director per eight
+    films, one credited actor per two films, 4-12 cast members and 1-3 genres
+    per film.
+    """
+    rng = random.Random(seed)
+    directors = max(10, movies // 8)
+    actors = max(50, movies // 2)
+    for _ in range(movies):
+        cast_size = rng.randint(4, 12)
+        cast = {skewed(rng, actors, 3.0) for _ in range(cast_size)}
+        genres = rng.sample(GENRES, rng.choice((1, 1, 2, 2, 2, 3)))
+        words = rng.sample(TITLE_WORDS, rng.randint(1, 3))
+        yield {
+            "title": " ".join(words),
+            # Skewed towards recent years like real release volumes
+            "release_year": 2025 - skewed(rng, 100, 2.0),
+            "synopsis": " ".join(rng.choices(SYNOPSIS_WORDS, k=rng.randint(8, 20))).capitalize() + ".",
+            "duration": int(rng.gauss(110, 20)) if rng.random() < 0.95 else None,
+            "director": person_name(skewed(rng, directors, 1.5)),
+            "actors": [person_name(index) for index in sorted(cast)],
+            "genres": genres,
+        }
+
+def generate_lines(movies: int, seed: int = 42) -> Iterator[str]:
+    """`generate_catalog` as NDJSON lines."""
+    for record in generate_catalog(movies, seed):
+        yield json.dumps(record, separators=(",", ":"))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic NDJSON movie catalog to stdout.")
+    parser.add_argument("--movies", type=int, default=10000, help="Number of movies (e.g. 10000, 100000, 1000000)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed; the same seed gives the same catalog")
+    args = parser.parse_args(argv)
+    out = sys.stdout
+    for line in generate_lines(args.movies, args.seed):
+        out.write(line + "\n")
+
+if __name__ == "__main__":
+    main()
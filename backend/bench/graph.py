@@ -0,0 +1,83 @@
+"""Build time, memory and path query latency of the actor graph.
+
+Feeds a synthetic catalog (see `bench.catalog`) straight into
+`ActorGraph.build` and times shortest-path queries between random actors,
+with the path cache cleared so every query searches::
+
+    python -m bench.graph --movies 1000000 --out graph.json
+"""
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+from collections import Counter
+
+from app.graph import ActorGraph
+
+from .related import catalog_rows, current_rss_kb, time_queries
+from .run import git_commit
+
+def run(movies: int, seed: int, queries: int) -> dict:
+    started = time.perf_counter()
+    _, cast_rows, _, actors = catalog_rows(movies, seed)
+    by_actor = sorted((actor_id, movie_id) for movie_id, actor_id in cast_rows)
+    generate_seconds = time.perf_counter() - started
+
+    gc.collect()
+    rss_before = current_rss_kb()
+    graph = ActorGraph()
+    started = time.perf_counter()
+    graph.build([by_actor], [cast_rows], actors, movies)
+    build_seconds = time.perf_counter() - started
+    gc.collect()
+    rss_after = current_rss_kb()
+    graph.loaded = True
+
+    rng = random.Random(seed)
+    pairs = [(rng.randint(1, actors), rng.randint(1, actors)) for _ in range(queries)]
+    degrees = Counter()
+
+    def query(pair):
+        graph._cache.clear()
+        path = graph.shortest_path(*pair)
+        degrees[path.degrees if path else None] += 1
+
+    timings = time_queries(query, pairs, rng, queries)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "movies": movies,
+            "seed": seed,
+            "actors": actors,
+            "edges": len(cast_rows),
+        },
+        "generate_seconds": round(generate_seconds, 2),
+        "build_seconds": round(build_seconds, 2),
+        "graph_rss_kb": rss_after - rss_before,
+        "path": timings,
+        "degrees": {str(key): count for key, count in sorted(degrees.items(), key=lambda item: (item[0] is None, item[0]))},
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the actor graph build and path queries.")
+    parser.add_argument("--movies", type=int, default=100000, help="Catalog size (e.g. 100000, 1000000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--queries", type=int, default=500, help="Path queries timed")
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(args.movies, args.seed, args.queries)
+    print(f"build {report['build_seconds']}s, graph {report['graph_rss_kb'] / 1024:.0f} MiB, "
+          f"path p50 {report['path']['p50_ms']} ms, p99 {report['path']['p99_ms']} ms", file=sys.stderr)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as out:
+            out.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
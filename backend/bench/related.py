@@ -0,0 +1,117 @@
+"""Build time, memory and query latency of the related-movies index.
+
+Feeds a synthetic catalog (see `bench.catalog`) straight into
+`RelatedIndex.build`, with no database, so the numbers isolate the
+in-memory structure::
+
+    python -m bench.related --movies 1000000 --out related.json
+
+Memory is the resident set growth across the build; the catalog rows are
+generated before it starts.
+"""
+import argparse
+import gc
+import json
+import random
+import resource
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+from app.related import RelatedIndex
+
+from .catalog import generate_catalog
+from .run import git_commit, percentile
+
+def current_rss_kb() -> int:
+    """Current (not peak) resident set size; 0 where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except OSError:
+        return 0
+    return pages * resource.getpagesize() // 1024
+
+def catalog_rows(movies: int, seed: int):
+    """(movie, director) pairs and (movie, actor)/(movie, genre) rows with ids assigned by name."""
+    ids: Dict[str, Dict[str, int]] = {"director": {}, "actor": {}, "genre": {}}
+
+    def id_of(kind: str, name: str) -> int:
+        table = ids[kind]
+        return table.setdefault(name, len(table) + 1)
+
+    movie_rows, cast_rows, genre_rows = [], [], []
+    for movie_id, record in enumerate(generate_catalog(movies, seed), start=1):
+        movie_rows.append((movie_id, id_of("director", record["director"])))
+        cast_rows += sorted((movie_id, id_of("actor", name)) for name in record["actors"])
+        genre_rows += [(movie_id, id_of("genre", name)) for name in record["genres"]]
+    return movie_rows, cast_rows, genre_rows, len(ids["actor"])
+
+def time_queries(call, ids: List[int], rng: random.Random, queries: int) -> dict:
+    timings = []
+    for _ in range(queries):
+        started = time.perf_counter()
+        call(rng.choice(ids))
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "queries": queries,
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+    }
+
+def run(movies: int, seed: int, queries: int) -> dict:
+    started = time.perf_counter()
+    movie_rows, cast_rows, genre_rows, actors = catalog_rows(movies, seed)
+    generate_seconds = time.perf_counter() - started
+
+    gc.collect()
+    rss_before = current_rss_kb()
+    index = RelatedIndex()
+    started = time.perf_counter()
+    index.build(movie_rows, cast_rows, genre_rows)
+    build_seconds = time.perf_counter() - started
+    gc.collect()
+    rss_after = current_rss_kb()
+
+    rng = random.Random(seed)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "movies": movies,
+            "seed": seed,
+            "actors": actors,
+            "cast_rows": len(cast_rows),
+            "collaboration_pairs": sum(len(costars) for costars in index.costars.values()),
+        },
+        "generate_seconds": round(generate_seconds, 2),
+        "build_seconds": round(build_seconds, 2),
+        "index_rss_kb": rss_after - rss_before,
+        "related": time_queries(index.related, [row[0] for row in movie_rows], rng, queries),
+        "collaborators": time_queries(index.collaborators, list(index.costars), rng, queries),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the related-movies index build and queries.")
+    parser.add_argument("--movies", type=int, default=100000, help="Catalog size (e.g. 100000, 1000000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--queries", type=int, default=2000, help="Queries timed per kind")
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(args.movies, args.seed, args.queries)
+    print(f"build {report['build_seconds']}s, index {report['index_rss_kb'] / 1024:.0f} MiB, "
+          f"related p99 {report['related']['p99_ms']} ms, "
+          f"collaborators p99 {report['collaborators']['p99_ms']} ms", file=sys.stderr)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as out:
+            out.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
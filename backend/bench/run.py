@@ -0,0 +1,357 @@
+"""API benchmark harness.
+
+Loads a synthetic catalog (see `bench.catalog`) into a scratch SQLite file,
+drives every ``/api`` route in-process through httpx's ASGI transport, and
+writes one JSON report with throughput, latency percentiles, SQL statements
+per request and peak RSS for each scenario::
+
+    python -m bench.run --movies 100000 --out sync.json
+    python -m bench.run --movies 100000 --async-db --concurrency 32 --out async.json
+    python -m bench.run --movies 100000 --snapshot --no-writes --out snapshot.json
+    python -m bench.run --movies 100000 --only create --concurrency 32 --write-queue --out queued.json
+
+The scratch database is kept (keyed on catalog size and seed) so later runs
+skip the import. The response cache is disabled unless ``--cache`` is given,
+so the numbers measure the handlers rather than cache hits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from .catalog import TITLE_WORDS, generate_lines, misspell, person_name
+
+class Call(NamedTuple):
+    method: str
+    path: str
+    params: Optional[dict] = None
+    body: Optional[object] = None
+    content: Optional[bytes] = None
+
+class Scenario(NamedTuple):
+    name: str
+    route: str        # name of the FastAPI route it exercises
+    build: Callable[[random.Random, dict, int], Call]
+    write: bool = False
+
+def _pick(rng: random.Random, ctx: dict, table: str) -> int:
+    return rng.randint(1, ctx[table])
+
+SCENARIOS: List[Scenario] = [
+    Scenario("movies_list", "read_movies", lambda rng, ctx, i: Call("GET", "/api/movies/")),
+    Scenario("movies_sorted_year_desc", "read_movies",
+             lambda rng, ctx, i: Call("GET", "/api/movies/", {"sort": "-release_year", "limit": 100})),
+    Scenario("movies_by_genre", "read_movies",
+             lambda rng, ctx, i: Call("GET", "/api/movies/", {"genre_id": _pick(rng, ctx, "genres")})),
+    Scenario("movies_by_actor", "read_movies",
+             lambda rng, ctx, i: Call("GET", "/api/movies/", {"actor_id": _pick(rng, ctx, "actors")})),
+    Scenario("movies_by_director_year", "read_movies",
+             lambda rng, ctx, i: Call("GET", "/api/movies/", {
+                 "director_id": _pick(rng, ctx, "directors"), "release_year": rng.randint(1990, 2025),
+             })),
+    Scenario("movie_detail", "read_movie",
+             lambda rng, ctx, i: Call("GET", f"/api/movies/{_pick(rng, ctx, 'movies')}")),
+    # One viral page: with --concurrency, identical requests overlap and are coalesced
+    Scenario("movie_detail_hot", "read_movie", lambda rng, ctx, i: Call("GET", "/api/movies/1")),
+    Scenario("movies_by_ids", "read_movies",
+             lambda rng, ctx, i: Call("GET", "/api/movies/", {
+                 "ids": ",".join(str(_pick(rng, ctx, "movies")) for _ in range(20)),
+             })),
+    Scenario("export_ndjson_tail", "export_movies",
+             lambda rng, ctx, i: Call("GET", "/api/movies/export", {"after": max(0, ctx["movies"] - 2000)})),
+    Scenario("movie_related", "read_related_movies",
+             lambda rng, ctx, i: Call("GET", f"/api/movies/{_pick(rng, ctx, 'movies')}/related")),
+    Scenario("actors_list", "read_actors", lambda rng, ctx, i: Call("GET", "/api/actors/", {"sort": "name"})),
+    Scenario("actors_by_genre", "read_actors",
+             lambda rng, ctx, i: Call("GET", "/api/actors/", {"genre_id": _pick(rng, ctx, "genres")})),
+    Scenario("actor_detail", "read_actor",
+             lambda rng, ctx, i: Call("GET", f"/api/actors/{_pick(rng, ctx, 'actors')}")),
+    Scenario("actor_collaborators", "read_collaborators",
+             lambda rng, ctx, i: Call("GET", f"/api/actors/{_pick(rng, ctx, 'actors')}/collaborators")),
+    Scenario("actor_path", "read_actor_path",
+             lambda rng, ctx, i: Call("GET", f"/api/actors/{_pick(rng, ctx, 'actors')}/path/{_pick(rng, ctx, 'actors')}")),
+    Scenario("directors_list", "read_directors", lambda rng, ctx, i: Call("GET", "/api/directors/")),
+    Scenario("director_detail", "read_director",
+             lambda rng, ctx, i: Call("GET", f"/api/directors/{_pick(rng, ctx, 'directors')}")),
+    Scenario("genres_list", "read_genres", lambda rng, ctx, i: Call("GET", "/api/genres/")),
+    Scenario("genre_detail", "read_genre",
+             lambda rng, ctx, i: Call("GET", f"/api/genres/{_pick(rng, ctx, 'genres')}")),
+    Scenario("search_title", "search",
+             lambda rng, ctx, i: Call("GET", "/api/search/", {"q": rng.choice(TITLE_WORDS)})),
+    Scenario("search_prefix", "search",
+             lambda rng, ctx, i: Call("GET", "/api/search/", {"q": person_name(rng.randint(0, 1999))[:5]})),
+    Scenario("autocomplete_prefix", "read_autocomplete",
+             lambda rng, ctx, i: Call("GET", "/api/autocomplete", {"q": person_name(rng.randint(0, 1999))[:6]})),
+    Scenario("autocomplete_typo", "read_autocomplete",
+             lambda rng, ctx, i: Call("GET", "/api/autocomplete", {"q": misspell(rng, person_name(rng.randint(0, 1999))),
+                                                                   "type": "actor"})),
+    Scenario("facets_genres_any", "read_movie_facets",
+             lambda rng, ctx, i: Call("GET", "/api/facets/movies", {
+                 "genre_id": [_pick(rng, ctx, "genres"), _pick(rng, ctx, "genres")],
+                 "year_min": rng.randint(1990, 2010),
+             })),
+    Scenario("facets_actors_all", "read_movie_facets",
+             lambda rng, ctx, i: Call("GET", "/api/facets/movies", {
+                 "actor_id": [_pick(rng, ctx, "actors"), _pick(rng, ctx, "actors")], "actor_match": "all",
+                 "sort": "-release_year",
+             })),
+    Scenario("changes_since", "read_changes",
+             lambda rng, ctx, i: Call("GET", "/api/changes", {"since": rng.randint(0, ctx["movies"])})),
+    Scenario("stats_genres", "read_genre_stats", lambda rng, ctx, i: Call("GET", "/api/stats/genres")),
+    Scenario("stats_years", "read_year_stats", lambda rng, ctx, i: Call("GET", "/api/stats/years")),
+    Scenario("stats_top_directors", "read_director_stats",
+             lambda rng, ctx, i: Call("GET", "/api/stats/directors", {"limit": 20})),
+    Scenario("stats_top_actors", "read_actor_stats",
+             lambda rng, ctx, i: Call("GET", "/api/stats/actors", {"limit": 20})),
+    Scenario("batch_mixed", "read_batch",
+             lambda rng, ctx, i: Call("POST", "/api/batch", body={"requests": [
+                 f"/movies/{_pick(rng, ctx, 'movies')}",
+                 f"/actors/{_pick(rng, ctx, 'actors')}",
+                 "/movies?ids=" + ",".join(str(_pick(rng, ctx, "movies")) for _ in range(10)),
+             ]})),
+    # Writes run after the reads so they cannot change what the reads see
+    Scenario("create_genre", "create_genre",
+             lambda rng, ctx, i: Call("POST", "/api/genres/", body={"name": f"Bench Genre {ctx['run']}-{i}"}),
+             write=True),
+    Scenario("create_director", "create_director",
+             lambda rng, ctx, i: Call("POST", "/api/directors/", body={"name": f"Bench Director {ctx['run']}-{i}"}),
+             write=True),
+    Scenario("create_actor", "create_actor",
+             lambda rng, ctx, i: Call("POST", "/api/actors/", body={"name": f"Bench Actor {ctx['run']}-{i}"}),
+             write=True),
+    Scenario("create_movie", "create_movie",
+             lambda rng, ctx, i: Call("POST", "/api/movies/", body={
+                 "title": f"Bench Movie {ctx['run']}-{i}",
+                 "release_year": rng.randint(1950, 2025),
+                 "director_id": _pick(rng, ctx, "directors"),
+                 "actor_ids": sorted({_pick(rng, ctx, "actors") for _ in range(6)}),
+                 "genre_ids": [_pick(rng, ctx, "genres")],
+             }),
+             write=True),
+    Scenario("bulk_import_100", "bulk_import_movies",
+             lambda rng, ctx, i: Call("POST", "/api/movies/bulk", {"format": "ndjson"}, content="\n".join(
+                 generate_lines(100, seed=ctx["run"] * 100003 + i)
+             ).encode()),
+             write=True),
+]
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def peak_rss_kb() -> int:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    return usage // 1024 if sys.platform == "darwin" else usage
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class StatementCounter:
+    """Count SQL statements on every engine the app can use."""
+
+    def __init__(self, engines):
+        from sqlalchemy import event
+        self.count = 0
+        for bind in {id(e): e for e in engines if e is not None}.values():
+            event.listen(bind, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+async def run_scenario(client, scenario: Scenario, ctx: dict, requests: int,
+                       concurrency: int, counter: StatementCounter, seed: int, offset: int = 0) -> dict:
+    rng = random.Random(f"{seed}:{scenario.name}")
+    # `offset` keeps the names written by warm-up and timed runs apart
+    calls = [scenario.build(rng, ctx, offset + i) for i in range(requests)]
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    sizes = 0
+    queue = iter(calls)
+
+    async def worker():
+        nonlocal sizes
+        for call in queue:
+            started = time.perf_counter()
+            response = await client.request(
+                call.method, call.path, params=call.params, json=call.body, content=call.content
+            )
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            sizes += len(response.content)
+
+    statements = counter.count
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "route": scenario.route,
+        "requests": requests,
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "status_codes": {str(status): count for status, count in sorted(statuses.items())},
+        "seconds": round(elapsed, 4),
+        "requests_per_second": round(requests / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "mean": ms(sum(latencies) / len(latencies)),
+            "p50": ms(percentile(latencies, 50)),
+            "p95": ms(percentile(latencies, 95)),
+            "p99": ms(percentile(latencies, 99)),
+            "max": ms(latencies[-1]),
+        },
+        "sql_statements_per_request": round((counter.count - statements) / requests, 2),
+        "mean_response_bytes": sizes // requests,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+def catalog_counts(path: str) -> Dict[str, int]:
+    connection = sqlite3.connect(path)
+    try:
+        return {
+            table: connection.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+            for table in ("movies", "actors", "directors", "genres")
+        }
+    finally:
+        connection.close()
+
+def prepare_database(path: str, movies: int, seed: int) -> Optional[float]:
+    """Create and fill the scratch database unless it already exists; return the load time."""
+    from app.bulk import import_lines
+    from app.database import SessionLocal
+    from app.startup import ensure_schema
+
+    if os.path.exists(path) and catalog_counts(path)["movies"] >= movies:
+        return None
+    # The ASGI transport does not run the app's lifespan
+    ensure_schema()
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        import_lines(db, generate_lines(movies, seed))
+    finally:
+        db.close()
+    return round(time.perf_counter() - started, 3)
+
+async def run(args) -> dict:
+    import httpx
+    from app import database
+    from app.cache import response_cache
+    from app.main import create_app
+
+    load_seconds = prepare_database(args.db, args.movies, args.seed)
+    app = create_app(async_db=args.async_db)
+    response_cache.enabled = args.cache
+    snapshot = None
+    if args.snapshot:
+        from app.snapshot import snapshot_store
+        started = time.perf_counter()
+        snapshot_store.rebuild()
+        snapshot = {
+            "build_seconds": round(time.perf_counter() - started, 3),
+            "bytes": os.path.getsize(snapshot_store.path),
+        }
+    counter = StatementCounter([
+        database.engine, database.read_engine,
+        database.async_engine.sync_engine if database.async_engine is not None else None,
+    ])
+
+    ctx = {**catalog_counts(args.db), "run": int(time.time())}
+    selected = [
+        s for s in SCENARIOS
+        if (not args.only or any(name in s.name for name in args.only)) and (args.writes or not s.write)
+    ]
+    api_routes = {route.name for route in app.routes if getattr(route, "path", "").startswith("/api")}
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for scenario in selected:
+            requests = args.write_requests if scenario.write else args.requests
+            # Untimed warm-up so the first scenario does not pay for cold caches
+            await run_scenario(client, scenario, ctx, min(requests, args.warmup), 1, counter,
+                               args.seed + 1, offset=requests)
+            results[scenario.name] = await run_scenario(
+                client, scenario, ctx, requests, args.concurrency, counter, args.seed
+            )
+            print(f"  {scenario.name:28} {results[scenario.name]['requests_per_second']:>9} req/s  "
+                  f"p99 {results[scenario.name]['latency_ms']['p99']} ms", file=sys.stderr)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "mode": "async" if args.async_db else "sync",
+            "sqlite_profile": os.environ.get("SQLITE_PROFILE", "default"),
+            "response_cache": args.cache,
+            "snapshot": snapshot,
+            "write_queue": args.write_queue,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "catalog": {table: count for table, count in ctx.items() if table != "run"},
+            "load_seconds": load_seconds,
+        },
+        "uncovered_routes": sorted(api_routes - {s.route for s in SCENARIOS}),
+        "scenarios": results,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every API route against a synthetic catalog.")
+    parser.add_argument("--movies", type=int, default=10000, help="Catalog size (e.g. 10000, 100000, 1000000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="Scratch SQLite file (default: one per size/seed in the temp directory)")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per read scenario")
+    parser.add_argument("--write-requests", type=int, default=50, help="Requests per write scenario")
+    parser.add_argument("--warmup", type=int, default=10, help="Untimed requests before each scenario")
+    parser.add_argument("--concurrency", type=int, default=1, help="Requests in flight at once")
+    parser.add_argument("--async-db", action="store_true", help="Serve GET routes through the aiosqlite path")
+    parser.add_argument("--cache", action="store_true", help="Keep the response cache enabled")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="Build the catalog snapshot first and serve detail and reference routes from it")
+    parser.add_argument("--write-queue", action="store_true", help="Group-commit POSTs through the write queue")
+    parser.add_argument("--no-writes", dest="writes", action="store_false", help="Skip the POST scenarios")
+    parser.add_argument("--only", nargs="*", help="Run only scenarios whose name contains one of these")
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    args.db = os.path.abspath(args.db or os.path.join(
+        tempfile.gettempdir(), f"movie-explorer-bench-{args.movies}-{args.seed}.db"
+    ))
+    # The app reads its configuration at import time
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    os.environ["DB_ASYNC"] = "1" if args.async_db else "0"
+    os.environ["SNAPSHOT_ENABLED"] = "1" if args.snapshot else "0"
+    os.environ["SNAPSHOT_PATH"] = args.db + ".snapshot"
+    os.environ["WRITE_QUEUE_ENABLED"] = "1" if args.write_queue else "0"
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Worker startup time: time to first response, cold and warmed up.
+
+Boots one real uvicorn worker per mode against a scratch catalog (see
+`bench.run`) and measures how long it takes to answer its first request,
+then the latency of the first and second request to each hot path::
+
+    python -m bench.startup --movies 100000 --out startup.json
+
+Modes are ``cold`` (``WARM_UP=0``) and ``warm`` (``WARM_UP=1``). Both run with
+the schema already in place, as after ``alembic upgrade head``. The OS page
+cache is shared between runs; ``--drop-caches`` empties it before each boot
+where the host allows it (root on Linux).
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Optional
+
+from .run import git_commit, prepare_database
+
+PATHS = (
+    "/api/genres/",
+    "/api/movies/",
+    "/api/movies/?sort=title",
+    "/api/actors/",
+    "/api/movies/1",
+    "/api/facets/movies?genre_id=1",
+)
+
+READY_TIMEOUT = 600
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def drop_caches() -> bool:
+    try:
+        subprocess.run(["sync"], check=True)
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+        return True
+    except OSError:
+        return False
+
+def timed_get(url: str) -> float:
+    started = time.perf_counter()
+    with urllib.request.urlopen(url) as response:
+        response.read()
+    return round((time.perf_counter() - started) * 1000, 2)
+
+def import_seconds(env: dict) -> float:
+    """Time to import the app in a fresh interpreter."""
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return round(float(output.strip().splitlines()[-1]), 3)
+
+def boot(env: dict, mode: str, drop: bool) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    dropped = drop_caches() if drop else None
+    started = time.perf_counter()
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env={**env, "WARM_UP": "1" if mode == "warm" else "0"},
+    )
+    try:
+        while True:
+            if worker.poll() is not None:
+                raise RuntimeError(f"Worker exited with {worker.returncode}")
+            try:
+                timed_get(f"{base}/health")
+                break
+            except OSError:
+                if time.perf_counter() - started > READY_TIMEOUT:
+                    raise
+                time.sleep(0.01)
+        ready = time.perf_counter() - started
+        first = {path: timed_get(base + path) for path in PATHS}
+        second = {path: timed_get(base + path) for path in PATHS}
+    finally:
+        worker.terminate()
+        worker.wait()
+    return {
+        "caches_dropped": dropped,
+        "ready_seconds": round(ready, 3),
+        "first_request_ms": first,
+        "second_request_ms": second,
+        "first_requests_total_ms": round(sum(first.values()), 2),
+        "time_to_first_responses_seconds": round(ready + sum(first.values()) / 1000, 3),
+    }
+
+def run(db: str, movies: int, seed: int, drop: bool, modes: list, profile: Optional[str]) -> dict:
+    load_seconds = prepare_database(db, movies, seed)
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db}", "SCHEMA_AUTO_CREATE": "1"}
+    if profile:
+        env["SQLITE_PROFILE"] = profile
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "movies": movies,
+            "seed": seed,
+            "sqlite_profile": env.get("SQLITE_PROFILE", "default"),
+            "db_bytes": os.path.getsize(db),
+            "load_seconds": load_seconds,
+        },
+        "import_seconds": import_seconds(env),
+    }
+    for mode in modes:
+        report[mode] = boot(env, mode, drop)
+        print(f"  {mode:5} ready {report[mode]['ready_seconds']}s, first requests "
+              f"{report[mode]['first_requests_total_ms']} ms", file=sys.stderr)
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark worker time to first response.")
+    parser.add_argument("--movies", type=int, default=100000, help="Catalog size (e.g. 100000, 1000000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="Scratch SQLite file (shared with bench.run)")
+    parser.add_argument("--profile", help="SQLITE_PROFILE for the workers (e.g. production)")
+    parser.add_argument("--modes", nargs="*", default=["cold", "warm"], choices=["cold", "warm"])
+    parser.add_argument("--drop-caches", action="store_true", help="Empty the OS page cache before each boot")
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    args.db = os.path.abspath(args.db or os.path.join(
+        tempfile.gettempdir(), f"movie-explorer-bench-{args.movies}-{args.seed}.db"
+    ))
+    # prepare_database imports the app, which reads its configuration at import time
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+
+    report = run(args.db, args.movies, args.seed, args.drop_caches, args.modes, args.profile)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as out:
+            out.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
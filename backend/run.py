@@ -1,9 +1,11 @@
 import uvicorn
 from app.seed_data import seed_database
+from app.startup import ensure_schema
 
 if __name__ == "__main__":
-    # Seed database on startup
+    # Create the schema if needed and seed the database on startup
     print("Seeding database...")
+    ensure_schema()
     seed_database()
     
     # Start the server
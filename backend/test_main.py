@@ -1,10 +1,18 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from app.main import app
-from app.database import get_db, Base
+from sqlalchemy.pool import NullPool
+from app.main import app, create_app
+from app.database import get_async_db, get_db, get_read_db, apply_pragmas, read_only_url, sqlite_pragmas
 from app import models
+from app.cache import response_cache
+from app.facets import facet_index
+from app.graph import actor_graph
+from app.related import related_index
+from app.startup import ensure_schema
+from app.versions import catalog_watcher, versions_statement
 
 # Test database
 SQLITE_DATABASE_URL = "sqlite:///./test.db"
@@ -19,12 +27,38 @@ def override_get_db():
         db.close()
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
+
+# Async path against the same test database
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+AsyncTestingSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+async def override_get_async_db():
+    async with AsyncTestingSessionLocal() as db:
+        yield db
 
 # Create test database
-Base.metadata.create_all(bind=engine)
+ensure_schema(engine)
 
 client = TestClient(app)
 
+class QueryCounter:
+    """Count SQL statements issued on an engine inside a `with` block."""
+
+    def __init__(self, bind):
+        self.bind = bind
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.bind, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.bind, "before_cursor_execute", self._count)
+
 def test_read_root():
     response = client.get("/")
     assert response.status_code == 200
@@ -73,4 +107,1228 @@ def test_create_actor():
 def test_movie_not_found():
     response = client.get("/api/movies/999")
     assert response.status_code == 404
-    assert response.json() == {"detail": "Movie not found"} 
\ No newline at end of file
+    assert response.json() == {"detail": "Movie not found"} 
+
+def _create_movie(title, director_id, actor_ids=(), genre_ids=(), release_year=2000):
+    response = client.post("/api/movies/", json={
+        "title": title,
+        "release_year": release_year,
+        "duration": 100,
+        "director_id": director_id,
+        "actor_ids": list(actor_ids),
+        "genre_ids": list(genre_ids),
+    })
+    assert response.status_code == 200
+    return response.json()
+
+def test_movie_list_query_count_is_constant():
+    director = client.post("/api/directors/", json={"name": "Count Director"}).json()
+    actor = client.post("/api/actors/", json={"name": "Count Actor"}).json()
+    genre = client.post("/api/genres/", json={"name": "Count Genre"}).json()
+    _create_movie("Count One", director["id"], [actor["id"]], [genre["id"]])
+
+    with QueryCounter(engine) as few:
+        assert client.get("/api/movies/").status_code == 200
+
+    for i in range(5):
+        other = client.post("/api/directors/", json={"name": f"Count Director {i}"}).json()
+        _create_movie(f"Count More {i}", other["id"], [actor["id"]], [genre["id"]])
+
+    with QueryCounter(engine) as many:
+        assert len(client.get("/api/movies/").json()) >= 6
+    assert many.count == few.count
+
+    with QueryCounter(engine) as detail:
+        response = client.get(f"/api/actors/{actor['id']}")
+    assert len(response.json()["movies"]) == 6
+    assert all(m["director"] for m in response.json()["movies"])
+    # One statement for the ETag version lookup, then the eager-loaded reads
+    assert detail.count <= 3
+
+    with QueryCounter(engine) as detail:
+        response = client.get(f"/api/directors/{director['id']}")
+    assert response.json()["movies"][0]["director"]["id"] == director["id"]
+    assert detail.count <= 3
+
+    movie_id = response.json()["movies"][0]["id"]
+    with QueryCounter(engine) as detail:
+        response = client.get(f"/api/movies/{movie_id}")
+    assert response.json()["actors"][0]["id"] == actor["id"]
+    assert response.json()["genres"][0]["id"] == genre["id"]
+    assert detail.count <= 4
+
+def _walk_pages(path, **params):
+    items, cursor, pages = [], None, 0
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        response = client.get(path, params=query)
+        assert response.status_code == 200
+        items.extend(response.json())
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return items, pages
+
+def test_movies_keyset_pagination():
+    everything = client.get("/api/movies/", params={"limit": 500}).json()
+    assert "X-Next-Cursor" not in client.get("/api/movies/", params={"limit": 500}).headers
+
+    for sort in ("title", "-release_year", "id"):
+        items, pages = _walk_pages("/api/movies/", sort=sort, limit=2)
+        assert len(items) == len(everything)
+        assert len({m["id"] for m in items}) == len(everything)
+        assert pages == -(-len(everything) // 2)
+
+    titles = [m["title"] for m in _walk_pages("/api/movies/", sort="title", limit=3)[0]]
+    assert titles == sorted(titles)
+
+def test_actors_keyset_pagination():
+    items, _ = _walk_pages("/api/actors/", sort="-name", limit=1)
+    names = [a["name"] for a in items]
+    assert names == sorted(names, reverse=True)
+    assert len(items) == len(client.get("/api/actors/").json())
+
+def test_pagination_rejects_bad_cursor():
+    first = client.get("/api/movies/", params={"sort": "title", "limit": 1})
+    cursor = first.headers["X-Next-Cursor"]
+    assert client.get("/api/movies/", params={"sort": "id", "cursor": cursor}).status_code == 400
+    assert client.get("/api/movies/", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/api/movies/", params={"limit": 0}).status_code == 422
+
+def _query_plans(path, **params):
+    response_cache.clear()
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        assert client.get(path, params=params).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    with engine.connect() as conn:
+        return [
+            " / ".join(row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", args))
+            for sql, args in statements
+        ]
+
+def test_association_filters_use_indexes():
+    plans = " | ".join(
+        _query_plans("/api/movies/", genre_id=1, actor_id=1, director_id=1, release_year=2000)
+        + _query_plans("/api/actors/", genre_id=1, movie_id=1)
+    )
+    assert "SCAN movie_actors" not in plans
+    assert "SCAN movie_genres" not in plans
+    assert "ix_movie_genres_genre_id_movie_id" in plans
+    assert "ix_movie_actors_actor_id_movie_id" in plans
+
+    plans = " | ".join(_query_plans("/api/movies/", genre_id=1))
+    assert "ix_movie_genres_genre_id_movie_id" in plans
+    assert "SCAN movie_listings" not in plans
+
+    plans = " | ".join(_query_plans("/api/movies/", release_year=2000, sort="release_year"))
+    assert "ix_movie_listings_release_year_id" in plans
+
+def test_actors_by_genre_are_distinct():
+    actors = client.get("/api/actors/", params={"genre_id": 1, "limit": 500}).json()
+    assert len(actors) == len({a["id"] for a in actors})
+    count_genre = next(g for g in client.get("/api/genres/").json() if g["name"] == "Count Genre")
+    actors = client.get("/api/actors/", params={"genre_id": count_genre["id"]}).json()
+    assert [a["name"] for a in actors] == ["Count Actor"]
+
+def test_search_ranks_and_prefixes():
+    director = client.post("/api/directors/", json={"name": "Zelda Quorra", "bio": "Known for heist films"}).json()
+    _create_movie("Quorra Heist", director["id"])
+    _create_movie("Another Story", director["id"])
+    client.post("/api/actors/", json={"name": "Quentin Quorrabell", "bio": "Stage actor"})
+
+    results = client.get("/api/search/", params={"q": "quorr"}).json()
+    assert {(r["type"], r["name"]) for r in results} == {
+        ("director", "Zelda Quorra"), ("movie", "Quorra Heist"), ("actor", "Quentin Quorrabell"),
+    }
+    assert results == sorted(results, key=lambda r: -r["score"])
+
+    results = client.get("/api/search/", params={"q": "heist", "type": "movie"}).json()
+    assert [(r["name"], r["release_year"]) for r in results] == [("Quorra Heist", 2000)]
+
+    # Names outrank a match in a bio
+    results = client.get("/api/search/", params={"q": "heist"}).json()
+    assert [r["type"] for r in results] == ["movie", "director"]
+
+    assert client.get("/api/search/", params={"q": "quorr", "prefix": False}).json() == []
+    assert client.get("/api/search/", params={"q": '"* OR ('}).json() == []
+
+def test_response_cache_hits_and_precise_invalidation():
+    director = client.post("/api/directors/", json={"name": "Cache Director"}).json()
+    other_director = client.post("/api/directors/", json={"name": "Cache Other"}).json()
+    genre = client.post("/api/genres/", json={"name": "Cache Genre"}).json()
+    response_cache.clear()
+
+    by_director = {"director_id": director["id"]}
+    by_other = {"director_id": other_director["id"]}
+    assert client.get("/api/movies/", params=by_director).headers["X-Cache"] == "MISS"
+    assert client.get("/api/movies/", params=by_other).headers["X-Cache"] == "MISS"
+    assert client.get(f"/api/directors/{director['id']}").headers["X-Cache"] == "MISS"
+    assert client.get("/api/genres/").headers["X-Cache"] == "MISS"
+
+    before = client.get("/cache/stats").json()
+    with QueryCounter(engine) as counter:
+        response = client.get("/api/movies/", params=by_director)
+    assert response.headers["X-Cache"] == "HIT"
+    assert response.json() == []
+    assert counter.count == 0
+    assert client.get("/cache/stats").json()["hits"] == before["hits"] + 1
+
+    _create_movie("Cached Movie", director["id"], genre_ids=[genre["id"]])
+
+    response = client.get("/api/movies/", params=by_director)
+    assert response.headers["X-Cache"] == "MISS"
+    assert [m["title"] for m in response.json()] == ["Cached Movie"]
+    assert client.get(f"/api/directors/{director['id']}").headers["X-Cache"] == "MISS"
+    # Entries the new movie cannot appear in survive
+    assert client.get("/api/movies/", params=by_other).headers["X-Cache"] == "HIT"
+    assert client.get("/api/genres/").headers["X-Cache"] == "HIT"
+
+def test_response_cache_is_bounded():
+    response_cache.clear()
+    max_entries = response_cache.max_entries
+    response_cache.max_entries = 2
+    try:
+        evictions = response_cache.evictions
+        for year in (1990, 1991, 1992):
+            client.get("/api/movies/", params={"release_year": year})
+        assert response_cache.evictions == evictions + 1
+        assert client.get("/api/movies/", params={"release_year": 1990}).headers["X-Cache"] == "MISS"
+        assert client.get("/api/movies/", params={"release_year": 1992}).headers["X-Cache"] == "HIT"
+    finally:
+        response_cache.max_entries = max_entries
+
+def test_conditional_get_etag():
+    response_cache.clear()
+    first = client.get("/api/genres/")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "public, max-age=60"
+    assert client.get("/api/genres/").headers["ETag"] == etag
+
+    # Revalidation is answered with 304 from the cache and from a cold path
+    for _ in range(2):
+        response = client.get("/api/genres/", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+        response_cache.clear()
+
+    # Movie lists must revalidate and are unaffected by unrelated tables
+    movies_etag = client.get("/api/movies/").headers["ETag"]
+    assert client.get("/api/movies/").headers["Cache-Control"] == "no-cache"
+    assert client.get("/api/movies/", params={"limit": 5}).headers["ETag"] != movies_etag
+
+    client.post("/api/genres/", json={"name": "ETag Genre"})
+    response = client.get("/api/genres/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    client.post("/api/actors/", json={"name": "ETag Actor"})
+    assert client.get("/api/genres/", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+    director = client.post("/api/directors/", json={"name": "ETag Director"}).json()
+    _create_movie("ETag Movie", director["id"])
+    assert client.get("/api/movies/", headers={"If-None-Match": movies_etag}).status_code == 200
+
+def test_async_read_path_matches_sync():
+    async_app = create_app(async_db=True)
+    async_app.dependency_overrides[get_db] = override_get_db
+    async_app.dependency_overrides[get_read_db] = override_get_db
+    async_app.dependency_overrides[get_async_db] = override_get_async_db
+    async_client = TestClient(async_app)
+
+    handler = next(
+        route.endpoint for route in async_app.routes
+        if getattr(route, "path", None) == "/api/movies/" and "GET" in route.methods
+    )
+    assert handler.__name__ == "read_movies_async"
+
+    actor_id = client.get("/api/actors/").json()[0]["id"]
+    movie_id = client.get("/api/movies/").json()[0]["id"]
+    paths = [
+        "/api/movies/?sort=title&limit=3", f"/api/movies/{movie_id}", "/api/movies/999",
+        "/api/actors/?genre_id=1", f"/api/actors/{actor_id}", "/api/directors/", "/api/directors/1",
+        "/api/genres/", "/api/genres/1", "/api/search/?q=count", "/api/autocomplete?q=count&type=actor",
+        "/api/facets/movies?genre_id=1&genre_id=2&sort=-release_year&limit=2",
+        f"/api/movies/{movie_id}/related", f"/api/actors/{actor_id}/collaborators?limit=3",
+        f"/api/actors/{actor_id}/path/1", "/api/actors/1/path/999999",
+        f"/api/movies/?ids={movie_id},999999,1", f"/api/actors/?ids={actor_id}",
+        "/api/movies/export", f"/api/movies/export?format=csv&after={movie_id}",
+        "/api/changes?since=3&limit=20",
+        "/api/stats/genres", "/api/stats/years", "/api/stats/directors?limit=3", "/api/stats/actors",
+    ]
+    for path in paths:
+        response_cache.clear()
+        facet_index.invalidate()
+        related_index.invalidate()
+        actor_graph.invalidate()
+        expected = client.get(path)
+        response_cache.clear()
+        facet_index.invalidate()
+        related_index.invalidate()
+        actor_graph.invalidate()
+        response = async_client.get(path)
+        assert response.status_code == expected.status_code, path
+        assert response.content == expected.content, path
+        assert response.headers.get("ETag") == expected.headers.get("ETag"), path
+        assert response.headers.get("X-Next-Cursor") == expected.headers.get("X-Next-Cursor"), path
+
+    # Writes still go through the sync routes and invalidate what async routes cached
+    async_client.get("/api/genres/")
+    created = async_client.post("/api/genres/", json={"name": "Async Genre"})
+    assert created.status_code == 200
+    assert "Async Genre" in [g["name"] for g in async_client.get("/api/genres/").json()]
+
+    batch = {"requests": [f"/movies/{movie_id}", f"/actors?ids={actor_id},1", "/movies/999999"]}
+    assert async_client.post("/api/batch", json=batch).json() == client.post("/api/batch", json=batch).json()
+
+def test_sqlite_production_profile_and_read_only_pool(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'tuned.db'}"
+    monkeypatch.setenv("SQLITE_PRAGMA_CACHE_SIZE", "-1024")
+    pragmas = sqlite_pragmas("production")
+    assert pragmas["cache_size"] == "-1024"
+
+    writer = create_engine(url)
+    apply_pragmas(writer, pragmas)
+    with writer.begin() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert conn.exec_driver_sql("PRAGMA temp_store").scalar() == 2  # MEMORY
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+        conn.exec_driver_sql("CREATE TABLE t (x INTEGER)")
+        conn.exec_driver_sql("INSERT INTO t VALUES (1)")
+
+    reader = create_engine(read_only_url(url))
+    apply_pragmas(reader, pragmas, read_only=True)
+    with reader.connect() as conn:
+        assert conn.exec_driver_sql("SELECT x FROM t").scalar() == 1
+        with pytest.raises(Exception, match="readonly|read-only"):
+            conn.exec_driver_sql("INSERT INTO t VALUES (2)")
+
+    with pytest.raises(ValueError):
+        sqlite_pragmas("turbo")
+
+def test_bulk_import_ndjson_and_csv():
+    ndjson = "\n".join([
+        '{"title": "Bulk One", "release_year": 2001, "director": "Bulk Director",'
+        ' "actors": ["Count Actor", "Bulk Actor"], "genres": ["Count Genre", "Bulk Genre"]}',
+        '{"title": "Bulk Two", "release_year": 2002, "director": "Bulk Director", "actors": ["Bulk Actor"]}',
+        'not json',
+        '{"release_year": 2003}',
+        '',
+        '{"title": "Bulk Three", "release_year": 2003}',
+    ])
+    response = client.post("/api/movies/bulk", params={"batch_size": 2}, content=ndjson,
+                           headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported"] == 3
+    assert report["rejected"] == 2
+    assert [e["line"] for e in report["errors"]] == [3, 4]
+    assert (report["directors_created"], report["actors_created"], report["genres_created"]) == (1, 1, 1)
+    assert report["rows_per_second"] > 0
+
+    search = client.get("/api/movies/", params={"release_year": 2001}).json()
+    bulk_one = next(m for m in search if m["title"] == "Bulk One")
+    assert bulk_one["director"]["name"] == "Bulk Director"
+    detail = client.get(f"/api/movies/{bulk_one['id']}").json()
+    assert sorted(a["name"] for a in detail["actors"]) == ["Bulk Actor", "Count Actor"]
+    assert sorted(g["name"] for g in detail["genres"]) == ["Bulk Genre", "Count Genre"]
+
+    csv_body = (
+        "title,release_year,synopsis,duration,director,actors,genres\n"
+        "Bulk Four,2004,\"Heist, with a comma\",99,Bulk Director,Bulk Actor|Csv Actor,Bulk Genre\n"
+        "Bulk Five,not-a-year,,,,,\n"
+    )
+    report = client.post("/api/movies/bulk", content=csv_body, headers={"Content-Type": "text/csv"}).json()
+    assert (report["imported"], report["rejected"], report["actors_created"]) == (1, 1, 1)
+    assert report["errors"][0]["line"] == 3
+    bulk_four = client.get("/api/search/", params={"q": "bulk four", "type": "movie"}).json()[0]
+    detail = client.get(f"/api/movies/{bulk_four['id']}").json()
+    assert detail["synopsis"] == "Heist, with a comma"
+    assert detail["director"]["name"] == "Bulk Director"
+
+def test_synthetic_catalog_is_deterministic_and_importable():
+    from app.bulk import RecordParser
+    from app.schemas import BulkMovie
+    from bench.catalog import generate_lines
+    from bench.run import percentile
+
+    lines = list(generate_lines(200, seed=7))
+    assert lines == list(generate_lines(200, seed=7))
+    assert lines != list(generate_lines(200, seed=8))
+    records = [record for _, record, error in RecordParser("ndjson").feed(lines) if error is None]
+    movies = [BulkMovie.model_validate(record) for record in records]
+    assert len(movies) == 200
+    assert all(1 <= len(m.genres) <= 3 and m.actors and m.director for m in movies)
+
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 99) == 4.0
+
+def test_metrics_and_query_count_header(monkeypatch, caplog):
+    from app import metrics
+
+    monkeypatch.setattr(metrics, "QUERY_COUNT_HEADER", True)
+    monkeypatch.setattr(metrics, "SLOW_QUERY_MS", 0.0)
+    metrics.registry.reset()
+    debug_app = create_app()
+    debug_app.dependency_overrides[get_db] = override_get_db
+    debug_app.dependency_overrides[get_read_db] = override_get_db
+    debug_client = TestClient(debug_app)
+
+    movie_id = client.get("/api/movies/").json()[0]["id"]
+    response_cache.clear()
+    with QueryCounter(engine) as counted, caplog.at_level("WARNING", logger="app.sql.slow"):
+        response = debug_client.get(f"/api/movies/{movie_id}")
+    assert response.status_code == 200
+    assert response.headers["X-Query-Count"] == str(counted.count)
+    assert float(response.headers["X-Query-Time-Ms"]) > 0
+    assert any("Slow query" in record.message for record in caplog.records)
+    debug_client.get("/api/movies/999999")
+    debug_client.get("/no/such/path")
+
+    text = debug_client.get("/metrics").text
+    labels = 'method="GET",route="/api/movies/{movie_id}"'
+    assert f'http_requests_total{{{labels},status="200"}} 1' in text
+    assert f'http_requests_total{{{labels},status="404"}} 1' in text
+    assert f'http_request_duration_seconds_count{{{labels}}} 2' in text
+    assert f'http_request_sql_statements_sum{{{labels}}} ' in text
+    assert f'http_response_serialization_seconds_count{{{labels}}} 1' in text
+    assert 'route="<unmatched>",status="404"' in text
+    assert "# TYPE http_request_duration_seconds histogram" in text
+
+    # Off by default
+    assert "X-Query-Count" not in client.get("/api/genres/").headers
+
+def test_movie_listings_read_model():
+    from sqlalchemy import text
+    from app import listings
+
+    director = client.post("/api/directors/", json={"name": "Listing Director", "bio": "Bio"}).json()
+    actors = [client.post("/api/actors/", json={"name": f"Listing Actor {i}"}).json()["id"] for i in range(2)]
+    genre = client.post("/api/genres/", json={"name": "Listing Genre"}).json()
+    movie = _create_movie("Listing Movie", director["id"], actors, [genre["id"]])
+
+    listed = client.get("/api/movies/", params={"genre_id": genre["id"]}).json()
+    assert [m["id"] for m in listed] == [movie["id"]]
+    assert listed[0]["director"] == director
+    assert client.get("/api/movies/", params={"actor_id": actors[1]}).json() == listed
+
+    plans = " | ".join(_query_plans("/api/movies/", genre_id=genre["id"], director_id=director["id"]))
+    assert "directors" not in plans and "SCAN movie_listings" not in plans
+    assert "COVERING INDEX ix_movie_genres_genre_id_movie_id" in plans
+
+    def snapshot(conn):
+        rows = conn.execute(text("SELECT * FROM movie_listings ORDER BY id")).mappings().all()
+        return [
+            {**row, "genre_ids": sorted(listings.unpack_ids(row["genre_ids"])),
+             "actor_ids": sorted(listings.unpack_ids(row["actor_ids"]))}
+            for row in rows
+        ]
+
+    with engine.connect() as conn:
+        with conn.begin() as transaction:
+            conn.execute(text("UPDATE directors SET name = 'Renamed' WHERE id = :id"), {"id": director["id"]})
+            conn.execute(text("DELETE FROM movie_actors WHERE movie_id = :m AND actor_id = :a"),
+                         {"m": movie["id"], "a": actors[0]})
+            row = conn.execute(text("SELECT * FROM movie_listings WHERE id = :id"), {"id": movie["id"]}).mappings().one()
+            assert row["director_name"] == "Renamed"
+            assert listings.unpack_ids(row["actor_ids"]) == [actors[1]]
+            assert listings.unpack_ids(row["genre_ids"]) == [genre["id"]]
+
+            # Trigger-maintained rows match a full rebuild
+            incremental = snapshot(conn)
+            listings.rebuild_listings(conn)
+            assert snapshot(conn) == incremental
+            transaction.rollback()
+
+def test_movie_facets_multi_select_and_counts():
+    from app.facets import iter_bits
+
+    assert list(iter_bits(0b1010010)) == [1, 4, 6]
+    assert list(iter_bits((1 << 5000) | 0b11, descending=True)) == [5000, 1, 0]
+
+    facet_index.invalidate()
+    director = client.post("/api/directors/", json={"name": "Facet Director"}).json()
+    actors = [client.post("/api/actors/", json={"name": f"Facet Actor {i}"}).json()["id"] for i in range(2)]
+    genres = [client.post("/api/genres/", json={"name": f"Facet Genre {i}"}).json()["id"] for i in range(2)]
+    both = _create_movie("Facet Both", director["id"], actors, genres, release_year=1981)
+    first = _create_movie("Facet First", director["id"], actors[:1], genres[:1], release_year=1982)
+    # Loaded by the first query; later movies arrive through write events
+    params = {"genre_id": genres, "director_id": director["id"]}
+    assert client.get("/api/facets/movies", params=params).json()["total"] == 2
+    second = _create_movie("Facet Second", director["id"], actors[1:], genres[1:], release_year=1983)
+
+    def facet_ids(**params):
+        body = client.get("/api/facets/movies", params={"director_id": director["id"], **params}).json()
+        return [m["id"] for m in body["movies"]], body
+
+    ids, body = facet_ids(genre_id=genres)
+    assert ids == [both["id"], first["id"], second["id"]]
+    assert body["total"] == 3
+    assert body["movies"][0]["director"]["name"] == "Facet Director"
+    assert facet_ids(genre_id=genres, genre_match="all")[0] == [both["id"]]
+    assert facet_ids(actor_id=actors, actor_match="all")[0] == [both["id"]]
+    assert facet_ids(actor_id=actors[1])[0] == [both["id"], second["id"]]
+    assert facet_ids(year_min=1982, year_max=1983)[0] == [first["id"], second["id"]]
+    assert facet_ids(release_year=[1981, 1983], sort="-release_year")[0] == [second["id"], both["id"]]
+
+    # Counts apply every other facet's selection, not the facet's own
+    _, body = facet_ids(genre_id=genres[0], actor_id=actors[1])
+    assert body["total"] == 1
+    assert body["counts"]["genre_id"] == {str(genres[0]): 1, str(genres[1]): 2}
+    assert body["counts"]["release_year"] == {"1981": 1}
+    assert body["counts"]["actor_id"] == {str(actors[1]): 1}
+    assert body["counts"]["director_id"] == {str(director["id"]): 1}
+
+    first_page = client.get("/api/facets/movies", params={"director_id": director["id"], "sort": "-release_year", "limit": 2})
+    cursor = first_page.headers["X-Next-Cursor"]
+    last_page = client.get("/api/facets/movies", params={
+        "director_id": director["id"], "sort": "-release_year", "limit": 2, "cursor": cursor,
+    })
+    assert "X-Next-Cursor" not in last_page.headers
+    assert [m["id"] for m in first_page.json()["movies"] + last_page.json()["movies"]] == [
+        second["id"], first["id"], both["id"]
+    ]
+
+    # A movie written by another process reaches the index through catalog_versions
+    with engine.begin() as connection:
+        external = connection.execute(models.Movie.__table__.insert().values(
+            title="Facet External", release_year=1984, director_id=director["id"]
+        )).inserted_primary_key[0]
+        connection.execute(models.movie_genres.insert().values(movie_id=external, genre_id=genres[0]))
+    ids, body = facet_ids(genre_id=genres[0])
+    assert ids == [both["id"], first["id"], external]
+    assert body["counts"]["release_year"] == {"1981": 1, "1982": 1, "1984": 1}
+
+def _assert_concurrent_loads_share_one(monkeypatch, index, module, fetch, make_stale=None):
+    """Once stale (`invalidate` by default), concurrent `ensure_loaded` calls wait for a single load."""
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Slow the scans down so every caller arrives while the load is running
+    scan = getattr(module, fetch)
+    def slow_scan(*args):
+        time.sleep(0.1)
+        return scan(*args)
+    monkeypatch.setattr(module, fetch, slow_scan)
+    loads = []
+    load = index.load
+    def counted_load(db):
+        loads.append(db)
+        load(db)
+    monkeypatch.setattr(index, "load", counted_load)
+
+    def ensure_loaded(_):
+        db = TestingSessionLocal()
+        try:
+            index.ensure_loaded(db)
+        finally:
+            db.close()
+
+    (make_stale or index.invalidate)()
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(ensure_loaded, range(4)))
+    assert len(loads) == 1 and index.loaded
+
+def test_facet_index_concurrent_loads(monkeypatch):
+    from app import facets
+    _assert_concurrent_loads_share_one(monkeypatch, facet_index, facets, "_fetchall")
+
+def test_related_movies_and_collaborators(monkeypatch):
+    related_index.invalidate()
+    director = client.post("/api/directors/", json={"name": "Related Director"}).json()["id"]
+    other_director = client.post("/api/directors/", json={"name": "Related Other Director"}).json()["id"]
+    lead, support, extra = [
+        client.post("/api/actors/", json={"name": f"Related Actor {i}"}).json()["id"] for i in range(3)
+    ]
+    genre = client.post("/api/genres/", json={"name": "Related Genre"}).json()["id"]
+    origin = _create_movie("Related Origin", director, [lead, support], [genre])
+    sequel = _create_movie("Related Sequel", director, [lead, support], [genre])
+    # Loaded by the first query; later movies arrive through write events
+    assert [r["movie"]["id"] for r in client.get(f"/api/movies/{origin['id']}/related").json()] == [sequel["id"]]
+    cameo = _create_movie("Related Cameo", other_director, [lead, extra])
+
+    related = client.get(f"/api/movies/{origin['id']}/related").json()
+    assert [r["movie"]["id"] for r in related] == [sequel["id"], cameo["id"]]
+    assert related[0]["shared_actors"] == 2
+    assert related[0]["same_director"] is True
+    assert related[0]["shared_genres"] == 1
+    assert related[0]["score"] > related[1]["score"]
+    assert related[0]["movie"]["director"]["name"] == "Related Director"
+    assert len(client.get(f"/api/movies/{origin['id']}/related", params={"limit": 1}).json()) == 1
+
+    collaborators = client.get(f"/api/actors/{lead}/collaborators").json()
+    assert [(c["actor"]["id"], c["shared_movies"]) for c in collaborators] == [(support, 2), (extra, 1)]
+    assert client.get(f"/api/actors/{extra}/collaborators").json()[0]["actor"]["name"] == "Related Actor 0"
+
+    # Incremental updates match a rebuild from the tables
+    incremental = (related, collaborators)
+    related_index.invalidate()
+    assert client.get(f"/api/movies/{origin['id']}/related").json() == incremental[0]
+    assert client.get(f"/api/actors/{lead}/collaborators").json() == incremental[1]
+
+    assert client.get("/api/movies/999999/related").status_code == 404
+    assert client.get("/api/actors/999999/collaborators").status_code == 404
+
+    # Cast written by another process reaches the index through catalog_versions
+    monkeypatch.setattr(catalog_watcher, "poll_seconds", 0)
+    with engine.begin() as connection:
+        connection.execute(models.movie_actors.insert().values(movie_id=cameo["id"], actor_id=support))
+    collaborators = client.get(f"/api/actors/{lead}/collaborators").json()
+    assert [(c["actor"]["id"], c["shared_movies"]) for c in collaborators] == [(support, 3), (extra, 1)]
+
+def test_related_index_concurrent_loads(monkeypatch):
+    from app import related
+    _assert_concurrent_loads_share_one(monkeypatch, related_index, related, "_iterrows")
+
+def test_actor_path_degrees_of_separation():
+    actor_graph.invalidate()
+    director = client.post("/api/directors/", json={"name": "Path Director"}).json()["id"]
+    a, b, c, d, loner = [client.post("/api/actors/", json={"name": f"Path Actor {i}"}).json()["id"] for i in range(5)]
+    first = _create_movie("Path One", director, [a, b])
+    second = _create_movie("Path Two", director, [b, c])
+    third = _create_movie("Path Three", director, [c, d])
+
+    path = client.get(f"/api/actors/{a}/path/{d}").json()
+    assert path["degrees"] == 3
+    assert [actor["id"] for actor in path["actors"]] == [a, b, c, d]
+    assert [movie["id"] for movie in path["movies"]] == [first["id"], second["id"], third["id"]]
+    assert path["movies"][0]["director"]["name"] == "Path Director"
+    reverse = client.get(f"/api/actors/{d}/path/{a}").json()
+    assert [actor["id"] for actor in reverse["actors"]] == [d, c, b, a]
+
+    assert client.get(f"/api/actors/{a}/path/{d}", params={"max_degrees": 2}).json() == {
+        "degrees": None, "actors": [], "movies": []
+    }
+    assert client.get(f"/api/actors/{a}/path/{loner}").json()["degrees"] is None
+    assert client.get(f"/api/actors/{a}/path/{a}").json()["degrees"] == 0
+
+    # New movies join the graph without a rebuild, and cached paths are dropped
+    shortcut = _create_movie("Path Shortcut", director, [a, d])
+    path = client.get(f"/api/actors/{a}/path/{d}").json()
+    assert path["degrees"] == 1
+    assert [movie["id"] for movie in path["movies"]] == [shortcut["id"]]
+    assert client.get(f"/api/actors/{b}/path/{d}").json()["degrees"] == 2
+    actor_graph.invalidate()
+    assert client.get(f"/api/actors/{b}/path/{d}").json()["degrees"] == 2
+
+    assert client.get(f"/api/actors/{a}/path/999999").status_code == 404
+    assert client.get(f"/api/actors/{a}/path/{d}", params={"max_degrees": 99}).status_code == 422
+
+    # Cast written by another process reaches the graph through catalog_versions
+    with engine.begin() as connection:
+        connection.execute(models.movie_actors.insert().values(movie_id=first["id"], actor_id=loner))
+    assert client.get(f"/api/actors/{loner}/path/{a}").json()["degrees"] == 1
+
+def test_actor_graph_concurrent_loads(monkeypatch):
+    from app import graph
+    _assert_concurrent_loads_share_one(monkeypatch, actor_graph, graph, "_chunks")
+
+    # An overflowing overlay is rebuilt once too, however many callers notice it
+    def overflow():
+        monkeypatch.setattr(graph, "OVERLAY_MAX", 0)
+        actor_graph.overlay_casts[0] = []
+    _assert_concurrent_loads_share_one(monkeypatch, actor_graph, graph, "_chunks", overflow)
+    assert actor_graph.overlay_casts == {}
+
+def test_sparse_fields_and_lean_lists():
+    from app import crud, schemas
+
+    # The default lean list matches the response model field for field
+    response = client.get("/api/movies/", params={"limit": 20})
+    assert response.headers["content-type"] == "application/json"
+    assert "ETag" in response.headers
+    db = TestingSessionLocal()
+    try:
+        listings = db.scalars(crud.listings_statement([m["id"] for m in response.json()])).all()
+        expected = {
+            listing.id: schemas.MovieSummary.model_validate(listing).model_dump() for listing in listings
+        }
+    finally:
+        db.close()
+    assert response.json() == [expected[m["id"]] for m in response.json()]
+
+    cards = client.get("/api/movies/", params={"fields": "title,director.name", "limit": 5}).json()
+    assert cards and all(set(m) == {"id", "title", "director"} for m in cards)
+    assert all(m["director"] is None or set(m["director"]) == {"name"} for m in cards)
+    assert set(client.get("/api/actors/", params={"fields": "name"}).json()[0]) == {"id", "name"}
+
+    # The sort key is selected for the cursor even when not returned
+    first = client.get("/api/movies/", params={"fields": "id", "sort": "title", "limit": 2})
+    assert all(set(m) == {"id"} for m in first.json())
+    rest = client.get("/api/movies/", params={
+        "fields": "id", "sort": "title", "limit": 2, "cursor": first.headers["X-Next-Cursor"],
+    })
+    by_title = client.get("/api/movies/", params={"sort": "title", "limit": 4}).json()
+    assert [m["id"] for m in first.json() + rest.json()] == [m["id"] for m in by_title]
+
+    unknown = client.get("/api/movies/", params={"fields": "title,budget"})
+    assert unknown.status_code == 400
+    assert "budget" in unknown.json()["detail"]
+
+def test_batch_lookups():
+    movies = client.get("/api/movies/", params={"limit": 4}).json()
+    ids = [m["id"] for m in reversed(movies)]
+
+    # ids= returns full details in the order asked, skipping unknown ids
+    response = client.get("/api/movies/", params={"ids": ",".join(map(str, ids + [999999, ids[0]]))})
+    assert response.status_code == 200
+    assert [m["id"] for m in response.json()] == ids
+    assert response.json()[0] == client.get(f"/api/movies/{ids[0]}").json()
+    assert all("actors" in m and "genres" in m for m in response.json())
+
+    actor_ids = [a["id"] for a in client.get("/api/actors/", params={"limit": 3}).json()]
+    actors = client.get("/api/actors/", params={"ids": ",".join(map(str, actor_ids))}).json()
+    assert [a["id"] for a in actors] == actor_ids
+    assert actors[0] == client.get(f"/api/actors/{actor_ids[0]}").json()
+
+    assert client.get("/api/movies/", params={"ids": "1,x"}).status_code == 400
+    too_many = ",".join(str(i) for i in range(1, 200))
+    assert client.get("/api/actors/", params={"ids": too_many}).status_code == 400
+
+    # One IN query per entity type, however many ids are asked for
+    response_cache.clear()
+    with QueryCounter(engine) as few:
+        client.get("/api/movies/", params={"ids": ids[0]})
+    response_cache.clear()
+    with QueryCounter(engine) as many:
+        client.get("/api/movies/", params={"ids": ",".join(map(str, ids))})
+    assert many.count == few.count
+
+    response = client.post("/api/batch", json={"requests": [
+        f"/movies/{ids[1]}", f"/api/actors?ids={actor_ids[1]},{actor_ids[0]}",
+        "/movies/999999", "/budgets/1", "/genres/1",
+    ]})
+    assert response.status_code == 200
+    results = response.json()["responses"]
+    assert [r["status"] for r in results] == [200, 200, 404, 400, 200]
+    assert results[0]["body"] == client.get(f"/api/movies/{ids[1]}").json()
+    assert [a["id"] for a in results[1]["body"]] == [actor_ids[1], actor_ids[0]]
+    assert results[2]["body"] == {"detail": "Movie not found"}
+    assert results[2]["path"] == "/movies/999999"
+    assert client.post("/api/batch", json={"requests": []}).status_code == 422
+
+    # A new movie refreshes cached lookups that include its cast
+    client.get("/api/actors/", params={"ids": actor_ids[0]})
+    director = client.post("/api/directors/", json={"name": "Batch Director"}).json()
+    _create_movie("Batch Movie", director["id"], actor_ids=[actor_ids[0]])
+    refreshed = client.get("/api/actors/", params={"ids": actor_ids[0]}).json()
+    assert "Batch Movie" in [m["title"] for m in refreshed[0]["movies"]]
+
+def test_streaming_export(monkeypatch):
+    import csv
+    import io
+    import json
+
+    total = len(client.get("/api/movies/", params={"limit": 500}).json())
+    response = client.get("/api/movies/export", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "content-encoding" not in response.headers
+    assert "ETag" in response.headers
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert len(records) == total
+    assert [r["id"] for r in records] == sorted(r["id"] for r in records)
+
+    movie = client.get(f"/api/movies/{records[0]['id']}").json()
+    assert records[0]["title"] == movie["title"]
+    assert records[0]["actor_ids"] == sorted(a["id"] for a in movie["actors"])
+    assert records[0]["genre_ids"] == sorted(g["id"] for g in movie["genres"])
+    assert records[0]["director_id"] == (movie["director"] or {}).get("id")
+
+    # Resume from the last id received
+    middle = records[len(records) // 2]["id"]
+    rest = client.get("/api/movies/export", params={"after": middle}, headers={"Accept-Encoding": "identity"})
+    assert [json.loads(line) for line in rest.text.splitlines()] == [r for r in records if r["id"] > middle]
+
+    rows = list(csv.DictReader(io.StringIO(client.get("/api/movies/export", params={"format": "csv"}).text)))
+    assert len(rows) == total
+    assert rows[0]["actor_ids"] == "|".join(map(str, records[0]["actor_ids"]))
+
+    # The client decodes the gzip stream back to the same rows
+    zipped = client.get("/api/movies/export", headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert zipped.text == response.text
+    assert client.get("/api/movies/export", params={"format": "xml"}).status_code == 422
+
+    # Without WAL an export reads in batches and lets writers commit in between
+    from app import export
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+    writer = create_engine(SQLITE_DATABASE_URL, connect_args={"timeout": 0.1}, poolclass=NullPool)
+    db = TestingSessionLocal()
+    try:
+        chunks = export.iter_export(db, "ndjson")
+        first = next(chunks)
+        with writer.begin() as conn:
+            conn.execute(models.Genre.__table__.insert().values(name="Export Concurrent Genre"))
+        assert (first + b"".join(chunks)).decode() == response.text
+    finally:
+        db.close()
+        writer.dispose()
+
+def test_change_feed(monkeypatch):
+    import threading
+    import time
+
+    from app import changes
+
+    start = client.get("/api/changes", params={"since": 0, "limit": 1}).json()["head_seq"]
+    # Bulk-imported rows, cast and genre links included, are logged by the same triggers
+    report = client.post("/api/movies/bulk", content=(
+        '{"title": "Feed Movie", "release_year": 2004, "director": "Feed Director",'
+        ' "actors": ["Feed Actor"], "genres": ["Feed Bulk Genre"]}'
+    ), headers={"Content-Type": "application/x-ndjson"}).json()
+    assert report["imported"] == 1
+    feed = client.get("/api/changes", params={"since": start, "limit": 5000}).json()
+    seqs = [c["seq"] for c in feed["changes"]]
+    assert seqs == sorted(seqs) and feed["last_seq"] == seqs[-1] == feed["head_seq"]
+    logged = {c["entity"]: c for c in feed["changes"]}
+    assert set(logged) == {"genres", "directors", "actors", "movies", "movie_actors", "movie_genres"}
+    movie_id = logged["movies"]["id"]
+    assert (logged["movie_actors"]["id"], logged["movie_actors"]["ref_id"], logged["movie_actors"]["op"]) == (
+        movie_id, logged["actors"]["id"], "insert")
+    assert (logged["movie_genres"]["id"], logged["movie_genres"]["ref_id"]) == (movie_id, logged["genres"]["id"])
+    assert logged["movies"]["ref_id"] is None
+
+    # Unlinking is logged as a delete of the link
+    head = feed["head_seq"]
+    with engine.begin() as conn:
+        conn.execute(models.movie_genres.delete().where(models.movie_genres.c.movie_id == movie_id))
+    unlinked = client.get("/api/changes", params={"since": head}).json()
+    assert [(c["entity"], c["id"], c["ref_id"], c["op"]) for c in unlinked["changes"]] == [
+        ("movie_genres", movie_id, logged["genres"]["id"], "delete")
+    ]
+
+    head = unlinked["head_seq"]
+    genre = client.post("/api/genres/", json={"name": "Feed Genre"}).json()
+    delta = client.get("/api/changes", params={"since": head}).json()
+    assert [(c["entity"], c["id"], c["op"], c["version"]) for c in delta["changes"]] == [
+        ("genres", genre["id"], "insert", 1)
+    ]
+    assert delta["last_seq"] == delta["head_seq"] > head
+
+    # ORM updates bump the row version and log an update
+    db = TestingSessionLocal()
+    try:
+        row = db.get(models.Genre, genre["id"])
+        row.description = "Updated"
+        db.commit()
+        assert row.version == 2 and row.updated_at is not None
+    finally:
+        db.close()
+    update = client.get("/api/changes", params={"since": delta["last_seq"]}).json()["changes"]
+    assert [(c["op"], c["version"]) for c in update] == [("update", 2)]
+
+    # Nothing new: a short long poll times out empty and keeps the caller's position
+    since = delta["last_seq"] + 1
+    idle = client.get("/api/changes", params={"since": since, "wait": 0.2}).json()
+    assert idle["changes"] == [] and idle["last_seq"] == since
+
+    # A write from this process wakes a waiting long poll without waiting for a re-poll
+    monkeypatch.setattr(changes, "POLL_SECONDS", 30)
+    writer = threading.Timer(0.2, lambda: client.post("/api/genres/", json={"name": "Woken Genre"}))
+    writer.start()
+    started = time.monotonic()
+    woken = client.get("/api/changes", params={"since": since, "wait": 10}).json()
+    elapsed = time.monotonic() - started
+    writer.join()
+    assert elapsed < 5
+    assert [c["entity"] for c in woken["changes"]] == ["genres"]
+
+def test_lifespan_schema_and_warm_up(tmp_path, monkeypatch):
+    from app import startup
+    from app.autocomplete import autocomplete_index
+    from app.metrics import registry
+
+    # Importing the app created nothing; the schema step does, once
+    fresh = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    assert startup.ensure_schema(fresh) is True
+    assert startup.ensure_schema(fresh) is False
+    with fresh.connect() as connection:
+        triggers = {row[0] for row in connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert {"movies_listing_ai", "movies_version_insert", "movies_change_insert"} <= triggers
+
+    warm_app = create_app(init_schema=False, warm_up=True)
+    warm_app.dependency_overrides[get_db] = override_get_db
+    warm_app.dependency_overrides[get_read_db] = override_get_db
+    # Catch up with rows earlier tests wrote behind the app's back, as a fresh process would be
+    with engine.connect() as connection:
+        catalog_watcher.observe(connection.execute(versions_statement()).all())
+    response_cache.clear()
+    facet_index.invalidate()
+    monkeypatch.setattr(autocomplete_index, "bind", engine)
+    autocomplete_index.invalidate()
+    with TestClient(warm_app) as warm_client:
+        assert warm_app.state.startup_seconds > 0
+        # Reference lists are already in memory and the indexes are loaded
+        assert warm_client.get("/api/genres/").headers["X-Cache"] == "HIT"
+        assert warm_client.get("/api/directors/").headers["X-Cache"] == "HIT"
+        assert facet_index.loaded
+        assert autocomplete_index.loaded
+        # Warm-up requests are not reported as traffic
+        assert '/api/movies/"' not in registry.render()
+
+def test_snapshot_serving_and_rebuild(tmp_path, monkeypatch):
+    import time
+
+    from app import snapshot
+    from app.snapshot import Snapshot, snapshot_store
+
+    director = client.post("/api/directors/", json={"name": "Snapshot Director", "birth_year": 1950}).json()
+    actors = [client.post("/api/actors/", json={"name": f"Snapshot Actor {i}"}).json()["id"] for i in range(3)]
+    genre = client.post("/api/genres/", json={"name": "Snapshot Genre", "description": None}).json()
+    movie = _create_movie("Snapshot One", director["id"], actors[::-1], [genre["id"]])
+    _create_movie("Snapshot Two", director["id"], actors[:1])
+    paths = [
+        f"/api/movies/{movie['id']}", f"/api/actors/{actors[0]}", f"/api/directors/{director['id']}",
+        f"/api/genres/{genre['id']}", "/api/genres/", "/api/directors/",
+        "/api/movies/999999", "/api/actors/999999", "/api/directors/999999", "/api/genres/999999",
+    ]
+    response_cache.clear()
+    expected = {path: (r.status_code, r.json()) for path in paths for r in [client.get(path)]}
+
+    monkeypatch.setattr(snapshot, "REBUILD_DELAY_SECONDS", 0)
+    monkeypatch.setattr(snapshot_store, "path", str(tmp_path / "catalog.snapshot"))
+    monkeypatch.setattr(snapshot_store, "bind", engine)
+    monkeypatch.setattr(snapshot_store, "enabled", True)
+    assert snapshot_store.rebuild() is True
+
+    # Responses from the mapped file match the database, 404s included
+    response_cache.clear()
+    with QueryCounter(engine) as counter:
+        served = {path: (r.status_code, r.json()) for path in paths for r in [client.get(path)]}
+    assert served == expected
+    # Only the ETag check reaches SQLite; the freshness check reuses its versions
+    assert counter.count == len(paths)
+
+    # A write makes the file stale: reads fall back to SQL until the rebuild swaps in a new one
+    db = TestingSessionLocal()
+    try:
+        assert snapshot_store.fresh(db) is not None
+        old = snapshot_store.latest()
+        late = client.post("/api/genres/", json={"name": "Snapshot Late Genre"}).json()
+        fallback = client.get(f"/api/genres/{late['id']}")
+        assert fallback.status_code == 200 and fallback.json()["name"] == "Snapshot Late Genre"
+        for _ in range(200):
+            if snapshot_store.fresh(db) is not None:
+                break
+            time.sleep(0.02)
+        assert snapshot_store.latest() is not old
+        assert snapshot_store.latest().genre(late["id"])["name"] == "Snapshot Late Genre"
+    finally:
+        db.close()
+    # Other workers map the same file
+    assert Snapshot(snapshot_store.path).versions == snapshot_store.latest().versions
+
+def test_snapshot_rebuilds_are_debounced(tmp_path, monkeypatch):
+    import threading
+    import time
+
+    from app import snapshot
+
+    store = snapshot.SnapshotStore(str(tmp_path / "catalog.snapshot"), enabled=True, bind=engine)
+    built = threading.Event()
+    times = []
+    def rebuild():
+        times.append(time.monotonic())
+        built.set()
+        return True
+    monkeypatch.setattr(store, "rebuild", rebuild)
+    monkeypatch.setattr(snapshot, "REBUILD_DELAY_SECONDS", 0.3)
+    monkeypatch.setattr(snapshot, "REBUILD_MAX_DELAY_SECONDS", 30)
+
+    # A burst of writes shares one rebuild, once they pause
+    for _ in range(5):
+        store.schedule_rebuild()
+        time.sleep(0.02)
+    last_write = time.monotonic()
+    assert built.wait(5)
+    assert len(times) == 1 and times[0] >= last_write + 0.25
+
+    # Stale reads do not postpone it; steady writes do, but only up to the cap
+    monkeypatch.setattr(snapshot, "REBUILD_MAX_DELAY_SECONDS", 0.6)
+    built.clear()
+    started = time.monotonic()
+    while not built.is_set() and time.monotonic() - started < 5:
+        store.schedule_rebuild()
+        store.schedule_rebuild(postpone=False)
+        time.sleep(0.05)
+    assert len(times) == 2 and times[1] - started < 1.2
+
+def test_catalog_stats():
+    from sqlalchemy import text
+    from app import stats
+
+    def grouped(sql):
+        with engine.connect() as connection:
+            return [tuple(row) for row in connection.execute(text(sql))]
+
+    def counters():
+        with engine.connect() as connection:
+            return sorted(connection.execute(text(
+                "SELECT dimension, key, movie_count, total_duration, duration_count FROM catalog_stats WHERE movie_count > 0"
+            )))
+
+    director = client.post("/api/directors/", json={"name": "Stats Director"}).json()
+    actor = client.post("/api/actors/", json={"name": "Stats Actor"}).json()
+    genre = client.post("/api/genres/", json={"name": "Stats Genre"}).json()
+    empty = client.post("/api/genres/", json={"name": "Stats Empty Genre"}).json()
+    for year in (1901, 1901, 1902):
+        _create_movie(f"Stats {year}", director["id"], [actor["id"]], [genre["id"]], release_year=year)
+
+    # Counters match GROUP BYs over the base tables
+    by_genre = {g["id"]: g for g in client.get("/api/stats/genres").json()}
+    assert by_genre[empty["id"]] == {"id": empty["id"], "name": "Stats Empty Genre", "movie_count": 0, "average_duration": None}
+    assert [(g["id"], g["movie_count"]) for g in by_genre.values() if g["movie_count"]] == grouped(
+        "SELECT genre_id, count(*) AS n FROM movie_genres GROUP BY genre_id ORDER BY n DESC, genre_id"
+    )
+    years = client.get("/api/stats/years").json()
+    assert [(y["release_year"], y["movie_count"]) for y in years] == grouped(
+        "SELECT release_year, count(*) FROM movies GROUP BY release_year ORDER BY release_year"
+    )
+    assert {"release_year": 1901, "movie_count": 2, "average_duration": 100.0} in years
+    top = client.get("/api/stats/actors", params={"limit": 1}).json()
+    assert [(a["id"], a["movie_count"]) for a in top] == grouped(
+        "SELECT actor_id, count(*) AS n FROM movie_actors GROUP BY actor_id ORDER BY n DESC, actor_id LIMIT 1"
+    )
+    directors = {d["id"]: d for d in client.get("/api/stats/directors", params={"limit": 100}).json()}
+    assert directors[director["id"]]["movie_count"] == 3
+
+    # A new movie moves the cached breakdowns
+    _create_movie("Stats 1902 Again", director["id"], [actor["id"]], [genre["id"]], release_year=1902)
+    assert {"release_year": 1902, "movie_count": 2, "average_duration": 100.0} in client.get("/api/stats/years").json()
+
+    # Updates and deletes outside crud keep them exact too; a full recompute agrees
+    db = TestingSessionLocal()
+    try:
+        movie = db.query(models.Movie).filter(models.Movie.title == "Stats 1902 Again").one()
+        movie.duration = 140
+        movie.release_year = 1903
+        db.commit()
+        movie.genres = []
+        db.commit()
+    finally:
+        db.close()
+    maintained = counters()
+    with engine.begin() as connection:
+        stats.rebuild_stats(connection)
+    assert counters() == maintained
+    # Direct session writes publish no events, so drop the cached responses
+    response_cache.clear()
+    assert {"release_year": 1903, "movie_count": 1, "average_duration": 140.0} in client.get("/api/stats/years").json()
+    assert client.get("/api/stats/actors", params={"limit": 0}).status_code == 422
+
+def test_write_queue_group_commit(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from app.write_queue import write_queue
+
+    monkeypatch.setattr(write_queue, "enabled", True)
+    monkeypatch.setattr(write_queue, "window", 0.2)
+    lenient = TestClient(app, raise_server_exceptions=False)
+    assert client.get("/api/genres/").status_code == 200  # cached before the writes
+    batches, writes = write_queue.batches, write_queue.writes
+
+    # Concurrent creates share commits; a duplicate name fails alone
+    names = [f"Queued Genre {i}" for i in range(6)] + ["Queued Genre 0"]
+    with ThreadPoolExecutor(len(names)) as pool:
+        responses = list(pool.map(lambda name: lenient.post("/api/genres/", json={"name": name}), names))
+    created = [r.json() for r in responses if r.status_code == 200]
+    assert sorted(r.status_code for r in responses) == [200] * 6 + [500]
+    assert sorted(g["name"] for g in created) == sorted(set(names))
+    assert len({g["id"] for g in created}) == 6
+    assert write_queue.writes - writes == 6
+    assert write_queue.batches - batches < 6
+
+    # Movies come back with their relationships; events still evict cached lists
+    director = client.post("/api/directors/", json={"name": "Queued Director"}).json()
+    actor = client.post("/api/actors/", json={"name": "Queued Actor"}).json()
+    movie = _create_movie("Queued Movie", director["id"], [actor["id"]], [created[0]["id"]])
+    assert movie["director"]["name"] == "Queued Director"
+    assert [a["id"] for a in movie["actors"]] == [actor["id"]]
+    assert client.get(f"/api/movies/{movie['id']}").json() == movie
+    listed = {g["name"] for g in client.get("/api/genres/").json()}
+    assert set(names) <= listed
+
+    # A failed reload fails the batch before its commit, so a retry creates one movie
+    from app import crud
+    get_by_ids = crud.get_by_ids
+    def failing_get_by_ids(db, resource, ids):
+        monkeypatch.setattr(crud, "get_by_ids", get_by_ids)
+        raise RuntimeError("reload failed")
+    monkeypatch.setattr(crud, "get_by_ids", failing_get_by_ids)
+    payload = {"title": "Queued Retry", "release_year": 2000, "director_id": director["id"]}
+    assert lenient.post("/api/movies/", json=payload).status_code == 500
+    assert client.post("/api/movies/", json=payload).status_code == 200
+    titles = [m["title"] for m in client.get("/api/movies/", params={"director_id": director["id"]}).json()]
+    assert titles.count("Queued Retry") == 1
+
+def test_coalesced_identical_requests(monkeypatch):
+    import asyncio
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from app import crud, crud_async
+    from app.metrics import registry
+
+    director = client.post("/api/directors/", json={"name": "Viral Director"}).json()
+    movie = _create_movie("Viral Movie", director["id"])
+    calls = []
+
+    def slow_get_movie(db, movie_id):
+        calls.append(movie_id)
+        time.sleep(0.3)
+        return original_get_movie(db, movie_id=movie_id)
+
+    async def slow_get_movie_async(db, movie_id):
+        calls.append(movie_id)
+        await asyncio.sleep(0.3)
+        return await original_get_movie_async(db, movie_id=movie_id)
+
+    original_get_movie, original_get_movie_async = crud.get_movie, crud_async.get_movie
+    monkeypatch.setattr(crud, "get_movie", slow_get_movie)
+    monkeypatch.setattr(crud_async, "get_movie", slow_get_movie_async)
+    async_app = create_app(async_db=True)
+    async_app.dependency_overrides[get_read_db] = override_get_db
+    async_app.dependency_overrides[get_async_db] = override_get_async_db
+
+    for app_client in (client, TestClient(async_app)):
+        # Sync and async handlers alike: one computation, shared by the requests waiting on it
+        calls.clear()
+        response_cache.clear()
+        with ThreadPoolExecutor(8) as pool:
+            responses = list(pool.map(lambda _: app_client.get(f"/api/movies/{movie['id']}"), range(8)))
+        statuses = [r.headers["X-Cache"] for r in responses]
+        assert all(r.status_code == 200 and r.json() == responses[0].json() for r in responses)
+        assert len(calls) == statuses.count("MISS") < 8
+        assert "COALESCED" in statuses
+        assert all(r.headers["etag"] == responses[0].headers["etag"] for r in responses)
+
+    # Errors are shared too, and conditional requests never wait on others
+    with ThreadPoolExecutor(4) as pool:
+        missing = list(pool.map(lambda _: client.get("/api/movies/999999"), range(4)))
+    assert all(r.status_code == 404 and r.json() == {"detail": "Movie not found"} for r in missing)
+    etag = responses[0].headers["etag"]
+    assert client.get(f"/api/movies/{movie['id']}", headers={"If-None-Match": etag}).status_code == 304
+
+    assert client.get("/cache/stats").json()["coalescing"]["coalesced"] > 0
+    assert 'http_requests_coalesced_total{method="GET",route="/api/movies/{movie_id}"}' in registry.render()
+
+def test_autocomplete_typos_and_popularity(monkeypatch):
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app import autocomplete
+    from app.autocomplete import autocomplete_index
+
+    director = client.post("/api/directors/", json={"name": "Martina Scorsoni"}).json()
+    busy = client.post("/api/actors/", json={"name": "Leonarda DiCaprino"}).json()
+    client.post("/api/actors/", json={"name": "Leonarda DiCaprina"}).json()
+    # Concurrent first queries wait for one build
+    with engine.connect() as connection:
+        catalog_watcher.observe(connection.execute(versions_statement()).all())
+    autocomplete_index.invalidate()
+    builds = autocomplete_index.builds
+    with ThreadPoolExecutor(4) as pool:
+        responses = list(pool.map(
+            lambda n: client.get("/api/autocomplete", params={"q": "DiCaprin", "type": "actor", "limit": 5 + n}),
+            range(4),
+        ))
+    assert autocomplete_index.builds == builds + 1
+    results = responses[0].json()
+    assert {r["name"] for r in results[:2]} == {"Leonarda DiCaprina", "Leonarda DiCaprino"}
+
+    # Created rows are indexed without a rebuild, and film counts break ties
+    for n in range(3):
+        _create_movie(f"Titanik Voyage {n}", director["id"], [busy["id"]])
+    results = client.get("/api/autocomplete", params={"q": "leonarda dicaprin", "type": "actor"}).json()
+    assert results[0]["id"] == busy["id"] and results[0]["popularity"] == 3
+    assert results == sorted(results, key=lambda r: -r["score"])
+
+    # Misspellings, accents, case and partial words
+    assert client.get("/api/autocomplete", params={"q": "scorcesoni", "type": "director"}).json()[0]["id"] == director["id"]
+    assert client.get("/api/autocomplete", params={"q": "LÉONARDA dicpario"}).json()[0]["id"] == busy["id"]
+    movies = client.get("/api/autocomplete", params={"q": "titanic voy", "type": "movie"}).json()
+    assert {r["name"] for r in movies} >= {f"Titanik Voyage {n}" for n in range(3)}
+    assert all(r["type"] == "movie" and r["release_year"] == 2000 and r["popularity"] == 1 for r in movies)
+
+    assert client.get("/api/autocomplete", params={"q": "qqqqzzzz"}).json() == []
+    assert client.get("/api/autocomplete", params={"q": "--"}).json() == []
+    assert client.get("/api/autocomplete", params={"q": "leo", "type": "genre"}).status_code == 422
+
+    # Enough additions rebuild the index in the background; queries never wait for it
+    monkeypatch.setattr(autocomplete, "REBUILD_AFTER", autocomplete_index.added + 2)
+    monkeypatch.setattr(autocomplete_index, "bind", engine)
+    builds = autocomplete_index.builds
+    client.post("/api/actors/", json={"name": "Rebuilt Actor"})
+    assert autocomplete_index.builds == builds
+    client.post("/api/actors/", json={"name": "Rebuilt Actress"})
+    deadline = time.monotonic() + 5
+    while autocomplete_index.builds == builds and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert autocomplete_index.builds == builds + 1 and autocomplete_index.added == 0
+    assert client.get("/api/autocomplete", params={"q": "rebuilt actres"}).json()[0]["name"] == "Rebuilt Actress"
+
+    # Names written by another process are picked up through catalog_versions
+    with engine.begin() as connection:
+        connection.execute(models.Director.__table__.insert().values(name="Externa Directrix"))
+    assert client.get("/api/autocomplete", params={"q": "externa direc"}).json()[0]["name"] == "Externa Directrix"
+
+def test_cache_sees_other_process_writes(monkeypatch):
+    monkeypatch.setattr(catalog_watcher, "poll_seconds", 0)
+    response_cache.clear()
+    client.get("/api/genres/")
+    assert client.get("/api/genres/").headers["X-Cache"] == "HIT"
+
+    # This process's writes are accounted for and evict precisely
+    changes = catalog_watcher.external_changes
+    client.post("/api/genres/", json={"name": "Own Worker Genre"})
+    client.get("/api/directors/")
+    assert client.get("/api/directors/").headers["X-Cache"] == "HIT"
+    assert catalog_watcher.external_changes == changes
+
+    # Another worker (or the import CLI) writes straight to the database
+    with engine.begin() as connection:
+        connection.execute(models.Genre.__table__.insert().values(name="Other Worker Genre"))
+    response = client.get("/api/genres/")
+    assert response.headers["X-Cache"] == "MISS"
+    assert "Other Worker Genre" in [g["name"] for g in response.json()]
+    assert catalog_watcher.external_changes == changes + 1
+
+def test_cli_import_reaches_running_server(tmp_path, monkeypatch):
+    import json
+    import os
+    import subprocess
+    import sys
+
+    from app.autocomplete import autocomplete_index
+
+    monkeypatch.setattr(catalog_watcher, "poll_seconds", 0)
+    assert client.get("/api/genres/").json()
+    assert client.get("/api/autocomplete", params={"q": "clipper picture"}).json() == []
+    client.get("/api/facets/movies", params={"limit": 1})
+    assert autocomplete_index.loaded and facet_index.loaded
+
+    catalog = tmp_path / "catalog.ndjson"
+    catalog.write_text(json.dumps({
+        "title": "Clipper Picture", "release_year": 2001, "director": "Clipper Director",
+        "actors": ["Clipper Actor"], "genres": ["Clipper Genre"],
+    }) + "\n")
+    subprocess.run(
+        [sys.executable, "-m", "app.seed_data", "import", str(catalog)],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env={**os.environ, "DATABASE_URL": SQLITE_DATABASE_URL},
+        check=True, capture_output=True,
+    )
+
+    # No events reached this process, yet the cache and the indexes follow the import
+    genres = client.get("/api/genres/").json()
+    genre = next(g["id"] for g in genres if g["name"] == "Clipper Genre")
+    assert client.get("/api/autocomplete", params={"q": "clipper picture"}).json()[0]["name"] == "Clipper Picture"
+    movies = client.get("/api/facets/movies", params={"genre_id": genre}).json()["movies"]
+    assert [m["title"] for m in movies] == ["Clipper Picture"]
@@ -1,5 +1,5 @@
 import axios from 'axios'
-import type { Movie, MovieSummary, Actor, Director, Genre, FilterOptions } from '@/types'
+import type { AutocompleteResult, BatchResult, GenreStats, Movie, MovieSummary, Actor, Collaborator, Director, Genre, FilterOptions, FacetedMovies, Page, PageOptions, PersonStats, RelatedMovie, SearchResult, YearStats } from '@/types'
 
 const api = axios.create({
   baseURL: '/api',
@@ -8,14 +8,31 @@ const api = axios.create({
   }
 })
 
+// Everything MovieCard shows; list responses skip director bios and birth years
+const MOVIE_CARD_FIELDS = 'id,title,release_year,synopsis,duration,director.id,director.name'
+
 export const movieApi = {
   // Movies
-  getMovies: (filters?: FilterOptions): Promise<MovieSummary[]> =>
-    api.get('/movies/', { params: filters }).then(res => res.data),
+  // Returns one page; pass the previous page's nextCursor to fetch the next one
+  getMovies: (filters?: FilterOptions, page?: PageOptions): Promise<Page<MovieSummary>> =>
+    api.get('/movies/', { params: { fields: MOVIE_CARD_FIELDS, ...filters, ...page } }).then(res => ({
+      items: res.data,
+      nextCursor: res.headers['x-next-cursor'] ?? null
+    })),
   
+  getMovieFacets: (filters?: FilterOptions, page?: PageOptions): Promise<FacetedMovies> =>
+    api.get('/facets/movies', { params: { ...filters, ...page } }).then(res => res.data),
+
   getMovie: (id: number): Promise<Movie> =>
     api.get(`/movies/${id}`).then(res => res.data),
 
+  // Full details for each id, in the order given
+  getMoviesByIds: (ids: number[]): Promise<Movie[]> =>
+    api.get('/movies/', { params: { ids: ids.join(',') } }).then(res => res.data),
+
+  getRelatedMovies: (id: number, limit = 6): Promise<RelatedMovie[]> =>
+    api.get(`/movies/${id}/related`, { params: { limit } }).then(res => res.data),
+
   // Actors
   getActors: (filters?: { movie_id?: number; genre_id?: number }): Promise<Actor[]> =>
     api.get('/actors/', { params: filters }).then(res => res.data),
@@ -23,6 +40,13 @@ export const movieApi = {
   getActor: (id: number): Promise<Actor> =>
     api.get(`/actors/${id}`).then(res => res.data),
 
+  getCollaborators: (id: number, limit = 8): Promise<Collaborator[]> =>
+    api.get(`/actors/${id}/collaborators`, { params: { limit } }).then(res => res.data),
+
+  // Several lookups such as '/movies/1' or '/actors?ids=2,3' in one round trip
+  batch: (requests: string[]): Promise<BatchResult[]> =>
+    api.post('/batch', { requests }).then(res => res.data.responses),
+
   // Directors
   getDirectors: (): Promise<Director[]> =>
     api.get('/directors/').then(res => res.data),
@@ -35,7 +59,27 @@ export const movieApi = {
     api.get('/genres/').then(res => res.data),
   
   getGenre: (id: number): Promise<Genre> =>
-    api.get(`/genres/${id}`).then(res => res.data)
+    api.get(`/genres/${id}`).then(res => res.data),
+
+  // Dashboard statistics
+  getGenreStats: (): Promise<GenreStats[]> =>
+    api.get('/stats/genres').then(res => res.data),
+
+  getYearStats: (): Promise<YearStats[]> =>
+    api.get('/stats/years').then(res => res.data),
+
+  getTopDirectors: (limit = 10): Promise<PersonStats[]> =>
+    api.get('/stats/directors', { params: { limit } }).then(res => res.data),
+
+  getTopActors: (limit = 10): Promise<PersonStats[]> =>
+    api.get('/stats/actors', { params: { limit } }).then(res => res.data),
+
+  // Search
+  search: (q: string, type?: SearchResult['type'], limit?: number): Promise<SearchResult[]> =>
+    api.get('/search/', { params: { q, type, limit } }).then(res => res.data),
+
+  autocomplete: (q: string, type?: AutocompleteResult['type'], limit?: number): Promise<AutocompleteResult[]> =>
+    api.get('/autocomplete', { params: { q, type, limit } }).then(res => res.data)
 }
 
 export default api 
\ No newline at end of file
@@ -1,11 +1,15 @@
 import { defineStore } from 'pinia'
 import { ref, computed } from 'vue'
-import type { Movie, MovieSummary, Actor, Director, Genre, FilterOptions } from '@/types'
+import type { Movie, MovieSummary, Actor, Director, Genre, FacetCounts, FilterOptions } from '@/types'
 import { movieApi } from '@/services/api'
 
 export const useMovieStore = defineStore('movie', () => {
   // State
   const movies = ref<MovieSummary[]>([])
+  const movieFilters = ref<FilterOptions | undefined>()
+  const nextMoviesCursor = ref<string | null>(null)
+  const moviesTotal = ref<number | null>(null)
+  const facetCounts = ref<FacetCounts | null>(null)
   const currentMovie = ref<Movie | null>(null)
   const actors = ref<Actor[]>([])
   const directors = ref<Director[]>([])
@@ -15,6 +19,7 @@ export const useMovieStore = defineStore('movie', () => {
 
   // Getters
   const moviesCount = computed(() => movies.value.length)
+  const hasMoreMovies = computed(() => nextMoviesCursor.value !== null)
   const uniqueReleaseYears = computed(() => {
     const years = movies.value.map(movie => movie.release_year)
     return [...new Set(years)].sort((a, b) => b - a)
@@ -25,7 +30,15 @@ export const useMovieStore = defineStore('movie', () => {
     loading.value = true
     error.value = null
     try {
-      movies.value = await movieApi.getMovies(filters)
+      const [page, facets] = await Promise.all([
+        movieApi.getMovies(filters),
+        movieApi.getMovieFacets(filters, { limit: 1 })
+      ])
+      movies.value = page.items
+      movieFilters.value = filters
+      nextMoviesCursor.value = page.nextCursor
+      moviesTotal.value = facets.total
+      facetCounts.value = facets.counts
     } catch (err) {
       error.value = 'Failed to fetch movies'
       console.error('Error fetching movies:', err)
@@ -34,6 +47,19 @@ export const useMovieStore = defineStore('movie', () => {
     }
   }
 
+  const fetchMoreMovies = async () => {
+    if (!nextMoviesCursor.value) return
+    error.value = null
+    try {
+      const page = await movieApi.getMovies(movieFilters.value, { cursor: nextMoviesCursor.value })
+      movies.value = [...movies.value, ...page.items]
+      nextMoviesCursor.value = page.nextCursor
+    } catch (err) {
+      error.value = 'Failed to fetch movies'
+      console.error('Error fetching movies:', err)
+    }
+  }
+
   const fetchMovie = async (id: number) => {
     loading.value = true
     error.value = null
@@ -123,6 +149,8 @@ export const useMovieStore = defineStore('movie', () => {
   return {
     // State
     movies,
+    moviesTotal,
+    facetCounts,
     currentMovie,
     actors,
     directors,
@@ -131,9 +159,11 @@ export const useMovieStore = defineStore('movie', () => {
     error,
     // Getters
     moviesCount,
+    hasMoreMovies,
     uniqueReleaseYears,
     // Actions
     fetchMovies,
+    fetchMoreMovies,
     fetchMovie,
     fetchActors,
     fetchActor,
@@ -34,9 +34,89 @@ export interface Movie extends MovieSummary {
   genres: Genre[]
 }
 
+export interface RelatedMovie {
+  movie: MovieSummary
+  score: number
+  shared_actors: number
+  shared_genres: number
+  same_director: boolean
+}
+
+export interface Collaborator {
+  actor: Actor
+  shared_movies: number
+}
+
 export interface FilterOptions {
   genre_id?: number
   director_id?: number
   actor_id?: number
   release_year?: number
-} 
\ No newline at end of file
+} 
+
+export type MovieSort = 'id' | 'title' | 'release_year' | '-id' | '-title' | '-release_year'
+
+export interface PageOptions {
+  sort?: MovieSort
+  limit?: number
+  cursor?: string
+}
+
+export interface Page<T> {
+  items: T[]
+  nextCursor: string | null
+}
+
+export type FacetName = 'genre_id' | 'release_year' | 'director_id' | 'actor_id'
+
+// Movies per facet value, keyed by facet then value id
+export type FacetCounts = Record<FacetName, Record<number, number>>
+
+export interface FacetedMovies {
+  total: number
+  movies: MovieSummary[]
+  counts: FacetCounts
+}
+
+export interface SearchResult {
+  type: 'movie' | 'actor' | 'director'
+  id: number
+  name: string
+  release_year?: number
+  score: number
+}
+
+export interface AutocompleteResult {
+  type: 'movie' | 'actor' | 'director'
+  id: number
+  name: string
+  release_year?: number
+  popularity: number
+  score: number
+}
+
+export interface BatchResult<T = unknown> {
+  path: string
+  status: number
+  body: T
+}
+
+export interface GenreStats {
+  id: number
+  name: string
+  movie_count: number
+  average_duration: number | null
+}
+
+export interface YearStats {
+  release_year: number
+  movie_count: number
+  average_duration: number | null
+}
+
+export interface PersonStats {
+  id: number
+  name: string
+  movie_count: number
+  average_duration: number | null
+}